@@ -0,0 +1,132 @@
+"""Asynchronous counterparts of the functions in db.py.
+
+Every function in db.py blocks on SQLite.  The coroutines here run the same
+functions on background threads, so a slow fsync or WAL checkpoint never stalls
+the discord.py event loop.  Writes go through a single writer thread, so they
+are applied in the order they were issued; reads share a small thread pool.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import db
+import election_checker
+
+_write_executor: ThreadPoolExecutor | None = None
+_read_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _executors() -> tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+    """Return the (writer, readers) executors, creating them on first use."""
+    global _write_executor, _read_executor
+    with _executor_lock:
+        if _write_executor is None:
+            _write_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="db-writer"
+            )
+        if _read_executor is None:
+            # Leave one pooled connection free for the writer thread.
+            _read_executor = ThreadPoolExecutor(
+                max_workers=max(1, db.get_pool().size - 1),
+                thread_name_prefix="db-reader",
+            )
+        return _write_executor, _read_executor
+
+
+async def run_read(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking, read-only database function on the reader pool."""
+    _, readers = _executors()
+    return await asyncio.get_running_loop().run_in_executor(
+        readers, functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def run_write(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking database function that writes on the writer thread."""
+    writer, _ = _executors()
+    return await asyncio.get_running_loop().run_in_executor(
+        writer, functools.partial(fn, *args, **kwargs)
+    )
+
+
+def _reader(fn: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_read(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def _writer(fn: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_write(fn, *args, **kwargs)
+
+    return wrapper
+
+
+init_db = _writer(db.init_db)
+mark_view_upgraded = _writer(db.mark_view_upgraded)
+save_ballot = _writer(db.save_ballot)
+submit_ballot = _writer(db.submit_ballot)
+flush_interim_ballots = _writer(db.flush_interim_ballots)
+
+load_election = _reader(db.load_election)
+load_election_by_natural_key = _reader(db.load_election_by_natural_key)
+load_all_elections = _reader(db.load_all_elections)
+load_elections_with_legacy_view = _reader(db.load_elections_with_legacy_view)
+load_elections_by_creator = _reader(db.load_elections_by_creator)
+load_election_end_times = _reader(db.load_election_end_times)
+load_ballot = _reader(db.load_ballot)
+load_user_ballot = _reader(db.load_user_ballot)
+load_all_ballots = _reader(db.load_all_ballots)
+get_vote_count = _reader(db.get_vote_count)
+load_tally = _reader(db.load_tally)
+get_ballot_revision = _reader(db.get_ballot_revision)
+
+
+async def save_interim_ballot(ballot: Any, election_id: int, user_id: int) -> None:
+    """Record a user's interim ballot in the in-memory buffer.
+
+    Buffering never touches disk, so it's done on the event loop; only looking
+    up candidates missing from the cache reads the database, on a reader.
+    """
+    candidates = db.cached_candidates(election_id)
+    if candidates is None:
+        candidates = await run_read(db.load_candidates, election_id)
+    db.save_interim_ballot(ballot, election_id, user_id, candidates)
+
+
+async def save_election(election: Any) -> int:
+    """Save an election and reschedule its end.  Returns election_id."""
+    election_id = await run_write(db.save_election, election)
+    election_checker.schedule(
+        election_id, election.end_timestamp if election.open else None
+    )
+    return election_id
+
+
+async def mark_election_closed(election_id: int):
+    """Mark an election as closed, so it no longer ends on schedule."""
+    await run_write(db.mark_election_closed, election_id)
+    election_checker.unschedule(election_id)
+
+
+async def delete_election(election_id: int):
+    """Delete an election and all its ballots, and unschedule its end."""
+    await run_write(db.delete_election, election_id)
+    election_checker.unschedule(election_id)
+
+
+def shutdown() -> None:
+    """Wait for queued database work to finish and stop the worker threads."""
+    global _write_executor, _read_executor
+    with _executor_lock:
+        for executor in (_write_executor, _read_executor):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        _write_executor = None
+        _read_executor = None
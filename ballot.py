@@ -1,10 +1,11 @@
 import abc
-from typing import Any, Callable, Optional
+from typing import Any, Optional
 import copy
 import math
+import re
 import discord
 import random
-import db
+import async_db
 
 
 class Ballot(abc.ABC):
@@ -37,6 +38,18 @@ class Ballot(abc.ABC):
         new.ballot_id = None  # New copy gets a new ID
         return new
 
+    def restore_ui_state(self, data: dict[str, Any]) -> None:
+        """Restore the page state saved by to_dict().
+
+        Submitted ballots are stored without page state.  Every page of those
+        was visited before submission, so they are restored as fully visited.
+        """
+        self.page = data.get("page", 0)
+        if "visited_pages" in data:
+            self.visited_pages = set(data["visited_pages"])
+        else:
+            self.visited_pages = set(range(self.total_pages()))
+
     def total_pages(self) -> int:
         per_page = self.candidates_per_page()
         return math.ceil(len(self.candidates) / per_page) if per_page else 1
@@ -50,86 +63,88 @@ class Ballot(abc.ABC):
         else:
             return self.candidates
 
-    def render_interim(self, session_id: int) -> dict[str, Any]:
-        class NextPageButton(discord.ui.Button):
-            def __init__(_):
-                super().__init__(
-                    style=discord.ButtonStyle.primary, label="Next Page", row=4
-                )
-
-            async def callback(_, interaction: discord.Interaction):
-                def modification():
-                    if self.page < self.total_pages() - 1:
-                        self.page += 1
-                    else:
-                        self.page = 0
-
-                await self.modify(modification, interaction, session_id)
-
-        class PrevPageButton(discord.ui.Button):
-            def __init__(_):
-                super().__init__(
-                    style=discord.ButtonStyle.primary, label="Prev Page", row=4
-                )
-
-            async def callback(_, interaction: discord.Interaction):
-                def modification():
-                    if self.page > 0:
-                        self.page -= 1
-                    else:
-                        self.page = self.total_pages() - 1
-
-                await self.modify(modification, interaction, session_id)
-
-        class SubmitButton(discord.ui.Button):
-            def __init__(_):
-                super().__init__(
-                    style=discord.ButtonStyle.green, label="Submit Vote", row=4
-                )
-                _.election_id = self.election_id
-                _.session_id_val = session_id
-
-            async def callback(_, interaction: discord.Interaction):
-                from election import load_election_from_db
-
-                election = load_election_from_db(_.election_id)
-                if await election.check_session(interaction, _.session_id_val):
-                    await election.submit_ballot(interaction)
-
-        class ResetButton(discord.ui.Button):
-            def __init__(_):
-                super().__init__(
-                    style=discord.ButtonStyle.danger, label="Start Over", row=4
-                )
+    def component(
+        self,
+        item: discord.ui.Item,
+        session_id: int,
+        action: str,
+        index: int | None = None,
+    ) -> "BallotComponent":
+        """Route a component's clicks to apply(action, index) in this session."""
+        return BallotComponent(item, self.election_id, session_id, action, index)
 
-            async def callback(_, interaction: discord.Interaction):
-                def modification():
-                    self.clear()
-                    self.visited_pages.clear()
-                    self.page = 0
+    def apply(self, action: str, index: int | None, values: list[str]) -> None:
+        """Apply the action of a component made by component().
 
-                await self.modify(modification, interaction, session_id)
+        `values` are the options chosen in a select, if the component is one.
+        """
+        if action == "next":
+            if self.page < self.total_pages() - 1:
+                self.page += 1
+            else:
+                self.page = 0
+        elif action == "prev":
+            if self.page > 0:
+                self.page -= 1
+            else:
+                self.page = self.total_pages() - 1
+        elif action == "reset":
+            self.clear()
+            self.visited_pages.clear()
+            self.page = 0
+        else:
+            self.apply_vote(action, index, values)
 
+    def render_interim(self, session_id: int, title: str) -> dict[str, Any]:
         self.visited_pages.add(self.page)
-        view = discord.ui.View()
+        # Every component is routed by its custom ID, so the view keeps nothing
+        # alive once the message is sent.
+        view = discord.ui.View(timeout=None)
         for item in self.get_items(self.candidates_on_page(), session_id):
             view.add_item(item)
         if self.page > 0:
-            view.add_item(PrevPageButton())
+            view.add_item(
+                self.component(
+                    discord.ui.Button(
+                        style=discord.ButtonStyle.primary, label="Prev Page", row=4
+                    ),
+                    session_id,
+                    "prev",
+                )
+            )
         if self.submittable() and len(self.visited_pages) >= self.total_pages():
-            view.add_item(SubmitButton())
+            view.add_item(
+                self.component(
+                    discord.ui.Button(
+                        style=discord.ButtonStyle.green, label="Submit Vote", row=4
+                    ),
+                    session_id,
+                    "submit",
+                )
+            )
         if self.page < self.total_pages() - 1:
-            view.add_item(NextPageButton())
-        view.add_item(ResetButton())
-
-        # Load election for title
-        from election import load_election_from_db
-
-        election = load_election_from_db(self.election_id)
+            view.add_item(
+                self.component(
+                    discord.ui.Button(
+                        style=discord.ButtonStyle.primary, label="Next Page", row=4
+                    ),
+                    session_id,
+                    "next",
+                )
+            )
+        view.add_item(
+            self.component(
+                discord.ui.Button(
+                    style=discord.ButtonStyle.danger, label="Start Over", row=4
+                ),
+                session_id,
+                "reset",
+            )
+        )
 
-        embed = discord.Embed(
-            title=election.title, description=self.instructions
-        ).add_field(name="Current vote", value=self.to_markdown(), inline=False)
+        embed = discord.Embed(title=title, description=self.instructions).add_field(
+            name="Current vote", value=self.to_markdown(), inline=False
+        )
         if self.total_pages() > 1:
             embed.set_footer(text=f"Page {self.page + 1}/{self.total_pages()}")
 
@@ -138,24 +153,6 @@ class Ballot(abc.ABC):
             "view": view,
         }
 
-    async def modify(
-        self,
-        modification: Callable[[], None],
-        interaction: discord.Interaction,
-        session_id: int,
-    ) -> None:
-        from election import load_election_from_db
-
-        election = load_election_from_db(self.election_id)
-
-        if election and await election.check_session(interaction, session_id):
-            modification()
-            # Save modified ballot to database
-            db.save_ballot(
-                self, self.election_id, interaction.user.id, is_submitted=False
-            )
-            await interaction.response.edit_message(**self.render_interim(session_id))
-
     def render_submitted(self) -> dict[str, Any]:
         embed = discord.Embed(title="Vote Submitted").add_field(
             name="Your ballot:",
@@ -181,6 +178,15 @@ class Ballot(abc.ABC):
         """Return a list of discord.Item objects for a page of candidates."""
         pass
 
+    @abc.abstractmethod
+    def apply_vote(self, action: str, index: int | None, values: list[str]) -> None:
+        """Apply the action of a component returned by get_items().
+
+        `index` is the one given to component(): for a single candidate's
+        component, the candidate's index in self.candidates.
+        """
+        pass
+
     @abc.abstractmethod
     def submittable(self) -> bool:
         """Determines if the ballot is complete enough to submit."""
@@ -207,3 +213,77 @@ class Ballot(abc.ABC):
     def from_dict(cls, ballot_dict: dict[str, Any], election_id: int) -> "Ballot":
         """Reconstruct ballot from database dictionary."""
         pass
+
+
+class BallotComponent(
+    discord.ui.DynamicItem[discord.ui.Item],
+    template=(
+        r"ballot:(?P<election_id>\d+):(?P<session_id>\d+):(?P<action>[a-z]+)"
+        r"(?::(?P<index>\d+))?"
+    ),
+):
+    """A button or select on a ballot.
+
+    Its custom ID holds the election, the ballot session, the action and the
+    candidate index, if any.  The voter's ballot is loaded from the database
+    when it is clicked, so no ballot objects are kept between clicks, and,
+    once registered with Client.add_dynamic_items(), ballots keep working
+    after the bot restarts.
+    """
+
+    def __init__(
+        self,
+        item: discord.ui.Item,
+        election_id: int,
+        session_id: int,
+        action: str,
+        index: int | None = None,
+    ):
+        custom_id = f"ballot:{election_id}:{session_id}:{action}"
+        if index is not None:
+            custom_id += f":{index}"
+        item.custom_id = custom_id
+        super().__init__(item)
+        self.election_id = election_id
+        self.session_id = session_id
+        self.action = action
+        self.index = index
+
+    @classmethod
+    async def from_custom_id(
+        cls,
+        interaction: discord.Interaction,
+        item: discord.ui.Item,
+        match: re.Match[str],
+    ) -> "BallotComponent":
+        index = match["index"]
+        return cls(
+            item,
+            int(match["election_id"]),
+            int(match["session_id"]),
+            match["action"],
+            int(index) if index is not None else None,
+        )
+
+    async def callback(self, interaction: discord.Interaction):
+        from election import ballot_from_dict, load_election_from_db_async
+
+        election = await load_election_from_db_async(self.election_id)
+        if not election:
+            return
+        ballot_data = await election.check_session(interaction, self.session_id)
+        if ballot_data is None:
+            return
+        if self.action == "submit":
+            await election.submit_ballot(interaction)
+            return
+
+        ballot = ballot_from_dict(ballot_data, self.election_id)
+        ballot.apply(self.action, self.index, getattr(self.item, "values", []))
+        # Save modified ballot; the database write is deferred
+        await async_db.save_interim_ballot(
+            ballot, self.election_id, interaction.user.id
+        )
+        await interaction.response.edit_message(
+            **ballot.render_interim(self.session_id, election.title)
+        )
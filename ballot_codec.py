@@ -0,0 +1,227 @@
+"""Compact binary encoding of ballot data for database storage.
+
+Ballots are stored relative to their election's candidate list, so candidates
+are referenced by small-integer index rather than by name.  The layout is:
+
+    version | kind | flags | number of candidates
+    shuffle:  the ballot's candidate order, as a permutation rank (Lehmer code)
+    votes:    kind-specific vote data
+    UI state: current page and visited pages (only if FLAG_UI is set)
+
+Submitted ballots are stored without UI state.  Ballots that cannot be encoded
+(an unknown ballot type, or names that aren't candidates) are left to the
+caller to store as JSON, which decode() callers must still accept.
+"""
+
+import math
+from typing import Any, Callable
+import votes
+
+CODEC_VERSION = 1
+
+# Encoding is limited to one byte per candidate index.
+MAX_CANDIDATES = 255
+
+FLAG_UI = 0x01
+FLAG_MULTIPLE_VOTES = 0x02
+
+KIND_RANKED = 1
+KIND_SCORE = 2
+KIND_SIMPLE = 3
+
+# Ratings are packed two to a byte; this nibble marks an unrated candidate.
+UNRATED = 0xF
+
+
+class _Reader:
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self.pos = 0
+
+    def take(self, n: int) -> bytes:
+        if self.pos + n > len(self.raw):
+            raise ValueError("Truncated ballot data.")
+        chunk = self.raw[self.pos : self.pos + n]
+        self.pos += n
+        return chunk
+
+    def byte(self) -> int:
+        return self.take(1)[0]
+
+
+def _bitmask_size(n: int) -> int:
+    return (n + 7) // 8
+
+
+def _encode_bitmask(indices, n: int) -> bytes:
+    mask = 0
+    for i in indices:
+        mask |= 1 << i
+    return mask.to_bytes(_bitmask_size(n), "little")
+
+
+def _decode_bitmask(raw: bytes) -> list[int]:
+    mask = int.from_bytes(raw, "little")
+    return [i for i in range(len(raw) * 8) if mask >> i & 1]
+
+
+def _permutation_size(n: int) -> int:
+    return ((math.factorial(n) - 1).bit_length() + 7) // 8
+
+
+def permutation_rank(perm: list[int]) -> int:
+    """Return the lexicographic rank of a permutation of range(len(perm))."""
+    remaining = sorted(perm)
+    rank = 0
+    for i, x in enumerate(perm):
+        pos = remaining.index(x)
+        rank += pos * math.factorial(len(perm) - 1 - i)
+        remaining.pop(pos)
+    return rank
+
+
+def permutation_unrank(rank: int, n: int) -> list[int]:
+    """Inverse of permutation_rank."""
+    remaining = list(range(n))
+    perm = []
+    for i in range(n):
+        pos, rank = divmod(rank, math.factorial(n - 1 - i))
+        perm.append(remaining.pop(pos))
+    return perm
+
+
+def _encode_ranked(data, index, flags):
+    ranking = [index[c] for c in data["ranking"]]
+    return bytes([len(ranking)] + ranking), flags
+
+
+def _decode_ranked(reader, candidates, flags):
+    n = reader.byte()
+    return {"ranking": [candidates[i] for i in reader.take(n)]}
+
+
+def _encode_score(data, index, flags):
+    nibbles = [UNRATED] * len(index)
+    for c, rating in data["ratings"].items():
+        if not 0 <= rating < UNRATED:
+            raise ValueError(f"Rating out of range: {rating}")
+        nibbles[index[c]] = rating
+    if len(nibbles) % 2:
+        nibbles.append(UNRATED)
+    packed = bytes(nibbles[i] | nibbles[i + 1] << 4 for i in range(0, len(nibbles), 2))
+    return packed, flags
+
+
+def _decode_score(reader, candidates, flags):
+    packed = reader.take((len(candidates) + 1) // 2)
+    ratings = {}
+    for i, c in enumerate(candidates):
+        rating = packed[i // 2] >> (4 * (i % 2)) & 0xF
+        if rating != UNRATED:
+            ratings[c] = rating
+    return {"ratings": ratings}
+
+
+def _encode_simple(data, index, flags):
+    if data["multiple_votes"]:
+        flags |= FLAG_MULTIPLE_VOTES
+    return _encode_bitmask((index[c] for c in data["votes"]), len(index)), flags
+
+
+def _decode_simple(reader, candidates, flags):
+    votes = _decode_bitmask(reader.take(_bitmask_size(len(candidates))))
+    return {
+        "votes": [candidates[i] for i in votes],
+        "multiple_votes": bool(flags & FLAG_MULTIPLE_VOTES),
+    }
+
+
+_KINDS: dict[str, tuple[int, Callable, Callable]] = {
+    "ballots.ranked.RankedBallot": (KIND_RANKED, _encode_ranked, _decode_ranked),
+    "ballots.score.ScoreBallot": (KIND_SCORE, _encode_score, _decode_score),
+    "ballots.simple.SimpleBallot": (KIND_SIMPLE, _encode_simple, _decode_simple),
+}
+_DECODERS: dict[int, Callable] = {kind: dec for kind, _, dec in _KINDS.values()}
+
+
+def encode(
+    ballot_type: str, data: dict[str, Any], candidates: list[str], include_ui: bool
+) -> bytes | None:
+    """Encode the result of a ballot's to_dict().
+
+    Returns None if this ballot can't be encoded compactly.
+    """
+    if ballot_type not in _KINDS or len(candidates) > MAX_CANDIDATES:
+        return None
+    kind, encode_votes, _ = _KINDS[ballot_type]
+    index = {c: i for i, c in enumerate(candidates)}
+
+    try:
+        shuffle = [index[c] for c in data["candidates"]]
+        if sorted(shuffle) != list(range(len(candidates))):
+            return None
+        flags = FLAG_UI if include_ui else 0
+        votes, flags = encode_votes(data, index, flags)
+        parts = [
+            bytes([CODEC_VERSION, kind, flags, len(candidates)]),
+            permutation_rank(shuffle).to_bytes(
+                _permutation_size(len(candidates)), "little"
+            ),
+            votes,
+        ]
+        if include_ui:
+            parts.append(bytes([data["page"]]))
+            parts.append(_encode_bitmask(data["visited_pages"], len(candidates)))
+    except (KeyError, ValueError):
+        return None
+    return b"".join(parts)
+
+
+def _read_header(reader: _Reader, num_candidates: int) -> tuple[int, int, int]:
+    version, kind, flags, n = reader.take(4)
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported ballot encoding version {version}.")
+    if n != num_candidates:
+        raise ValueError("Ballot does not match the election's candidates.")
+    if kind not in _DECODERS:
+        raise ValueError(f"Unknown ballot kind {kind}.")
+    return kind, flags, n
+
+
+def decode(raw: bytes, candidates: list[str]) -> dict[str, Any]:
+    """Decode ballot data written by encode().
+
+    The result has the same keys as the ballot's to_dict(), except for
+    session_id, and for "page" and "visited_pages" if no UI state was stored.
+    """
+    reader = _Reader(raw)
+    kind, flags, n = _read_header(reader, len(candidates))
+    rank = int.from_bytes(reader.take(_permutation_size(n)), "little")
+    data = _DECODERS[kind](reader, candidates, flags)
+    data["candidates"] = [candidates[i] for i in permutation_unrank(rank, n)]
+    if flags & FLAG_UI:
+        data["page"] = reader.byte()
+        data["visited_pages"] = _decode_bitmask(reader.take(_bitmask_size(n)))
+    return data
+
+
+def decode_record(raw: bytes, num_candidates: int) -> votes.Record:
+    """Decode only the votes from ballot data written by encode().
+
+    The result is a compact record for tabulation, built without looking up
+    candidate names, and skipping the candidate order and UI state.
+    """
+    reader = _Reader(raw)
+    kind, flags, n = _read_header(reader, num_candidates)
+    reader.take(_permutation_size(n))
+    if kind == KIND_RANKED:
+        return votes.RankedVote(reader.take(reader.byte()))
+    elif kind == KIND_SCORE:
+        packed = reader.take((n + 1) // 2)
+        ratings = bytearray(n)
+        for i in range(n):
+            rating = packed[i // 2] >> (4 * (i % 2)) & 0xF
+            ratings[i] = votes.UNRATED if rating == UNRATED else rating
+        return votes.RatedVote(bytes(ratings))
+    else:
+        return votes.ChoiceVote(bytes(_decode_bitmask(reader.take(_bitmask_size(n)))))
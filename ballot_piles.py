@@ -0,0 +1,156 @@
+"""Ranked ballots grouped by current choice, for elimination-style counts.
+
+STV and Tideman's alternative method both repeatedly remove candidates and
+pass their ballots on to each ballot's next active choice.  BallotPiles does
+this by moving only the removed candidate's ballots.  Vote values are kept in
+one of the arithmetic types below.
+"""
+
+from fractions import Fraction
+from typing import Any, Iterable
+import votes
+
+
+class ExactArithmetic:
+    """Vote weights as exact fractions."""
+
+    def __init__(self):
+        self.zero = Fraction(0)
+
+    def from_int(self, n: int) -> Fraction:
+        return Fraction(n)
+
+    def divide(self, value: Fraction, n: int) -> Fraction:
+        return value / n
+
+    def scale(self, value: Fraction, num: Fraction, den: Fraction) -> Fraction:
+        return value * num / den
+
+    def to_float(self, value: Fraction) -> float:
+        return float(value)
+
+
+class FloatArithmetic:
+    """Vote weights as floating-point numbers."""
+
+    zero = 0.0
+
+    def from_int(self, n: int) -> float:
+        return float(n)
+
+    def divide(self, value: float, n: int) -> float:
+        return value / n
+
+    def scale(self, value: float, num: float, den: float) -> float:
+        return value * num / den
+
+    def to_float(self, value: float) -> float:
+        return value
+
+
+class FixedPointArithmetic:
+    """Vote weights with a fixed number of decimal places, rounding down.
+
+    Values are stored as integers counting units of 10^-places.
+    """
+
+    zero = 0
+
+    def __init__(self, places: int):
+        self.unit = 10**places
+
+    def from_int(self, n: int) -> int:
+        return n * self.unit
+
+    def divide(self, value: int, n: int) -> int:
+        return value // n
+
+    def scale(self, value: int, num: int, den: int) -> int:
+        return value * num // den
+
+    def to_float(self, value: int) -> float:
+        return value / self.unit
+
+
+Arithmetic = ExactArithmetic | FloatArithmetic | FixedPointArithmetic
+
+# Whole votes, for counts that never split a ballot.
+WHOLE_VOTES = FixedPointArithmetic(0)
+
+
+class BallotPiles:
+    """Ranked ballots, each filed under its highest-ranked active candidate.
+
+    Identical rankings are combined and stored as compact byte strings, with a
+    count, a pointer to their current choice, and the current value of each
+    of those votes.  Removing a candidate only touches the ballots in that
+    candidate's pile: each pointer advances to the next active candidate and
+    the ballot moves to that pile, or is exhausted.
+
+    Ballots only take a few distinct values (one for each surplus transfer
+    they have been through), so values are kept in a table, each ballot holds
+    an index into it, and totals are added up per value.
+    """
+
+    def __init__(
+        self,
+        ballots: Iterable[Any],
+        candidates: list[str],
+        arithmetic: Arithmetic = WHOLE_VOTES,
+    ):
+        self.arithmetic = arithmetic
+        self.active = [True] * len(candidates)
+        self.piles: list[list[int]] = [[] for _ in candidates]
+        self.totals = [arithmetic.zero] * len(candidates)
+        self.exhausted = arithmetic.zero
+
+        profile = votes.ranked_profile(ballots, candidates)
+        self.rankings = list(profile.counts)
+        self.counts = list(profile.counts.values())
+        self.pointers = [0] * len(self.rankings)
+        self.value_table = [arithmetic.from_int(1)]
+        self.values = [0] * len(self.rankings)
+        for b, ranking in enumerate(self.rankings):
+            if ranking:
+                self.piles[ranking[0]].append(b)
+            else:
+                self.exhausted += self.value_table[0] * self.counts[b]
+        for c, pile in enumerate(self.piles):
+            self.totals[c] = self.value_table[0] * sum(self.counts[b] for b in pile)
+
+    def remove(self, c: int, num=None, den=None) -> None:
+        """Remove candidate c and pass its ballots on to their next choices.
+
+        If num and den are given, the ballots keep num / den of their value.
+        """
+        self.active[c] = False
+        pile, self.piles[c] = self.piles[c], []
+        self.totals[c] = self.arithmetic.zero
+        scaled: dict[int, int] = {}
+        # Votes moved, by destination (None if exhausted) and value.
+        moved: dict[tuple[int | None, int], int] = {}
+        for b in pile:
+            value = self.values[b]
+            if num is not None:
+                if value not in scaled:
+                    scaled[value] = len(self.value_table)
+                    self.value_table.append(
+                        self.arithmetic.scale(self.value_table[value], num, den)
+                    )
+                value = self.values[b] = scaled[value]
+            ranking = self.rankings[b]
+            pointer = self.pointers[b] + 1
+            while pointer < len(ranking) and not self.active[ranking[pointer]]:
+                pointer += 1
+            self.pointers[b] = pointer
+            if pointer < len(ranking):
+                dest = ranking[pointer]
+                self.piles[dest].append(b)
+            else:
+                dest = None
+            moved[dest, value] = moved.get((dest, value), 0) + self.counts[b]
+        for (dest, value), count in moved.items():
+            if dest is None:
+                self.exhausted += self.value_table[value] * count
+            else:
+                self.totals[dest] += self.value_table[value] * count
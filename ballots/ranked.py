@@ -33,34 +33,39 @@ class RankedBallot(Ballot):
         self, candidates: list[str], session_id: int
     ) -> list[discord.ui.Item]:
         remaining_candidates = [c for c in candidates if c not in self.ranking]
+        place = len(self.ranking) + 1
+        partial = len(remaining_candidates) > 25
 
-        class CandidateSelect(discord.ui.Select):
-            def __init__(inner_self, candidates: list[str], partial: bool):
-                place = len(self.ranking) + 1
-                range = f" ({candidates[0]} - {candidates[-1]})" if partial else ""
-                options = [
-                    discord.SelectOption(label=c, description=f"Rank {c} as #{place}")
-                    for c in candidates
-                ]
-                super().__init__(
-                    placeholder=f"Select a candidate to rank #{place}...{range}",
-                    options=options,
-                )
-
-            async def callback(inner_self, interaction: discord.Interaction):
-                def modification():
-                    self.ranking.append(inner_self.values[0])
-
-                await self.modify(modification, interaction, session_id)
-
-        options = []
+        selects = []
         for i in range(0, len(remaining_candidates), 25):
-            if remaining_candidates:
-                partial = i > 0 or len(remaining_candidates) > 25
-                options.append(
-                    CandidateSelect(remaining_candidates[i : i + 25], partial)
+            chunk = remaining_candidates[i : i + 25]
+            span = f" ({chunk[0]} - {chunk[-1]})" if partial else ""
+            options = [
+                discord.SelectOption(
+                    label=c,
+                    value=str(self.candidates.index(c)),
+                    description=f"Rank {c} as #{place}",
+                )
+                for c in chunk
+            ]
+            selects.append(
+                self.component(
+                    discord.ui.Select(
+                        placeholder=f"Select a candidate to rank #{place}...{span}",
+                        options=options,
+                    ),
+                    session_id,
+                    "rank",
+                    # Custom IDs must differ between the selects
+                    len(selects),
                 )
-        return options
+            )
+        return selects
+
+    def apply_vote(self, action: str, index: int | None, values: list[str]) -> None:
+        candidate = self.candidates[int(values[0])]
+        if candidate not in self.ranking:
+            self.ranking.append(candidate)
 
     def submittable(self) -> bool:
         return bool(self.ranking)
@@ -91,8 +96,7 @@ class RankedBallot(Ballot):
             ballot_id=ballot_dict["ballot_id"],
         )
         ballot.ranking = data["ranking"]
-        ballot.page = data["page"]
-        ballot.visited_pages = set(data["visited_pages"])
+        ballot.restore_ui_state(data)
         ballot.session_id = ballot_dict["session_id"]
 
         return ballot
@@ -34,28 +34,28 @@ class ScoreBallot(Ballot):
 
     def get_items(
         self, candidates: list[str], session_id: int
-    ) -> dict[discord.ui.Item]:
-        class CandidateSelect(discord.ui.Select):
-            def __init__(inner_self, candidate: str):
-                super().__init__(
-                    placeholder=f"{candidate}: {stars(self.ratings.get(candidate, 0))}",
+    ) -> list[discord.ui.Item]:
+        return [
+            self.component(
+                discord.ui.Select(
+                    placeholder=f"{c}: {stars(self.ratings.get(c, 0))}",
                     options=[
                         discord.SelectOption(
                             value=str(i),
-                            label=f"{candidate}: {stars(i)}",
+                            label=f"{c}: {stars(i)}",
                         )
                         for i in range(6)
                     ],
-                )
-                inner_self.candidate: str = candidate
+                ),
+                session_id,
+                "rate",
+                self.candidates.index(c),
+            )
+            for c in candidates
+        ]
 
-            async def callback(inner_self, interaction: discord.Interaction):
-                def modification():
-                    self.ratings[inner_self.candidate] = int(inner_self.values[0])
-
-                await self.modify(modification, interaction, session_id)
-
-        return [CandidateSelect(c) for c in candidates]
+    def apply_vote(self, action: str, index: int | None, values: list[str]) -> None:
+        self.ratings[self.candidates[index]] = int(values[0])
 
     def submittable(self) -> bool:
         return bool(self.ratings)
@@ -85,8 +85,7 @@ class ScoreBallot(Ballot):
             ballot_id=ballot_dict["ballot_id"],
         )
         ballot.ratings = data["ratings"]
-        ballot.page = data["page"]
-        ballot.visited_pages = set(data["visited_pages"])
+        ballot.restore_ui_state(data)
         ballot.session_id = ballot_dict["session_id"]
 
         return ballot
@@ -39,33 +39,31 @@ class SimpleBallot(Ballot):
     def get_items(
         self, candidates: list[str], session_id: int
     ) -> list[discord.ui.Item]:
-        class VoteButton(discord.ui.Button):
-            def __init__(
-                inner_self,
-                candidate: str,
-            ):
-                super().__init__(
+        return [
+            self.component(
+                discord.ui.Button(
                     style=(
                         discord.ButtonStyle.primary
-                        if candidate in self.votes
+                        if c in self.votes
                         else discord.ButtonStyle.gray
                     ),
-                    label=candidate,
-                )
-                inner_self.candidate: str = candidate
+                    label=c,
+                ),
+                session_id,
+                "vote",
+                self.candidates.index(c),
+            )
+            for c in candidates
+        ]
 
-            async def callback(inner_self, interaction: discord.Interaction):
-                def modification():
-                    if inner_self.candidate in self.votes:
-                        self.votes.remove(inner_self.candidate)
-                    elif self.multiple_votes:
-                        self.votes.add(inner_self.candidate)
-                    else:
-                        self.votes = {inner_self.candidate}
-
-                await self.modify(modification, interaction, session_id)
-
-        return [VoteButton(c) for c in candidates]
+    def apply_vote(self, action: str, index: int | None, values: list[str]) -> None:
+        candidate = self.candidates[index]
+        if candidate in self.votes:
+            self.votes.remove(candidate)
+        elif self.multiple_votes:
+            self.votes.add(candidate)
+        else:
+            self.votes = {candidate}
 
     def submittable(self) -> bool:
         return bool(self.votes)
@@ -94,8 +92,7 @@ class SimpleBallot(Ballot):
             ballot_id=ballot_dict["ballot_id"],
         )
         ballot.votes = set(data["votes"])
-        ballot.page = data["page"]
-        ballot.visited_pages = set(data["visited_pages"])
+        ballot.restore_ui_state(data)
         ballot.session_id = ballot_dict["session_id"]
 
         return ballot
@@ -1,11 +1,16 @@
 import os
 import discord
+from discord.ext import tasks
 import dotenv
-from election import set_client
+from ballot import BallotComponent
+from election import VoteButton
 import methods
+import async_db
 import db
 import electable
+import messages
 import election_checker
+import tabulation
 
 dotenv.load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
@@ -14,8 +19,12 @@ intents = discord.Intents.default()
 client = discord.Client(intents=intents)
 tree = discord.app_commands.CommandTree(client)
 
-# Set client reference for election.py to use
-set_client(client)
+# Set client reference for messages.py to use
+messages.set_client(client)
+
+# Route Vote button clicks on every election message, old and new, and
+# ballot clicks by the session in their custom IDs
+client.add_dynamic_items(VoteButton, BallotComponent)
 
 method_choices = [
     discord.app_commands.Choice(name=name, value=name) for name in methods.NAMED_METHODS
@@ -25,38 +34,56 @@ method_choices = [
 @client.event
 async def on_ready():
     # Initialize database
-    db.init_db()
+    await async_db.init_db()
 
     # Set client reference for election_checker to use
     election_checker.set_client(client)
 
-    # Re-attach Vote buttons to existing elections
-    from election import load_election_from_db
+    # Vote buttons are persistent, except on messages sent before they were,
+    # which are given one once.
+    from election import election_from_data
 
-    elections = db.load_all_elections()
+    elections = await async_db.load_elections_with_legacy_view()
     for election_data in elections:
-        election = load_election_from_db(election_data["election_id"])
-        if election.message_id:
-            channel = client.get_channel(election.channel_id)
-            if channel:
-                try:
-                    message = await channel.fetch_message(election.message_id)
-                    await message.edit(**election.get_public_view())
-                except discord.NotFound:
-                    pass
-
-    # Start background task for checking expired elections
-    if not election_checker.check_expired_elections.is_running():
-        election_checker.check_expired_elections.start()
+        election = election_from_data(election_data)
+        try:
+            await messages.edit(
+                election.channel_id,
+                election.message_id,
+                **await election.get_public_view(),
+            )
+        except discord.NotFound:
+            pass
+        await async_db.mark_view_upgraded(election.election_id)
+
+    # End elections at their end times
+    await election_checker.start()
+
+    if not flush_interim_ballots.is_running():
+        flush_interim_ballots.start()
 
     await tree.sync()
     print(f"{client.user} has connected to Discord!")
 
 
+@tasks.loop(seconds=db.INTERIM_FLUSH_SECONDS)
+async def flush_interim_ballots():
+    """Periodically write buffered interim ballots to the database."""
+    await async_db.flush_interim_ballots()
+
+
 @tree.command(name="electable", description="Manage your elections.")
 async def electable_command(interaction: discord.Interaction):
     """Unified command for managing elections."""
     await electable.show_electable(interaction)
 
 
-client.run(TOKEN)
+# Tabulation workers import this module afresh, and mustn't start the bot.
+if __name__ == "__main__":
+    client.run(TOKEN)
+
+    # client.run() returns once the bot has shut down
+    tabulation.shutdown()
+    async_db.shutdown()
+    db.flush_interim_ballots()
+    db.close_pool()
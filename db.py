@@ -1,128 +1,337 @@
+import io
 import sqlite3
 import json
+import queue
+import threading
 import time
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator
+from collections import OrderedDict
 from contextlib import contextmanager
+import numpy as np
+import ballot_codec
+import votes
 
 DB_PATH = "votebot.db"
 
+# Connection pool defaults.  These can be changed with configure_pool().
+POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
 
-def get_connection():
-    """Get a database connection.
+# How often buffered interim ballots are written to the database.
+INTERIM_FLUSH_SECONDS = 5
 
-    Creates a new connection each time to avoid threading issues.
-    SQLite connections are lightweight enough for this approach.
+# Number of rows fetched at a time when streaming ballots for tabulation.
+BALLOT_CHUNK_SIZE = 1000
+
+# Candidate lists are needed to encode and decode ballots, so the lists for
+# recently used elections are kept in memory.
+CANDIDATES_CACHE_SIZE = 1024
+_candidates_cache: OrderedDict[int, list[str]] = OrderedDict()
+_candidates_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """A bounded pool of long-lived SQLite connections.
+
+    Connections are opened lazily, configured once, and then handed out again
+    and again, so a database call costs a queue operation rather than a fresh
+    connect plus pragmas.  Each connection keeps its own cache of prepared
+    statements, so the fixed set of queries in this module is only parsed once
+    per connection.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
-    conn.row_factory = sqlite3.Row
-    return conn
+
+    def __init__(
+        self,
+        path: str,
+        size: int = POOL_SIZE,
+        busy_timeout_ms: int = BUSY_TIMEOUT_MS,
+        cached_statements: int = STATEMENT_CACHE_SIZE,
+    ):
+        if size < 1:
+            raise ValueError("Connection pool size must be at least 1.")
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._available = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check out a connection, blocking if all of them are in use."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed.")
+        self._available.acquire()
+        try:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+        except Exception:
+            self._available.release()
+            raise
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the pool, discarding any uncommitted work."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+        finally:
+            self._available.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Close all idle connections.  Checked-out ones close when released."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool: ConnectionPool | None = None
+_pool_settings: dict[str, int] = {}
+_pool_lock = threading.Lock()
+
+
+def configure_pool(
+    size: int = POOL_SIZE,
+    busy_timeout_ms: int = BUSY_TIMEOUT_MS,
+    cached_statements: int = STATEMENT_CACHE_SIZE,
+) -> None:
+    """Set connection pool parameters.  Any existing pool is closed."""
+    global _pool_settings
+    with _pool_lock:
+        _pool_settings = {
+            "size": size,
+            "busy_timeout_ms": busy_timeout_ms,
+            "cached_statements": cached_statements,
+        }
+    close_pool()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the shared connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_PATH, **_pool_settings)
+        return _pool
+
+
+def close_pool() -> None:
+    """Close the shared connection pool.  Call this at shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+@contextmanager
+def connection() -> Iterator[sqlite3.Connection]:
+    """Borrow a pooled database connection for the duration of a block."""
+    with get_pool().connection() as conn:
+        yield conn
 
 
 @contextmanager
 def transaction():
     """Context manager for database transactions."""
-    conn = get_connection()
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    with connection() as conn:
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
 
 def init_db():
     """Initialize the database schema."""
-    conn = get_connection()
-
-    conn.execute(
+    with transaction() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS elections (
+                election_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                method_class TEXT NOT NULL,
+                method_params TEXT NOT NULL,
+                candidates TEXT NOT NULL,
+                open INTEGER NOT NULL,
+                message_id INTEGER,
+                creator_id INTEGER NOT NULL DEFAULT 0,
+                end_timestamp INTEGER,
+                vote_count INTEGER NOT NULL DEFAULT 0,
+                tally BLOB,
+                ballot_revision INTEGER NOT NULL DEFAULT 0,
+                legacy_view INTEGER NOT NULL DEFAULT 0,
+                UNIQUE(channel_id, title)
+            )
         """
-        CREATE TABLE IF NOT EXISTS elections (
-            election_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            channel_id INTEGER NOT NULL,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL,
-            method_class TEXT NOT NULL,
-            method_params TEXT NOT NULL,
-            candidates TEXT NOT NULL,
-            open INTEGER NOT NULL,
-            message_id INTEGER,
-            creator_id INTEGER NOT NULL DEFAULT 0,
-            end_timestamp INTEGER,
-            UNIQUE(channel_id, title)
         )
-    """
-    )
 
-    # Migrate existing databases: add new columns if they don't exist
-    try:
-        # Check if creator_id column exists
-        cursor = conn.execute("PRAGMA table_info(elections)")
-        columns = [row[1] for row in cursor.fetchall()]
+        # Migrate existing databases: add new columns if they don't exist
+        try:
+            # Check if creator_id column exists
+            cursor = conn.execute("PRAGMA table_info(elections)")
+            columns = [row[1] for row in cursor.fetchall()]
+
+            if "creator_id" not in columns:
+                print("Migrating database: adding creator_id column...")
+                conn.execute(
+                    "ALTER TABLE elections ADD COLUMN creator_id INTEGER NOT NULL DEFAULT 0"
+                )
+                print("✓ Added creator_id column")
+
+            if "end_timestamp" not in columns:
+                print("Migrating database: adding end_timestamp column...")
+                conn.execute("ALTER TABLE elections ADD COLUMN end_timestamp INTEGER")
+                print("✓ Added end_timestamp column")
+
+            if "vote_count" not in columns:
+                print("Migrating database: adding vote_count column...")
+                conn.execute(
+                    "ALTER TABLE elections ADD COLUMN vote_count INTEGER NOT NULL DEFAULT 0"
+                )
+                conn.execute(
+                    """
+                    UPDATE elections SET vote_count = (
+                        SELECT COUNT(*) FROM ballots
+                        WHERE ballots.election_id = elections.election_id
+                        AND ballots.is_submitted = 1
+                    )
+                    """
+                )
+                print("✓ Added vote_count column")
+
+            if "tally" not in columns:
+                # Left empty for elections that already have ballots, which
+                # are tabulated by reading them all as before.
+                print("Migrating database: adding tally column...")
+                conn.execute("ALTER TABLE elections ADD COLUMN tally BLOB")
+                print("✓ Added tally column")
+
+            if "ballot_revision" not in columns:
+                print("Migrating database: adding ballot_revision column...")
+                conn.execute(
+                    "ALTER TABLE elections ADD COLUMN ballot_revision INTEGER NOT NULL DEFAULT 0"
+                )
+                print("✓ Added ballot_revision column")
+
+            if "legacy_view" not in columns:
+                # Messages sent before Vote buttons were persistent need one
+                # more edit to get a button that survives restarts.
+                print("Migrating database: adding legacy_view column...")
+                conn.execute(
+                    "ALTER TABLE elections ADD COLUMN legacy_view INTEGER NOT NULL DEFAULT 0"
+                )
+                conn.execute(
+                    "UPDATE elections SET legacy_view = 1 WHERE message_id IS NOT NULL"
+                )
+                print("✓ Added legacy_view column")
+        except Exception as e:
+            print(f"Migration check failed (this is OK for new databases): {e}")
 
-        if "creator_id" not in columns:
-            print("Migrating database: adding creator_id column...")
-            conn.execute(
-                "ALTER TABLE elections ADD COLUMN creator_id INTEGER NOT NULL DEFAULT 0"
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ballots (
+                ballot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                election_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                ballot_type TEXT NOT NULL,
+                ballot_data TEXT NOT NULL,
+                is_submitted INTEGER NOT NULL,
+                session_id INTEGER,
+                UNIQUE(election_id, user_id, is_submitted),
+                FOREIGN KEY (election_id) REFERENCES elections(election_id) ON DELETE CASCADE
             )
-            print("✓ Added creator_id column")
+        """
+        )
 
-        if "end_timestamp" not in columns:
-            print("Migrating database: adding end_timestamp column...")
-            conn.execute("ALTER TABLE elections ADD COLUMN end_timestamp INTEGER")
-            print("✓ Added end_timestamp column")
-    except Exception as e:
-        print(f"Migration check failed (this is OK for new databases): {e}")
+        # Ballot data used to be JSON that included the session ID.  Existing
+        # JSON ballots still load, and get the new column when next written.
+        cursor = conn.execute("PRAGMA table_info(ballots)")
+        if "session_id" not in [row[1] for row in cursor.fetchall()]:
+            print("Migrating database: adding ballots.session_id column...")
+            conn.execute("ALTER TABLE ballots ADD COLUMN session_id INTEGER")
+            print("✓ Added ballots.session_id column")
 
-    conn.execute(
+        # Create indices for better query performance
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_elections_channel_title
+            ON elections(channel_id, title)
         """
-        CREATE TABLE IF NOT EXISTS ballots (
-            ballot_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            election_id INTEGER NOT NULL,
-            user_id INTEGER NOT NULL,
-            ballot_type TEXT NOT NULL,
-            ballot_data TEXT NOT NULL,
-            is_submitted INTEGER NOT NULL,
-            UNIQUE(election_id, user_id, is_submitted),
-            FOREIGN KEY (election_id) REFERENCES elections(election_id) ON DELETE CASCADE
         )
-    """
-    )
 
-    # Create indices for better query performance
-    conn.execute(
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_ballots_election_user
+            ON ballots(election_id, user_id, is_submitted)
         """
-        CREATE INDEX IF NOT EXISTS idx_elections_channel_title
-        ON elections(channel_id, title)
-    """
-    )
+        )
 
-    conn.execute(
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_elections_end_timestamp
+            ON elections(end_timestamp) WHERE open=1 AND end_timestamp IS NOT NULL
         """
-        CREATE INDEX IF NOT EXISTS idx_ballots_election_user
-        ON ballots(election_id, user_id, is_submitted)
-    """
-    )
+        )
 
-    conn.execute(
-        """
-        CREATE INDEX IF NOT EXISTS idx_elections_end_timestamp
-        ON elections(end_timestamp) WHERE open=1 AND end_timestamp IS NOT NULL
-    """
-    )
 
-    conn.commit()
-    conn.close()
+def _election_from_row(row: sqlite3.Row) -> dict[str, Any]:
+    candidates = json.loads(row["candidates"])
+    _cache_candidates(row["election_id"], candidates)
+    return {
+        "election_id": row["election_id"],
+        "channel_id": row["channel_id"],
+        "title": row["title"],
+        "description": row["description"],
+        "method_class": row["method_class"],
+        "method_params": json.loads(row["method_params"]),
+        "candidates": list(candidates),
+        "open": bool(row["open"]),
+        "message_id": row["message_id"],
+        "creator_id": row["creator_id"],
+        "end_timestamp": row["end_timestamp"],
+        "vote_count": row["vote_count"],
+    }
 
 
 def save_election(election: Any) -> int:
     """Save an election to the database. Returns election_id."""
-    conn = get_connection()
-
-    try:
+    with connection() as conn:
         data = (
             election.channel_id,
             election.title,
@@ -149,6 +358,7 @@ def save_election(election: Any) -> int:
             )
             conn.commit()
             election.election_id = cursor.lastrowid
+            _cache_candidates(election.election_id, list(election.candidates))
             return cursor.lastrowid
         else:
             # Update existing election
@@ -163,15 +373,13 @@ def save_election(election: Any) -> int:
                 data + (election.election_id,),
             )
             conn.commit()
+            _cache_candidates(election.election_id, list(election.candidates))
             return election.election_id
-    finally:
-        conn.close()
 
 
 def load_election(election_id: int) -> dict[str, Any] | None:
     """Load election data by ID. Returns dict of election data or None."""
-    conn = get_connection()
-    try:
+    with connection() as conn:
         cursor = conn.execute(
             "SELECT * FROM elections WHERE election_id=?", (election_id,)
         )
@@ -180,27 +388,12 @@ def load_election(election_id: int) -> dict[str, Any] | None:
         if row is None:
             return None
 
-        return {
-            "election_id": row["election_id"],
-            "channel_id": row["channel_id"],
-            "title": row["title"],
-            "description": row["description"],
-            "method_class": row["method_class"],
-            "method_params": json.loads(row["method_params"]),
-            "candidates": json.loads(row["candidates"]),
-            "open": bool(row["open"]),
-            "message_id": row["message_id"],
-            "creator_id": row["creator_id"],
-            "end_timestamp": row["end_timestamp"],
-        }
-    finally:
-        conn.close()
+        return _election_from_row(row)
 
 
 def load_election_by_natural_key(channel_id: int, title: str) -> dict[str, Any] | None:
     """Load election data by channel_id and title. Returns dict or None."""
-    conn = get_connection()
-    try:
+    with connection() as conn:
         cursor = conn.execute(
             "SELECT * FROM elections WHERE channel_id=? AND title=?",
             (channel_id, title),
@@ -210,85 +403,135 @@ def load_election_by_natural_key(channel_id: int, title: str) -> dict[str, Any]
         if row is None:
             return None
 
-        return {
-            "election_id": row["election_id"],
-            "channel_id": row["channel_id"],
-            "title": row["title"],
-            "description": row["description"],
-            "method_class": row["method_class"],
-            "method_params": json.loads(row["method_params"]),
-            "candidates": json.loads(row["candidates"]),
-            "open": bool(row["open"]),
-            "message_id": row["message_id"],
-            "creator_id": row["creator_id"],
-            "end_timestamp": row["end_timestamp"],
-        }
-    finally:
-        conn.close()
+        return _election_from_row(row)
 
 
 def load_all_elections() -> list[dict[str, Any]]:
     """Load all elections from database."""
-    conn = get_connection()
-    try:
+    with connection() as conn:
         cursor = conn.execute("SELECT * FROM elections WHERE open=1")
 
         elections = []
         for row in cursor.fetchall():
-            elections.append(
-                {
-                    "election_id": row["election_id"],
-                    "channel_id": row["channel_id"],
-                    "title": row["title"],
-                    "description": row["description"],
-                    "method_class": row["method_class"],
-                    "method_params": json.loads(row["method_params"]),
-                    "candidates": json.loads(row["candidates"]),
-                    "open": bool(row["open"]),
-                    "message_id": row["message_id"],
-                    "creator_id": row["creator_id"],
-                    "end_timestamp": row["end_timestamp"],
-                }
-            )
+            elections.append(_election_from_row(row))
 
         return elections
-    finally:
-        conn.close()
+
+
+def load_elections_with_legacy_view() -> list[dict[str, Any]]:
+    """Load open elections whose message still has a non-persistent Vote button."""
+    with connection() as conn:
+        cursor = conn.execute("SELECT * FROM elections WHERE open=1 AND legacy_view=1")
+        return [_election_from_row(row) for row in cursor.fetchall()]
+
+
+def mark_view_upgraded(election_id: int):
+    """Record that an election's message has a persistent Vote button."""
+    with connection() as conn:
+        conn.execute(
+            "UPDATE elections SET legacy_view=0 WHERE election_id=?", (election_id,)
+        )
+        conn.commit()
 
 
 def mark_election_closed(election_id: int):
     """Mark an election as closed."""
-    conn = get_connection()
-    try:
+    with connection() as conn:
         conn.execute("UPDATE elections SET open=0 WHERE election_id=?", (election_id,))
         conn.commit()
-    finally:
-        conn.close()
 
 
 def delete_election(election_id: int):
     """Delete an election and all its ballots."""
-    conn = get_connection()
-    try:
+    with connection() as conn:
         conn.execute("DELETE FROM elections WHERE election_id=?", (election_id,))
         conn.commit()
-    finally:
-        conn.close()
+    with _interim_lock:
+        for key in [key for key in _interim_buffer if key[0] == election_id]:
+            del _interim_buffer[key]
+    with _candidates_lock:
+        _candidates_cache.pop(election_id, None)
+
+
+def _election_candidates(conn: sqlite3.Connection, election_id: int) -> list[str]:
+    """Return an election's candidate list, which ballots are encoded against."""
+    with _candidates_lock:
+        candidates = _candidates_cache.get(election_id)
+    if candidates is None:
+        row = conn.execute(
+            "SELECT candidates FROM elections WHERE election_id=?", (election_id,)
+        ).fetchone()
+        candidates = json.loads(row["candidates"]) if row else []
+        _cache_candidates(election_id, candidates)
+    return candidates
+
+
+def _cache_candidates(election_id: int, candidates: list[str]) -> None:
+    with _candidates_lock:
+        _candidates_cache[election_id] = candidates
+        _candidates_cache.move_to_end(election_id)
+        while len(_candidates_cache) > CANDIDATES_CACHE_SIZE:
+            _candidates_cache.popitem(last=False)
+
+
+def _encode_ballot(
+    ballot: Any, candidates: list[str], is_submitted: bool
+) -> bytes | str:
+    """Serialize a ballot for the ballot_data column.
+
+    Ballots are stored in the compact binary format from ballot_codec, falling
+    back to JSON for any ballot the codec can't represent.
+    """
+    ballot_dict = ballot.to_dict()
+    encoded = ballot_codec.encode(
+        ballot.ballot_type, ballot_dict, candidates, include_ui=not is_submitted
+    )
+    return encoded if encoded is not None else json.dumps(ballot_dict)
+
+
+def _decode_ballot(
+    ballot_data: bytes | str, session_id: int | None, candidates: list[str]
+) -> dict[str, Any]:
+    if isinstance(ballot_data, bytes):
+        data = ballot_codec.decode(ballot_data, candidates)
+    else:
+        # JSON, written before the binary format existed or as a fallback
+        data = json.loads(ballot_data)
+    if session_id is not None:
+        data["session_id"] = session_id
+    return data
+
+
+def _ballot_from_row(row: sqlite3.Row, candidates: list[str]) -> dict[str, Any]:
+    ballot_data = _decode_ballot(row["ballot_data"], row["session_id"], candidates)
+    return {
+        "ballot_id": row["ballot_id"],
+        "election_id": row["election_id"],
+        "user_id": row["user_id"],
+        "ballot_type": row["ballot_type"],
+        "ballot_data": ballot_data,
+        "is_submitted": bool(row["is_submitted"]),
+        "session_id": ballot_data.get("session_id", 0),
+    }
 
 
 def save_ballot(ballot: Any, election_id: int, user_id: int, is_submitted: bool) -> int:
     """Save a ballot to the database. Returns ballot_id."""
-    conn = get_connection()
+    if not is_submitted:
+        # This write supersedes any buffered copy of the interim ballot.
+        with _interim_lock:
+            _interim_buffer.pop((election_id, user_id), None)
 
-    try:
-        ballot_dict = ballot.to_dict()
+    with connection() as conn:
+        candidates = _election_candidates(conn, election_id)
 
         data = (
             election_id,
             user_id,
             ballot.ballot_type,
-            json.dumps(ballot_dict),
+            _encode_ballot(ballot, candidates, is_submitted),
             1 if is_submitted else 0,
+            ballot.session_id,
         )
 
         if ballot.ballot_id is None:
@@ -296,11 +539,21 @@ def save_ballot(ballot: Any, election_id: int, user_id: int, is_submitted: bool)
             cursor = conn.execute(
                 """
                 INSERT INTO ballots (election_id, user_id, ballot_type, ballot_data,
-                                   is_submitted)
-                VALUES (?, ?, ?, ?, ?)
+                                   is_submitted, session_id)
+                VALUES (?, ?, ?, ?, ?, ?)
                 """,
                 data,
             )
+            if is_submitted:
+                # Ballots saved this way aren't in the running tally, so drop it.
+                conn.execute(
+                    """
+                    UPDATE elections SET vote_count = vote_count + 1, tally = NULL,
+                        ballot_revision = ballot_revision + 1
+                    WHERE election_id=?
+                    """,
+                    (election_id,),
+                )
             conn.commit()
             ballot.ballot_id = cursor.lastrowid
             return cursor.lastrowid
@@ -310,47 +563,161 @@ def save_ballot(ballot: Any, election_id: int, user_id: int, is_submitted: bool)
                 """
                 UPDATE ballots
                 SET election_id=?, user_id=?, ballot_type=?, ballot_data=?,
-                    is_submitted=?
+                    is_submitted=?, session_id=?
                 WHERE ballot_id=?
                 """,
                 data + (ballot.ballot_id,),
             )
+            if is_submitted:
+                conn.execute(
+                    """
+                    UPDATE elections SET tally = NULL,
+                        ballot_revision = ballot_revision + 1
+                    WHERE election_id=?
+                    """,
+                    (election_id,),
+                )
             conn.commit()
             return ballot.ballot_id
-    finally:
-        conn.close()
+
+
+# Interim ballots are rewritten on every click, but only matter if the voter
+# comes back to them later.  Their writes are buffered here, keyed by
+# (election_id, user_id) so that repeated edits collapse into one, and written
+# out in batches by flush_interim_ballots().  Each entry holds the ballot type,
+# its encoded data, and its session ID.
+_interim_buffer: dict[tuple[int, int], tuple[str, bytes | str, int]] = {}
+_interim_lock = threading.Lock()
+
+
+def cached_candidates(election_id: int) -> list[str] | None:
+    """Return an election's candidate list if it is cached, without the database."""
+    with _candidates_lock:
+        return _candidates_cache.get(election_id)
+
+
+def load_candidates(election_id: int) -> list[str]:
+    """Return an election's candidate list, caching it."""
+    with connection() as conn:
+        return _election_candidates(conn, election_id)
+
+
+def save_interim_ballot(
+    ballot: Any, election_id: int, user_id: int, candidates: list[str] | None = None
+) -> None:
+    """Record a user's interim ballot, deferring the database write.
+
+    The ballot is visible to load_user_ballot() immediately, and is written to
+    the database by the next flush_interim_ballots().  It is encoded against
+    `candidates`, which are looked up if not given.
+    """
+    if candidates is None:
+        candidates = cached_candidates(election_id)
+    if candidates is None:
+        candidates = load_candidates(election_id)
+
+    entry = (
+        ballot.ballot_type,
+        _encode_ballot(ballot, candidates, is_submitted=False),
+        ballot.session_id,
+    )
+    with _interim_lock:
+        _interim_buffer[(election_id, user_id)] = entry
+
+
+def flush_interim_ballots() -> int:
+    """Write all buffered interim ballots to the database in one transaction.
+
+    Returns the number of ballots written.
+    """
+    with _interim_lock:
+        pending = dict(_interim_buffer)
+    if not pending:
+        return 0
+
+    with transaction() as conn:
+        # Ballots for elections that have since closed or been deleted are dropped.
+        conn.executemany(
+            """
+            INSERT INTO ballots (election_id, user_id, ballot_type, ballot_data,
+                                 is_submitted, session_id)
+            SELECT ?, ?, ?, ?, 0, ?
+            WHERE EXISTS (SELECT 1 FROM elections WHERE election_id=? AND open=1)
+            ON CONFLICT(election_id, user_id, is_submitted) DO UPDATE
+            SET ballot_type=excluded.ballot_type, ballot_data=excluded.ballot_data,
+                session_id=excluded.session_id
+            """,
+            [
+                (
+                    election_id,
+                    user_id,
+                    ballot_type,
+                    ballot_data,
+                    session_id,
+                    election_id,
+                )
+                for (election_id, user_id), (
+                    ballot_type,
+                    ballot_data,
+                    session_id,
+                ) in pending.items()
+            ],
+        )
+
+    # Entries stay buffered until written, so readers never miss a ballot.  Keep
+    # any that were replaced by newer edits while the transaction ran.
+    with _interim_lock:
+        for key, entry in pending.items():
+            if _interim_buffer.get(key) is entry:
+                del _interim_buffer[key]
+    return len(pending)
+
+
+def _buffered_interim_ballot(
+    conn: sqlite3.Connection, election_id: int, user_id: int
+) -> dict[str, Any] | None:
+    with _interim_lock:
+        entry = _interim_buffer.get((election_id, user_id))
+    if entry is None:
+        return None
+
+    ballot_type, encoded, session_id = entry
+    ballot_data = _decode_ballot(
+        encoded, session_id, _election_candidates(conn, election_id)
+    )
+    return {
+        "ballot_id": None,
+        "election_id": election_id,
+        "user_id": user_id,
+        "ballot_type": ballot_type,
+        "ballot_data": ballot_data,
+        "is_submitted": False,
+        "session_id": session_id,
+    }
 
 
 def load_ballot(ballot_id: int) -> dict[str, Any] | None:
     """Load ballot data by ID. Returns dict or None."""
-    conn = get_connection()
-    try:
+    with connection() as conn:
         cursor = conn.execute("SELECT * FROM ballots WHERE ballot_id=?", (ballot_id,))
         row = cursor.fetchone()
 
         if row is None:
             return None
 
-        ballot_data = json.loads(row["ballot_data"])
-        return {
-            "ballot_id": row["ballot_id"],
-            "election_id": row["election_id"],
-            "user_id": row["user_id"],
-            "ballot_type": row["ballot_type"],
-            "ballot_data": ballot_data,
-            "is_submitted": bool(row["is_submitted"]),
-            "session_id": ballot_data["session_id"],
-        }
-    finally:
-        conn.close()
+        return _ballot_from_row(row, _election_candidates(conn, row["election_id"]))
 
 
 def load_user_ballot(
     election_id: int, user_id: int, is_submitted: bool
 ) -> dict[str, Any] | None:
     """Load a user's ballot for an election. Returns dict or None."""
-    conn = get_connection()
-    try:
+    with connection() as conn:
+        if not is_submitted:
+            buffered = _buffered_interim_ballot(conn, election_id, user_id)
+            if buffered is not None:
+                return buffered
+
         cursor = conn.execute(
             """
             SELECT * FROM ballots
@@ -363,24 +730,16 @@ def load_user_ballot(
         if row is None:
             return None
 
-        ballot_data = json.loads(row["ballot_data"])
-        return {
-            "ballot_id": row["ballot_id"],
-            "election_id": row["election_id"],
-            "user_id": row["user_id"],
-            "ballot_type": row["ballot_type"],
-            "ballot_data": ballot_data,
-            "is_submitted": bool(row["is_submitted"]),
-            "session_id": ballot_data["session_id"],
-        }
-    finally:
-        conn.close()
+        return _ballot_from_row(row, _election_candidates(conn, election_id))
 
 
 def load_all_ballots(election_id: int, is_submitted: bool) -> list[dict[str, Any]]:
     """Load all ballots for an election. Returns list of dicts."""
-    conn = get_connection()
-    try:
+    if not is_submitted:
+        flush_interim_ballots()
+
+    with connection() as conn:
+        candidates = _election_candidates(conn, election_id)
         cursor = conn.execute(
             """
             SELECT * FROM ballots
@@ -389,28 +748,103 @@ def load_all_ballots(election_id: int, is_submitted: bool) -> list[dict[str, Any
             (election_id, 1 if is_submitted else 0),
         )
 
-        ballots = []
-        for row in cursor.fetchall():
-            ballot_data = json.loads(row["ballot_data"])
-            ballots.append(
-                {
-                    "ballot_id": row["ballot_id"],
-                    "election_id": row["election_id"],
-                    "user_id": row["user_id"],
-                    "ballot_type": row["ballot_type"],
-                    "ballot_data": ballot_data,
-                    "is_submitted": bool(row["is_submitted"]),
-                    "session_id": ballot_data["session_id"],
-                }
-            )
+        return [_ballot_from_row(row, candidates) for row in cursor.fetchall()]
 
-        return ballots
-    finally:
-        conn.close()
 
+def iter_submitted_votes(
+    election_id: int, chunk_size: int = BALLOT_CHUNK_SIZE
+) -> Iterator[votes.Record]:
+    """Yield a compact vote record (see votes.py) for each submitted ballot.
 
-def submit_ballot(election_id: int, user_id: int, ballot: Any):
-    """Atomically move a ballot from interim to submitted."""
+    Rows are fetched chunk_size at a time, so memory use doesn't grow with the
+    number of ballots.  Only vote data is decoded, not the ballot's candidate
+    order or page state.
+    """
+    with connection() as conn:
+        candidates = _election_candidates(conn, election_id)
+        cursor = conn.execute(
+            "SELECT ballot_data FROM ballots WHERE election_id=? AND is_submitted=1",
+            (election_id,),
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for (ballot_data,) in rows:
+                yield _vote_record(ballot_data, candidates)
+
+
+def _vote_record(ballot_data: bytes | str, candidates: list[str]) -> votes.Record:
+    if isinstance(ballot_data, bytes):
+        return ballot_codec.decode_record(ballot_data, len(candidates))
+    return votes.record_from_data(json.loads(ballot_data), candidates)
+
+
+def _encode_tally(tally: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, tally, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _decode_tally(data: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+
+def load_tally(election_id: int) -> np.ndarray | None:
+    """Load an election's running tally, or None if it has none."""
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT tally FROM elections WHERE election_id=?", (election_id,)
+        ).fetchone()
+        if row is None or row["tally"] is None:
+            return None
+        return _decode_tally(row["tally"])
+
+
+def _update_tally(
+    conn: sqlite3.Connection,
+    election_id: int,
+    tally: Callable[[Iterable[Any]], np.ndarray | None],
+    added: votes.Record,
+    removed: votes.Record | None,
+) -> None:
+    """Add a submitted ballot to an election's running tally, replacing another."""
+    delta = tally([added])
+    if delta is None:
+        return
+    if removed is not None:
+        delta = delta - tally([removed])
+
+    row = conn.execute(
+        "SELECT tally, vote_count FROM elections WHERE election_id=?", (election_id,)
+    ).fetchone()
+    if row["tally"] is not None:
+        current = _decode_tally(row["tally"])
+    elif row["vote_count"] == 1 and removed is None:
+        # This is the first ballot.
+        current = tally([])
+    else:
+        # The election has ballots that were never tallied.
+        return
+    conn.execute(
+        "UPDATE elections SET tally=? WHERE election_id=?",
+        (_encode_tally(current + delta), election_id),
+    )
+
+
+def submit_ballot(
+    election_id: int,
+    user_id: int,
+    ballot: Any,
+    tally: Callable[[Iterable[Any]], np.ndarray | None] | None = None,
+):
+    """Atomically move a ballot from interim to submitted.
+
+    tally is the election's Election.tally.  If given, the election's running
+    tally is updated in the same transaction, with the user's previous ballot
+    taken out and the new one added.  Otherwise the running tally is
+    discarded, so that tabulation reads the ballots instead.
+    """
     with transaction() as conn:
         # Delete interim ballot
         conn.execute(
@@ -421,40 +855,97 @@ def submit_ballot(election_id: int, user_id: int, ballot: Any):
             (election_id, user_id),
         )
 
-        # Insert submitted ballot
-        ballot_dict = ballot.to_dict()
-        conn.execute(
+        # Replace the user's submitted ballot, or insert one if this is their
+        # first vote.  Only a first vote changes the election's vote count.
+        candidates = _election_candidates(conn, election_id)
+        ballot_data = _encode_ballot(ballot, candidates, is_submitted=True)
+        previous = conn.execute(
             """
-            INSERT OR REPLACE INTO ballots
-            (election_id, user_id, ballot_type, ballot_data, is_submitted)
-            VALUES (?, ?, ?, ?, 1)
+            SELECT ballot_data FROM ballots
+            WHERE election_id=? AND user_id=? AND is_submitted=1
             """,
-            (
-                election_id,
-                user_id,
-                ballot.ballot_type,
-                json.dumps(ballot_dict),
-            ),
+            (election_id, user_id),
+        ).fetchone()
+        cursor = conn.execute(
+            """
+            UPDATE ballots SET ballot_type=?, ballot_data=?, session_id=?
+            WHERE election_id=? AND user_id=? AND is_submitted=1
+            """,
+            (ballot.ballot_type, ballot_data, ballot.session_id, election_id, user_id),
+        )
+        if cursor.rowcount == 0:
+            conn.execute(
+                """
+                INSERT INTO ballots
+                (election_id, user_id, ballot_type, ballot_data, is_submitted,
+                 session_id)
+                VALUES (?, ?, ?, ?, 1, ?)
+                """,
+                (
+                    election_id,
+                    user_id,
+                    ballot.ballot_type,
+                    ballot_data,
+                    ballot.session_id,
+                ),
+            )
+            conn.execute(
+                "UPDATE elections SET vote_count = vote_count + 1 WHERE election_id=?",
+                (election_id,),
+            )
+        conn.execute(
+            "UPDATE elections SET ballot_revision = ballot_revision + 1 "
+            "WHERE election_id=?",
+            (election_id,),
         )
 
+        if tally is not None:
+            # The tally counts what was stored, so taking a ballot out later
+            # removes exactly what was added.
+            removed = None
+            if previous is not None:
+                removed = _vote_record(previous["ballot_data"], candidates)
+            _update_tally(
+                conn,
+                election_id,
+                tally,
+                _vote_record(ballot_data, candidates),
+                removed,
+            )
+        else:
+            conn.execute(
+                "UPDATE elections SET tally = NULL WHERE election_id=?",
+                (election_id,),
+            )
+
+    # The submitted ballot replaces any buffered interim copy.
+    with _interim_lock:
+        _interim_buffer.pop((election_id, user_id), None)
+
 
 def get_vote_count(election_id: int) -> int:
     """Get the count of submitted ballots for an election."""
-    conn = get_connection()
-    try:
+    with connection() as conn:
         cursor = conn.execute(
-            "SELECT COUNT(*) FROM ballots WHERE election_id=? AND is_submitted=1",
-            (election_id,),
+            "SELECT vote_count FROM elections WHERE election_id=?", (election_id,)
         )
-        return cursor.fetchone()[0]
-    finally:
-        conn.close()
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+
+def get_ballot_revision(election_id: int) -> int:
+    """Get a number that changes whenever an election's submitted ballots do."""
+    with connection() as conn:
+        cursor = conn.execute(
+            "SELECT ballot_revision FROM elections WHERE election_id=?", (election_id,)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else 0
 
 
 def load_elections_by_creator(channel_id: int, creator_id: int) -> list[dict[str, Any]]:
     """Load all open elections in a channel created by a specific user."""
-    conn = get_connection()
-    try:
+    with connection() as conn:
         cursor = conn.execute(
             "SELECT * FROM elections WHERE channel_id=? AND creator_id=? AND open=1",
             (channel_id, creator_id),
@@ -462,70 +953,24 @@ def load_elections_by_creator(channel_id: int, creator_id: int) -> list[dict[str
 
         elections = []
         for row in cursor.fetchall():
-            elections.append(
-                {
-                    "election_id": row["election_id"],
-                    "channel_id": row["channel_id"],
-                    "title": row["title"],
-                    "description": row["description"],
-                    "method_class": row["method_class"],
-                    "method_params": json.loads(row["method_params"]),
-                    "candidates": json.loads(row["candidates"]),
-                    "open": bool(row["open"]),
-                    "message_id": row["message_id"],
-                    "creator_id": row["creator_id"],
-                    "end_timestamp": row["end_timestamp"],
-                }
-            )
+            elections.append(_election_from_row(row))
 
         return elections
-    finally:
-        conn.close()
-
-
-def load_elections_ending_soon(within_seconds: int = 60) -> list[dict[str, Any]]:
-    """Load all open elections with end_timestamp within the next N seconds (or already expired).
-
-    This is more efficient than load_all_elections() for checking expiration.
 
-    Args:
-        within_seconds: Only return elections ending within this many seconds (default 60)
 
-    Returns:
-        List of election data dicts with end_timestamp <= current_time + within_seconds
-    """
-    conn = get_connection()
-    try:
-        current_time = int(time.time())
-        max_time = current_time + within_seconds
+def load_election_end_times() -> list[tuple[int, int]]:
+    """Load the election ID and end_timestamp of every open election with one."""
+    with connection() as conn:
         cursor = conn.execute(
-            "SELECT * FROM elections WHERE open=1 AND end_timestamp IS NOT NULL AND end_timestamp <= ?",
-            (max_time,),
+            "SELECT election_id, end_timestamp FROM elections "
+            "WHERE open=1 AND end_timestamp IS NOT NULL"
         )
-
-        elections = []
-        for row in cursor.fetchall():
-            elections.append(
-                {
-                    "election_id": row["election_id"],
-                    "channel_id": row["channel_id"],
-                    "title": row["title"],
-                    "description": row["description"],
-                    "method_class": row["method_class"],
-                    "method_params": json.loads(row["method_params"]),
-                    "candidates": json.loads(row["candidates"]),
-                    "open": bool(row["open"]),
-                    "message_id": row["message_id"],
-                    "creator_id": row["creator_id"],
-                    "end_timestamp": row["end_timestamp"],
-                }
-            )
-
-        return elections
-    finally:
-        conn.close()
+        return [tuple(row) for row in cursor.fetchall()]
 
 
 def new_session() -> int:
-    """Generate a new session ID."""
-    return time.monotonic_ns()
+    """Generate a new session ID.
+
+    Ballot sessions outlive the process, so this uses the wall clock.
+    """
+    return time.time_ns()
@@ -3,11 +3,12 @@
 import discord
 from typing import Any
 import asyncio
-import db
-from election import load_election_from_db, end_election_and_update_message
+import async_db
+import messages
+from election import load_election_from_db_async, end_election_and_update_message
 from setup import ElectionSetup
 import time_utils
-import election_checker
+import tabulation
 
 
 class ElectableView(discord.ui.View):
@@ -17,14 +18,24 @@ class ElectableView(discord.ui.View):
         super().__init__(timeout=None)
         self.interaction = interaction
         self.selected_election_id: int | None = None
+        self.elections: list[dict[str, Any]] = []
 
-        # Load user's elections in this channel
-        self.elections = db.load_elections_by_creator(
-            interaction.channel_id, interaction.user.id
+    async def refresh(self):
+        """Reload the user's elections in this channel and rebuild the UI."""
+        self.elections = await async_db.load_elections_by_creator(
+            self.interaction.channel_id, self.interaction.user.id
         )
-
         self.build_view()
 
+    async def show_list(self, interaction: discord.Interaction):
+        """Go back to the election list, showing current elections."""
+        self.selected_election_id = None
+        await self.refresh()
+        if interaction.response.is_done():
+            await interaction.edit_original_response(**await self.get_content())
+        else:
+            await interaction.response.edit_message(**await self.get_content())
+
     def build_view(self):
         """Build the UI based on current state."""
         self.clear_items()
@@ -32,6 +43,7 @@ class ElectableView(discord.ui.View):
         if self.selected_election_id:
             # Show management view for selected election
             self.add_item(BackButton())
+            self.add_item(PreviewButton(self.selected_election_id))
             self.add_item(RescheduleButton(self.selected_election_id))
             self.add_item(EndNowButton(self.selected_election_id))
             self.add_item(DeleteButton(self.selected_election_id))
@@ -45,18 +57,18 @@ class ElectableView(discord.ui.View):
             else:
                 self.add_item(CreateNewButton(row=0))  # Row 0 when no select menu
 
-    def get_content(self) -> dict[str, Any]:
+    async def get_content(self) -> dict[str, Any]:
         """Get the message content for the current view."""
         if self.selected_election_id:
             # Show selected election details
-            election = load_election_from_db(self.selected_election_id)
+            election = await load_election_from_db_async(self.selected_election_id)
             if not election:
                 return {
                     "content": "Error: Election not found.",
                     "view": None,
                 }
 
-            vote_count = db.get_vote_count(election.election_id)
+            vote_count = await async_db.get_vote_count(election.election_id)
             end_time = time_utils.format_timestamp_discord(election.end_timestamp)
 
             content = (
@@ -89,13 +101,11 @@ class ElectionSelect(discord.ui.Select):
 
         options = []
         for e_data in elections[:25]:  # Discord limit
-            election = load_election_from_db(e_data["election_id"])
-            vote_count = db.get_vote_count(election.election_id)
             options.append(
                 discord.SelectOption(
-                    label=election.title[:100],  # Discord limit
-                    value=str(election.election_id),
-                    description=f"{vote_count} votes",
+                    label=e_data["title"][:100],  # Discord limit
+                    value=str(e_data["election_id"]),
+                    description=f"{e_data['vote_count']} votes",
                 )
             )
 
@@ -108,7 +118,7 @@ class ElectionSelect(discord.ui.Select):
     async def callback(self, interaction: discord.Interaction):
         self.parent_view.selected_election_id = int(self.values[0])
         self.parent_view.build_view()
-        await interaction.response.edit_message(**self.parent_view.get_content())
+        await interaction.response.edit_message(**await self.parent_view.get_content())
 
 
 class BackButton(discord.ui.Button):
@@ -120,13 +130,8 @@ class BackButton(discord.ui.Button):
     async def callback(self, interaction: discord.Interaction):
         view = self.view
         if isinstance(view, ElectableView):
-            view.selected_election_id = None
             # Reload elections in case they changed
-            view.elections = db.load_elections_by_creator(
-                interaction.channel_id, interaction.user.id
-            )
-            view.build_view()
-            await interaction.response.edit_message(**view.get_content())
+            await view.show_list(interaction)
 
 
 class CreateNewButton(discord.ui.Button):
@@ -147,7 +152,7 @@ class CreateNewButton(discord.ui.Button):
             channel_id, title, election, start_interaction = result
 
             # Check if election already exists
-            existing = db.load_election_by_natural_key(channel_id, title)
+            existing = await async_db.load_election_by_natural_key(channel_id, title)
             if existing:
                 await interaction.followup.send(
                     f"An election with the title `{title}` is already ongoing in this channel.",
@@ -157,32 +162,72 @@ class CreateNewButton(discord.ui.Button):
 
             # Set channel_id and save to database
             election.channel_id = channel_id
-            db.save_election(election)
+            await async_db.save_election(election)
 
             # Post public message
             channel = interaction.channel
-            message = await channel.send(**election.get_public_view())
+            message = await messages.send(channel, **await election.get_public_view())
             election.message_id = message.id
-            db.save_election(election)
-
-            # Trigger background task to check for expiration immediately
-            election_checker.trigger_check()
+            await async_db.save_election(election)
 
             # Update the electable view to refresh the election list
             if isinstance(parent_view, ElectableView):
-                parent_view.elections = db.load_elections_by_creator(
-                    channel_id, interaction.user.id
-                )
-                parent_view.build_view()
+                await parent_view.refresh()
                 # Edit the message using the start interaction to show the updated list
                 try:
                     await start_interaction.response.edit_message(
-                        **parent_view.get_content()
+                        **await parent_view.get_content()
                     )
                 except (discord.errors.NotFound, discord.errors.HTTPException):
                     pass  # If we can't edit it (message deleted or interaction expired), that's okay
 
 
+class PreviewButton(discord.ui.Button):
+    """Button to show the results so far without ending the election."""
+
+    def __init__(self, election_id: int):
+        super().__init__(
+            label="Preview Results",
+            style=discord.ButtonStyle.secondary,
+            row=1,
+        )
+        self.election_id = election_id
+
+    async def callback(self, interaction: discord.Interaction):
+        election = await load_election_from_db_async(self.election_id)
+        if not election:
+            # Election no longer exists - refresh the view to show current elections
+            view = self.view
+            if isinstance(view, ElectableView):
+                await view.show_list(interaction)
+            return
+
+        # Methods without a running tally may take a while on large elections.
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            embed = await election.preview_results()
+        except tabulation.TabulationCancelled:
+            await interaction.followup.send(
+                "This election was deleted.", ephemeral=True
+            )
+            return
+        except tabulation.TabulationTimeout:
+            await interaction.followup.send(
+                "Tabulation did not finish within "
+                f"{tabulation.TIMEOUT_SECONDS} seconds.",
+                ephemeral=True,
+            )
+            return
+        except tabulation.TabulationBusy:
+            await interaction.followup.send(
+                "Too many elections are being tabulated right now.  "
+                "Try again in a few minutes.",
+                ephemeral=True,
+            )
+            return
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+
 class RescheduleButton(discord.ui.Button):
     """Button to reschedule an election's end time."""
 
@@ -195,17 +240,12 @@ class RescheduleButton(discord.ui.Button):
         self.election_id = election_id
 
     async def callback(self, interaction: discord.Interaction):
-        election = load_election_from_db(self.election_id)
+        election = await load_election_from_db_async(self.election_id)
         if not election:
             # Election no longer exists - refresh the view to show current elections
             view = self.view
             if isinstance(view, ElectableView):
-                view.selected_election_id = None
-                view.elections = db.load_elections_by_creator(
-                    interaction.channel_id, interaction.user.id
-                )
-                view.build_view()
-                await interaction.response.edit_message(**view.get_content())
+                await view.show_list(interaction)
             return
 
         parent_view = self.view
@@ -231,17 +271,16 @@ class RescheduleButton(discord.ui.Button):
 
                 # Update election
                 election.end_timestamp = new_timestamp
-                db.save_election(election)
-
-                # Trigger background task to check for expiration immediately
-                election_checker.trigger_check()
+                await async_db.save_election(election)
 
                 # Update public message
                 await election.update_vote_count()
 
                 # Update the management view to show new end time
                 if isinstance(parent_view, ElectableView):
-                    await interaction.response.edit_message(**parent_view.get_content())
+                    await interaction.response.edit_message(
+                        **await parent_view.get_content()
+                    )
                 else:
                     # Fallback if view context is lost
                     await interaction.response.send_message(
@@ -265,17 +304,12 @@ class EndNowButton(discord.ui.Button):
         self.election_id = election_id
 
     async def callback(self, interaction: discord.Interaction):
-        election = load_election_from_db(self.election_id)
+        election = await load_election_from_db_async(self.election_id)
         if not election:
             # Election no longer exists - refresh the view to show current elections
             view = self.view
             if isinstance(view, ElectableView):
-                view.selected_election_id = None
-                view.elections = db.load_elections_by_creator(
-                    interaction.channel_id, interaction.user.id
-                )
-                view.build_view()
-                await interaction.response.edit_message(**view.get_content())
+                await view.show_list(interaction)
             return
 
         class ConfirmModal(discord.ui.Modal, title="Confirm End Election"):
@@ -293,20 +327,23 @@ class EndNowButton(discord.ui.Button):
                     )
                     return
 
+                # Tabulation can take longer than Discord waits for a response
+                await interaction.response.defer()
+
                 # End the election using shared logic
-                await end_election_and_update_message(
-                    election, interaction.channel, include_announcement=False
-                )
+                try:
+                    await end_election_and_update_message(
+                        election, interaction.channel, include_announcement=False
+                    )
+                except Exception as e:
+                    # The election was reopened, and the failure reported in
+                    # the channel.
+                    print(f"Error ending election {election.election_id}: {e}")
 
                 # Update the parent view and go back to the election list
                 view = self.view
                 if isinstance(view, ElectableView):
-                    view.selected_election_id = None
-                    view.elections = db.load_elections_by_creator(
-                        interaction.channel_id, interaction.user.id
-                    )
-                    view.build_view()
-                    await interaction.response.edit_message(**view.get_content())
+                    await view.show_list(interaction)
 
         await interaction.response.send_modal(ConfirmModal())
 
@@ -323,17 +360,12 @@ class DeleteButton(discord.ui.Button):
         self.election_id = election_id
 
     async def callback(self, interaction: discord.Interaction):
-        election = load_election_from_db(self.election_id)
+        election = await load_election_from_db_async(self.election_id)
         if not election:
             # Election no longer exists - refresh the view to show current elections
             view = self.view
             if isinstance(view, ElectableView):
-                view.selected_election_id = None
-                view.elections = db.load_elections_by_creator(
-                    interaction.channel_id, interaction.user.id
-                )
-                view.build_view()
-                await interaction.response.edit_message(**view.get_content())
+                await view.show_list(interaction)
             return
 
         class ConfirmModal(discord.ui.Modal, title="Confirm Delete Election"):
@@ -354,24 +386,20 @@ class DeleteButton(discord.ui.Button):
                 # Delete the public message if it exists
                 if election.message_id:
                     try:
-                        channel = interaction.channel
-                        message = await channel.fetch_message(election.message_id)
-                        await message.delete()
+                        await messages.delete(
+                            interaction.channel_id, election.message_id
+                        )
                     except discord.NotFound:
                         pass  # Message was already deleted
 
-                # Delete the election from database
-                db.delete_election(election.election_id)
+                # Stop any tabulation of it, then delete it from the database
+                tabulation.cancel(election.election_id)
+                await async_db.delete_election(election.election_id)
 
                 # Update the parent view and go back to the election list
                 view = self.view
                 if isinstance(view, ElectableView):
-                    view.selected_election_id = None
-                    view.elections = db.load_elections_by_creator(
-                        interaction.channel_id, interaction.user.id
-                    )
-                    view.build_view()
-                    await interaction.response.edit_message(**view.get_content())
+                    await view.show_list(interaction)
 
         await interaction.response.send_modal(ConfirmModal())
 
@@ -379,4 +407,5 @@ class DeleteButton(discord.ui.Button):
 async def show_electable(interaction: discord.Interaction):
     """Show the electable command interface."""
     view = ElectableView(interaction)
-    await interaction.response.send_message(**view.get_content(), ephemeral=True)
+    await view.refresh()
+    await interaction.response.send_message(**await view.get_content(), ephemeral=True)
@@ -1,21 +1,72 @@
 from __future__ import annotations
 import abc
+import asyncio
+import re
+from collections import OrderedDict
 from typing import Any, Iterable, TYPE_CHECKING
 import discord
+import numpy as np
+import async_db
 import db
+import messages
+import tabulation
+import votes
 
 
 if TYPE_CHECKING:
     from ballot import Ballot
 
-# Global reference to Discord client (set by bot.py on startup)
-_client = None
+# Public election messages are edited at most once per this many seconds, so a
+# burst of votes becomes one edit at its start and one when it ends.
+PUBLIC_UPDATE_SECONDS = 5.0
 
+# Elections whose public message needs updating, and the task updating each.
+_public_update_pending: set[int] = set()
+_public_update_tasks: dict[int, asyncio.Task] = {}
 
-def set_client(client):
-    """Called by bot.py to set the Discord client reference."""
-    global _client
-    _client = client
+# Previewed results for recently previewed elections, keyed by election ID,
+# with the ballot revision they were computed from.
+PREVIEW_CACHE_SIZE = 64
+_preview_cache: OrderedDict[int, tuple[int, tuple[list[str], str]]] = OrderedDict()
+
+
+class VoteButton(
+    discord.ui.DynamicItem[discord.ui.Button], template=r"vote:(?P<election_id>\d+)"
+):
+    """The Vote button on an election's public message.
+
+    Its custom ID holds the election ID, so once registered with
+    Client.add_dynamic_items() it works on every election message, including
+    ones sent before the bot restarted.
+    """
+
+    def __init__(self, election_id: int):
+        super().__init__(
+            discord.ui.Button(
+                style=discord.ButtonStyle.primary,
+                label="Vote",
+                custom_id=f"vote:{election_id}",
+            )
+        )
+        self.election_id = election_id
+
+    @classmethod
+    async def from_custom_id(
+        cls,
+        interaction: discord.Interaction,
+        item: discord.ui.Button,
+        match: re.Match[str],
+    ) -> VoteButton:
+        return cls(int(match["election_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        election = await load_election_from_db_async(self.election_id)
+        if election:
+            await election.send_ballot(interaction)
+        else:
+            await interaction.response.send_message(
+                "This election no longer exists.", ephemeral=True
+            )
 
 
 class Election(abc.ABC):
@@ -44,25 +95,11 @@ class Election(abc.ABC):
         # Store method class name for serialization
         self.method_class = f"{self.__class__.__module__}.{self.__class__.__name__}"
 
-    def get_public_view(self) -> dict[str, Any]:
+    async def get_public_view(self) -> dict[str, Any]:
         """Return a dictionary representation of the public view of the election as Discord message fields."""
         import time_utils
 
-        class VoteButton(discord.ui.Button):
-            def __init__(_, election_id: int):
-                super().__init__(style=discord.ButtonStyle.primary, label="Vote")
-                _.election_id = election_id
-
-            async def callback(_, interaction: discord.Interaction):
-                election = load_election_from_db(_.election_id)
-                if election:
-                    await election.send_ballot(interaction)
-                else:
-                    await interaction.response.send_message(
-                        "This election no longer exists.", ephemeral=True
-                    )
-
-        vote_count = db.get_vote_count(self.election_id)
+        vote_count = await async_db.get_vote_count(self.election_id)
 
         embed = (
             discord.Embed(
@@ -110,13 +147,13 @@ class Election(abc.ABC):
         session_id = db.new_session()
 
         # Try to load existing interim ballot
-        ballot_data = db.load_user_ballot(
+        ballot_data = await async_db.load_user_ballot(
             self.election_id, interaction.user.id, is_submitted=False
         )
 
         if ballot_data is None:
             # Check if they have a submitted ballot (for editing)
-            submitted_data = db.load_user_ballot(
+            submitted_data = await async_db.load_user_ballot(
                 self.election_id, interaction.user.id, is_submitted=True
             )
             if submitted_data:
@@ -130,19 +167,22 @@ class Election(abc.ABC):
 
         # Update session_id and save
         ballot.session_id = session_id
-        db.save_ballot(
-            ballot, self.election_id, interaction.user.id, is_submitted=False
+        await async_db.save_interim_ballot(
+            ballot, self.election_id, interaction.user.id
         )
 
         await interaction.response.send_message(
-            **ballot.render_interim(session_id),
+            **ballot.render_interim(session_id, self.title),
             ephemeral=True,
         )
 
     async def check_session(
         self, interaction: discord.Interaction, session_id: int
-    ) -> bool:
-        """Check if the interaction is part of the current session."""
+    ) -> dict[str, Any] | None:
+        """Check if the interaction is part of the current session.
+
+        Returns the user's interim ballot data if it is, or None.
+        """
         if not self.open:
             try:
                 await interaction.response.edit_message(
@@ -154,10 +194,10 @@ class Election(abc.ABC):
             except discord.errors.NotFound:
                 # Interaction token expired (bot restarted)
                 pass
-            return False
+            return None
 
         # Load the user's interim ballot to check session
-        ballot_data = db.load_user_ballot(
+        ballot_data = await async_db.load_user_ballot(
             self.election_id, interaction.user.id, is_submitted=False
         )
         if ballot_data is None or ballot_data["session_id"] != session_id:
@@ -171,14 +211,14 @@ class Election(abc.ABC):
             except discord.errors.NotFound:
                 # Interaction token expired (bot restarted)
                 pass
-            return False
-        return True
+            return None
+        return ballot_data
 
     async def submit_ballot(self, interaction: discord.Interaction):
         """Submit the user's current interim ballot as their submitted vote."""
 
         # Load interim ballot
-        ballot_data = db.load_user_ballot(
+        ballot_data = await async_db.load_user_ballot(
             self.election_id, interaction.user.id, is_submitted=False
         )
 
@@ -186,7 +226,9 @@ class Election(abc.ABC):
             ballot = ballot_from_dict(ballot_data, self.election_id)
 
             # Atomically move from interim to submitted
-            db.submit_ballot(self.election_id, interaction.user.id, ballot)
+            await async_db.submit_ballot(
+                self.election_id, interaction.user.id, ballot, self.tally
+            )
 
             await interaction.response.edit_message(
                 **ballot.render_submitted(),
@@ -194,7 +236,7 @@ class Election(abc.ABC):
             )
 
             # Update vote count on public message
-            await self.update_vote_count()
+            schedule_public_update(self.election_id)
         else:
             await interaction.response.edit_message(
                 content="Your vote **was not recorded** because you did not have a ballot open.  To cast or update your ballot, click the Vote button again.",
@@ -206,22 +248,56 @@ class Election(abc.ABC):
     async def update_vote_count(self):
         """Update the public Discord message with current vote count."""
         try:
-            channel = _client.get_channel(self.channel_id)
-            message = await channel.fetch_message(self.message_id)
-            await message.edit(**self.get_public_view())
+            await messages.edit(
+                self.channel_id, self.message_id, **await self.get_public_view()
+            )
         except discord.NotFound:
             pass
 
-    def get_results(self, show_details: bool = True) -> discord.Embed:
+    async def get_results(self, show_details: bool = True) -> discord.Embed:
         self.open = False
-        db.mark_election_closed(self.election_id)
+        cancel_public_update(self.election_id)
+        await async_db.mark_election_closed(self.election_id)
+        _preview_cache.pop(self.election_id, None)
+
+        winners, details = await tabulation.tabulate(self)
+        return self.results_embed(
+            f"Results for {self.title}", winners, details, show_details
+        )
 
-        # Load all submitted ballots from database
-        ballot_dicts = db.load_all_ballots(self.election_id, is_submitted=True)
-        ballots = [ballot_from_dict(bd, self.election_id) for bd in ballot_dicts]
+    async def preview_results(self) -> discord.Embed:
+        """Return the results so far, leaving the election open.
+
+        Previews are kept until the submitted ballots change, so asking again
+        in the meantime costs nothing.
+        """
+        revision = await async_db.get_ballot_revision(self.election_id)
+        cached = _preview_cache.get(self.election_id)
+        if cached is not None and cached[0] == revision:
+            winners, details = cached[1]
+            _preview_cache.move_to_end(self.election_id)
+        else:
+            # A tabulation that times out, is cancelled or fails raises, so
+            # only finished ones are cached.
+            winners, details = await tabulation.tabulate(self)
+            _preview_cache[self.election_id] = (revision, (winners, details))
+            _preview_cache.move_to_end(self.election_id)
+            while len(_preview_cache) > PREVIEW_CACHE_SIZE:
+                _preview_cache.popitem(last=False)
+
+        vote_count = await async_db.get_vote_count(self.election_id)
+        return self.results_embed(
+            f"Preview of results for {self.title}", winners, details
+        ).set_footer(
+            text=f"{vote_count} votes so far. "
+            "The results may change before the election ends."
+        )
 
-        winners, details = self.tabulate(ballots)
-        embed = discord.Embed(title=f"Results for {self.title}", color=0x00FF00)
+    def results_embed(
+        self, title: str, winners: list[str], details: str, show_details: bool = True
+    ) -> discord.Embed:
+        """Return an embed showing the winners, and how they were chosen."""
+        embed = discord.Embed(title=title, color=0x00FF00)
         if len(winners) == 0:
             embed.add_field(name="Winners", value="No winner determined", inline=False)
         elif len(winners) == 1:
@@ -239,6 +315,38 @@ class Election(abc.ABC):
             embed.add_field(name="Details", value=details, inline=False)
         return embed
 
+    def tabulate_from_db(self) -> tuple[list[str], str]:
+        """Tabulate this election's submitted ballots, reading them from the database."""
+        return self.tabulate_loaded(self.load_ballots())
+
+    def load_ballots(self) -> np.ndarray | votes.BallotProfile:
+        """Read what tabulation needs from the database.
+
+        That is the running tally for methods that keep one, without reading
+        any ballots, or otherwise the profile of submitted ballots.
+        """
+        empty = self.tally([])
+        if empty is not None:
+            tally = db.load_tally(self.election_id)
+            # A tally is missing if the election has ballots from before
+            # tallies were kept.
+            if tally is not None and tally.shape == empty.shape:
+                return tally
+
+        stream = db.iter_submitted_votes(self.election_id)
+        try:
+            return votes.record_profile(stream)
+        finally:
+            stream.close()
+
+    def tabulate_loaded(
+        self, loaded: np.ndarray | votes.BallotProfile
+    ) -> tuple[list[str], str]:
+        """Tabulate what load_ballots() returned."""
+        if isinstance(loaded, np.ndarray):
+            return self.tabulate_tally(loaded)
+        return self.tabulate(loaded)
+
     @classmethod
     @abc.abstractmethod
     def method_name(self) -> str:
@@ -272,19 +380,89 @@ class Election(abc.ABC):
         """Return a new, empty ballot."""
         pass
 
-    @abc.abstractmethod
+    def tally(self, ballots: Iterable[Ballot]) -> np.ndarray | None:
+        """Return the running tally of the given ballots, or None if the method has none.
+
+        A tally is an array summarizing the ballots, such as the count of
+        first preferences or the pairwise preference matrix, that is additive:
+        the tally of two sets of ballots is the sum of their tallies.  The
+        database keeps one up to date as ballots are submitted, so results
+        don't need to read every ballot.  Methods that have one implement
+        tabulate_tally() instead of tabulate().
+        """
+        return None
+
+    def tabulate_tally(self, tally: np.ndarray) -> tuple[list[str], str]:
+        """Returns tabulated results from a tally returned by tally()."""
+        raise NotImplementedError
+
     def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
         """Returns tabulated results.
 
+        Ballots may be Ballot objects, the compact records from votes.py, or
+        a votes.BallotProfile of either; they may be read only once.  Use
+        votes.ranked_profile() and friends to count identical votes together,
+        or votes.ranked_votes() and friends to read them one at a time.
+
         The first result should be a list of winners.
         The second result should be an explanation of how the winner was chosen.
         """
-        pass
+        return self.tabulate_tally(self.tally(ballots))
+
+
+def schedule_public_update(election_id: int) -> None:
+    """Mark an election's public message as needing an update, without waiting.
+
+    The first update is sent straight away.  Later ones are coalesced, so the
+    message is edited at most once every PUBLIC_UPDATE_SECONDS, and always
+    once more after the last change.
+    """
+    _public_update_pending.add(election_id)
+    if election_id not in _public_update_tasks:
+        _public_update_tasks[election_id] = asyncio.create_task(
+            _update_public_message(election_id)
+        )
+
+
+def cancel_public_update(election_id: int) -> None:
+    """Drop any pending update of an election's public message."""
+    _public_update_pending.discard(election_id)
+    task = _public_update_tasks.pop(election_id, None)
+    if task is not None:
+        task.cancel()
+
+
+async def _update_public_message(election_id: int) -> None:
+    try:
+        while election_id in _public_update_pending:
+            _public_update_pending.discard(election_id)
+            # Reload the election, which may have ended or been rescheduled.
+            election = await load_election_from_db_async(election_id)
+            if election is None or not election.open:
+                break
+            try:
+                await election.update_vote_count()
+            except discord.HTTPException as e:
+                print(f"Error updating election {election_id} message: {e}")
+            await asyncio.sleep(PUBLIC_UPDATE_SECONDS)
+    finally:
+        if _public_update_tasks.get(election_id) is asyncio.current_task():
+            del _public_update_tasks[election_id]
+            _public_update_pending.discard(election_id)
 
 
 def load_election_from_db(election_id: int) -> Election | None:
     """Load an election from the database by ID."""
-    data = db.load_election(election_id)
+    return election_from_data(db.load_election(election_id))
+
+
+async def load_election_from_db_async(election_id: int) -> Election | None:
+    """Load an election from the database by ID without blocking the event loop."""
+    return election_from_data(await async_db.load_election(election_id))
+
+
+def election_from_data(data: dict[str, Any] | None) -> Election | None:
+    """Construct an election from a dict returned by the db module."""
     if data is None:
         return None
 
@@ -325,6 +503,13 @@ def ballot_from_dict(ballot_dict: dict[str, Any], election_id: int) -> "Ballot":
     return ballot_class.from_dict(ballot_dict, election_id)
 
 
+async def _reopen(election: "Election") -> None:
+    """Reopen an election whose results couldn't be tabulated."""
+    election.open = True
+    await async_db.save_election(election)
+    await election.update_vote_count()
+
+
 async def end_election_and_update_message(
     election: "Election",
     channel: discord.TextChannel,
@@ -336,28 +521,70 @@ async def end_election_and_update_message(
         election: The election to end
         channel: The Discord channel where the election is posted
         include_announcement: If True, includes "Election **{title}** has ended!" text
+
+    Raises:
+        Exception: Whatever stopped the results being tabulated, other than
+            a cancellation or timeout.  The election is reopened first.
     """
     import time_utils
 
+    # Tabulation can take a while, so post a placeholder for the results
+    announcement = (
+        f"Election **{election.title}** has ended!" if include_announcement else None
+    )
+    tabulating = f"Tabulating results for **{election.title}**…"
+    placeholder = await channel.send(
+        content=f"{announcement} {tabulating}" if announcement else tabulating
+    )
+
     # Generate results embed
-    results_embed = election.get_results(show_details=True).set_footer(
+    try:
+        results = await election.get_results(show_details=True)
+    except tabulation.TabulationCancelled:
+        await placeholder.edit(
+            content=f"Tabulation of **{election.title}** was cancelled."
+        )
+        return
+    except tabulation.TabulationTimeout:
+        # Keep the ballots, and reopen the election without an end time, so
+        # that its creator can end it again rather than it timing out on
+        # schedule over and over.
+        election.end_timestamp = None
+        await _reopen(election)
+        await placeholder.edit(
+            content=(
+                f"Tabulation of **{election.title}** did not finish within "
+                f"{tabulation.TIMEOUT_SECONDS} seconds.  The election is still "
+                "open, and its creator can end it again."
+            )
+        )
+        return
+    except Exception as e:
+        # Reopening keeps the ballots and the election's end time, so the
+        # election checker, which sees this error, tries again later.
+        await _reopen(election)
+        if isinstance(e, tabulation.TabulationBusy):
+            reason = "Too many elections are being tabulated to tabulate"
+        else:
+            reason = "Something went wrong tabulating"
+        await placeholder.edit(
+            content=f"{reason} **{election.title}**.  The election is still open."
+        )
+        raise
+    results_embed = results.set_footer(
         text=f"Computed using {election.method_description(election.method_params)}"
     )
 
-    # Post results to channel
-    if include_announcement:
-        await channel.send(
-            content=f"Election **{election.title}** has ended!",
-            embed=results_embed,
-        )
-    else:
-        await channel.send(embed=results_embed)
+    # Replace the placeholder with the results
+    try:
+        await placeholder.edit(content=announcement, embed=results_embed)
+    except discord.NotFound:
+        await channel.send(content=announcement, embed=results_embed)
 
     # Update the original election message
     if election.message_id:
         try:
-            message = await channel.fetch_message(election.message_id)
-            embed = message.embeds[0] if message.embeds else None
+            embed = await messages.current_embed(channel.id, election.message_id)
             if embed:
                 # Update footer
                 embed.set_footer(text=f"{embed.footer.text} • Election ended")
@@ -376,9 +603,9 @@ async def end_election_and_update_message(
                                 inline=False,
                             )
                             break
-            await message.edit(embed=embed, view=None)
+            await messages.edit(channel.id, election.message_id, embed=embed, view=None)
         except discord.NotFound:
             pass  # Message was deleted
 
     # Delete the election from database
-    db.delete_election(election.election_id)
+    await async_db.delete_election(election.election_id)
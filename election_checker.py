@@ -1,14 +1,33 @@
-"""Background task for checking and ending expired elections."""
+"""Ends elections at their end times.
 
-import discord
-from discord.ext import tasks
-import db
-from election import load_election_from_db, end_election_and_update_message
+Open elections' end times are kept in a min-heap, loaded from the database once
+at startup and then kept up to date by async_db.save_election(),
+mark_election_closed() and delete_election().  A single task sleeps until the
+earliest end time, or until the schedule changes, so the database is never
+polled.  An election stays scheduled until it is closed or deleted, so one
+that fails to end is tried again RETRY_SECONDS later.
+"""
 
+import asyncio
+import heapq
+import time
+import async_db
+
+RETRY_SECONDS = 60
 
 # Will be set by bot.py
 client = None
 
+# (end_timestamp, election_id) pairs.  An entry is stale, and skipped, unless
+# it matches the election's end time, or retry time, in _end_times.
+_heap: list[tuple[float, int]] = []
+_end_times: dict[int, float] = {}
+
+_changed: asyncio.Event | None = None
+_task: asyncio.Task | None = None
+# Tasks ending elections, by election ID.
+_ending: dict[int, asyncio.Task] = {}
+
 
 def set_client(discord_client):
     """Set the Discord client reference."""
@@ -16,44 +35,100 @@ def set_client(discord_client):
     client = discord_client
 
 
-@tasks.loop(seconds=60)
-async def check_expired_elections():
-    """Background task to check for and end expired elections.
+def schedule(election_id: int, end_timestamp: float | None) -> None:
+    """Set when an open election ends, or None if it has no end time."""
+    if end_timestamp is None:
+        if _end_times.pop(election_id, None) is None:
+            return
+    else:
+        if _end_times.get(election_id) == end_timestamp:
+            return
+        _end_times[election_id] = end_timestamp
+        heapq.heappush(_heap, (end_timestamp, election_id))
+    if _changed is not None:
+        _changed.set()
+
+
+def unschedule(election_id: int) -> None:
+    """Forget an election that was closed or deleted."""
+    schedule(election_id, None)
 
-    This task dynamically adjusts its sleep time based on the next election end time,
-    waking up immediately when an election ends rather than polling at fixed intervals.
+
+async def start() -> None:
+    """Load open elections' end times and start ending them.
+
+    Does nothing if already started.
     """
-    import time
-
-    # Load only elections ending within the next 60 seconds (or already expired)
-    elections_ending_soon = db.load_elections_ending_soon(within_seconds=60)
-    current_time = int(time.time())
-    next_end = current_time + 60
-
-    # End expired elections
-    for election_data in elections_ending_soon:
-        if election_data["end_timestamp"] <= current_time:
-            election = load_election_from_db(election_data["election_id"])
-            if not election:
-                continue
-
-            try:
-                # End the election using shared logic
-                channel = client.get_channel(election.channel_id)
-                if channel:
-                    await end_election_and_update_message(
-                        election, channel, include_announcement=True
-                    )
-            except Exception as e:
-                print(f"Error ending election {election.election_id}: {e}")
-        else:
-            next_end = min(next_end, election_data["end_timestamp"])
-
-    sleep_seconds = min(60, max(1, next_end - current_time + 1))
-    check_expired_elections.change_interval(seconds=sleep_seconds)
-
-
-def trigger_check():
-    """Trigger the election check task to run immediately."""
-    if check_expired_elections.is_running():
-        check_expired_elections.restart()
+    global _changed, _task
+    if _task is not None and not _task.done():
+        return
+    _changed = asyncio.Event()
+    for election_id, end_timestamp in await async_db.load_election_end_times():
+        # An election saved while these loaded has a newer end time already.
+        if election_id not in _end_times:
+            schedule(election_id, end_timestamp)
+    _task = asyncio.create_task(_run())
+
+
+def _next_due() -> tuple[int, int] | None:
+    """Return the earliest scheduled end, dropping stale entries."""
+    while _heap:
+        end_timestamp, election_id = _heap[0]
+        if _end_times.get(election_id) == end_timestamp:
+            return end_timestamp, election_id
+        heapq.heappop(_heap)
+    return None
+
+
+async def _run() -> None:
+    while True:
+        due = _next_due()
+        delay = due[0] - time.time() if due else None
+        if delay is not None and delay <= 0:
+            heapq.heappop(_heap)
+            election_id = due[1]
+            # Ending an election waits on its tabulation, which mustn't hold
+            # up the others.
+            if election_id not in _ending:
+                task = asyncio.create_task(_end_election(election_id))
+                _ending[election_id] = task
+                task.add_done_callback(
+                    lambda _, election_id=election_id: _ending.pop(election_id)
+                )
+            continue
+
+        _changed.clear()
+        try:
+            await asyncio.wait_for(_changed.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _retry_later(election_id: int) -> None:
+    """Try ending an election again later, unless it was closed or deleted."""
+    end_timestamp = _end_times.get(election_id)
+    if end_timestamp is None:
+        return
+    schedule(election_id, max(end_timestamp, time.time() + RETRY_SECONDS))
+
+
+async def _end_election(election_id: int) -> None:
+    from election import load_election_from_db_async, end_election_and_update_message
+
+    try:
+        election = await load_election_from_db_async(election_id)
+        if not election or not election.open:
+            unschedule(election_id)
+            return
+
+        # End the election using shared logic.  Ending it closes it, which
+        # unschedules it.
+        channel = client.get_channel(election.channel_id)
+        if channel is None:
+            channel = await client.fetch_channel(election.channel_id)
+        await end_election_and_update_message(
+            election, channel, include_announcement=True
+        )
+    except Exception as e:
+        print(f"Error ending election {election_id}, retrying later: {e}")
+        _retry_later(election_id)
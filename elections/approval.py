@@ -3,6 +3,8 @@ from ballots.simple import SimpleBallot
 from ballot import Ballot
 from typing import Iterable
 import random
+import numpy as np
+import positional
 
 
 class ApprovalElection(Election):
@@ -15,12 +17,11 @@ class ApprovalElection(Election):
         random.shuffle(candidates)
         return SimpleBallot(self.election_id, candidates, multiple_votes=True)
 
-    def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
-        counts = {c: 0 for c in self.candidates}
-        for ballot in ballots:
-            for cand in ballot.votes:
-                if cand in counts:
-                    counts[cand] += 1
+    def tally(self, ballots: Iterable[Ballot]) -> np.ndarray:
+        return positional.choice_counts(ballots, self.candidates)
+
+    def tabulate_tally(self, totals: np.ndarray) -> tuple[list[str], str]:
+        counts = dict(zip(self.candidates, totals.tolist()))
         if counts:
             sorted_candidates = sorted(counts.items(), key=lambda x: x[1], reverse=True)
             max_score = max(counts.values())
@@ -3,6 +3,22 @@ from ballots.ranked import RankedBallot
 from typing import Iterable
 from ballot import Ballot
 import random
+import numpy as np
+import positional
+
+WEIGHTING = "Weighting"
+
+# Points for each ranked candidate, by position (0 for first), the length of
+# its ranking, and the number of candidates.
+WEIGHTINGS = {
+    # n - 1 points for first place down to 0 for last, and 0 for unranked.
+    "standard": lambda positions, lengths, n: n - 1 - positions,
+    # Only the ranked candidates are counted: k points for first of k.
+    "modified": lambda positions, lengths, n: lengths - positions,
+    # 1 point for first, 1/2 for second, 1/3 for third, and so on.
+    "dowdall": lambda positions, lengths, n: 1 / (positions + 1),
+}
+DEFAULT_WEIGHTING = "standard"
 
 
 class BordaElection(Election):
@@ -10,20 +26,53 @@ class BordaElection(Election):
     def method_name(self) -> str:
         return "Borda Count"
 
+    @classmethod
+    def method_description(cls, method_params: dict[str, str]) -> str:
+        weighting = method_params.get(WEIGHTING, DEFAULT_WEIGHTING).strip().lower()
+        if weighting == DEFAULT_WEIGHTING:
+            return cls.method_name()
+        return f"{cls.method_name()} ({weighting.capitalize()} weighting)"
+
+    @classmethod
+    def method_param_names(cls) -> list[str]:
+        return [WEIGHTING]
+
+    @classmethod
+    def default_method_params(cls) -> dict[str, str]:
+        return {WEIGHTING: DEFAULT_WEIGHTING}
+
+    @classmethod
+    def validate_method_params(
+        cls, params: dict[str, str], candidates: list[str]
+    ) -> str | None:
+        weighting = params.get(WEIGHTING, DEFAULT_WEIGHTING).strip().lower()
+        if weighting not in WEIGHTINGS:
+            return f"Weighting must be one of: {', '.join(WEIGHTINGS)}."
+        return None
+
     def blank_ballot(self) -> RankedBallot:
         candidates = list(self.candidates)
         random.shuffle(candidates)
         return RankedBallot(self.election_id, candidates)
 
-    def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
+    def tally(self, ballots: Iterable[Ballot]) -> np.ndarray:
+        num_candidates = len(self.candidates)
+        weighting = self.method_params.get(WEIGHTING, DEFAULT_WEIGHTING)
+        points = WEIGHTINGS[weighting.strip().lower()]
+        return positional.positional_scores(
+            ballots,
+            self.candidates,
+            lambda positions, lengths: points(positions, lengths, num_candidates),
+        )
+
+    def tabulate_tally(self, totals: np.ndarray) -> tuple[list[str], str]:
         lines = []
         candidates = self.candidates
-        num_candidates = len(candidates)
 
-        scores = {c: 0 for c in candidates}
-        for ballot in ballots:
-            for i, candidate in enumerate(ballot.ranking):
-                scores[candidate] += num_candidates - 1 - i
+        if totals.dtype.kind == "f":
+            # Fractional points summed in a different order shouldn't break ties.
+            totals = totals.round(9)
+        scores = dict(zip(candidates, totals.tolist()))
 
         sorted_candidates = sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
@@ -32,7 +81,7 @@ class BordaElection(Election):
             return [], "\n".join(lines)
 
         for c, s in sorted_candidates:
-            lines.append(f"- {c}: {s}")
+            lines.append(f"- {c}: {s:.2f}" if isinstance(s, float) else f"- {c}: {s}")
 
         top_score = sorted_candidates[0][1]
         winners = [c for c, s in sorted_candidates if s == top_score]
@@ -3,6 +3,8 @@ from ballots.ranked import RankedBallot
 from ballot import Ballot
 from typing import Iterable
 import random
+import numpy as np
+import pairwise
 
 
 class CopelandElection(Election):
@@ -23,13 +25,17 @@ class CopelandElection(Election):
         else:
             return []
 
-    def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
+    def tally(self, ballots: Iterable[Ballot]) -> np.ndarray:
+        return pairwise.preference_matrix(ballots, self.candidates)
+
+    def tabulate_tally(self, preferences: np.ndarray) -> tuple[list[str], str]:
         if not self.candidates:
             return [], "No candidates were found."
 
         lines = []
         lines.append("**Pairwise Matchups:**")
 
+        preferences = preferences.tolist()
         candidate_stats = {
             c: {"wins": 0, "losses": 0, "ties": 0} for c in self.candidates
         }
@@ -37,23 +43,8 @@ class CopelandElection(Election):
             for j in range(i + 1, len(self.candidates)):
                 a = self.candidates[i]
                 b = self.candidates[j]
-                a_prefs = 0
-                b_prefs = 0
-                for ballot in ballots:
-                    a_pos = (
-                        ballot.ranking.index(a)
-                        if a in ballot.ranking
-                        else len(ballot.ranking)
-                    )
-                    b_pos = (
-                        ballot.ranking.index(b)
-                        if b in ballot.ranking
-                        else len(ballot.ranking)
-                    )
-                    if a_pos < b_pos:
-                        a_prefs += 1
-                    elif b_pos < a_pos:
-                        b_prefs += 1
+                a_prefs = preferences[i][j]
+                b_prefs = preferences[j][i]
 
                 if a_prefs > b_prefs:
                     result = f"{a} defeats {b}"
@@ -2,8 +2,280 @@ from election import Election
 from ballots.ranked import RankedBallot
 from typing import Iterable
 from ballot import Ballot
-import itertools
 import random
+import time
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import lil_matrix
+import pairwise
+
+# Above this many candidates, the subset table (2^C scores) gets too large and
+# the integer program is used instead.
+MAX_DP_CANDIDATES = 20
+
+# The integer program needs a constraint for every cycle of three candidates.
+# Above this many, or if a solve runs out of time, a heuristic search is used.
+MAX_MILP_CONSTRAINTS = 10_000
+MILP_SECONDS = 5.0
+
+# Time the heuristic search spends improving its ordering.
+HEURISTIC_SECONDS = 2.0
+
+# Tied optimal orderings listed in the details.
+MAX_TIED_ORDERINGS = 10
+
+
+def _subset_sums(values: np.ndarray) -> np.ndarray:
+    """Return the sum of values over every subset, indexed by bitmask."""
+    sums = np.zeros(1, np.int64)
+    for value in values:
+        sums = np.concatenate([sums, sums + value])
+    return sums
+
+
+class _SubsetTable:
+    """Best Kemeny score of every subset of candidates, by bitmask DP.
+
+    best[S] is the highest number of agreeing pairwise preferences over all
+    orderings of the candidates in S.  An ordering of S ends with some c, after
+    an ordering of S without c, so best[S] is the max over c in S of
+    best[S - c] + gain(c, S - c), where gain(c, T) counts the preferences for
+    candidates in T over c.  The subsets are filled in order of size, with each
+    size done as one array operation per candidate.
+    """
+
+    def __init__(self, preferences: np.ndarray):
+        n = len(preferences)
+        self.n = n
+        self.full = (1 << n) - 1
+        # gain(c, T) is split into lookups on the low and high halves of T.
+        self.half = n // 2
+        self.low_bits = (1 << self.half) - 1
+        self.low = [_subset_sums(preferences[: self.half, c]) for c in range(n)]
+        self.high = [_subset_sums(preferences[self.half :, c]) for c in range(n)]
+
+        masks = np.arange(1 << n, dtype=np.int64)
+        sizes = np.zeros(1 << n, np.int8)
+        for c in range(n):
+            sizes += (masks >> c & 1).astype(np.int8)
+        order = np.argsort(sizes, kind="stable")
+        ends = np.cumsum(np.bincount(sizes, minlength=n + 1))
+        self.layers = [order[ends[k - 1] : ends[k]] for k in range(1, n + 1)]
+
+        self.best = np.zeros(1 << n, np.int64)
+        for layer in self.layers:
+            layer_best = np.full(len(layer), -1, np.int64)
+            for c in range(n):
+                has_c = (layer >> c & 1).astype(bool)
+                score = self._extend(layer[has_c] ^ (1 << c), c)
+                layer_best[has_c] = np.maximum(layer_best[has_c], score)
+            self.best[layer] = layer_best
+
+    def _extend(self, prev, c: int):
+        """Best score of ordering prev and then c."""
+        return (
+            self.best[prev]
+            + self.low[c][prev & self.low_bits]
+            + self.high[c][prev >> self.half]
+        )
+
+    def score(self) -> int:
+        return int(self.best[self.full])
+
+    def first_choices(self) -> list[int]:
+        """Return every candidate that starts some optimal ordering."""
+        on_path = np.zeros(1 << self.n, bool)
+        on_path[self.full] = True
+        for layer in reversed(self.layers):
+            layer = layer[on_path[layer]]
+            for c in range(self.n):
+                has_c = (layer >> c & 1).astype(bool)
+                prev = layer[has_c] ^ (1 << c)
+                tight = self._extend(prev, c) == self.best[layer[has_c]]
+                on_path[prev[tight]] = True
+        return [c for c in range(self.n) if on_path[1 << c]]
+
+    def orderings(self, limit: int) -> tuple[list[list[int]], bool]:
+        """Return up to limit optimal orderings, and whether there are more."""
+        found = []
+        more = False
+
+        def walk(mask: int, suffix: list[int]):
+            nonlocal more
+            if mask == 0:
+                if len(found) < limit:
+                    found.append(suffix)
+                else:
+                    more = True
+                return
+            for c in range(self.n):
+                if more:
+                    return
+                if mask >> c & 1:
+                    prev = mask ^ (1 << c)
+                    if self._extend(prev, c) == self.best[mask]:
+                        walk(prev, [c] + suffix)
+
+        walk(self.full, [])
+        return sorted(found), more
+
+
+def _milp_orderings(
+    preferences: np.ndarray, limit: int
+) -> tuple[int, list[list[int]], bool] | None:
+    """Find optimal orderings as an integer program over pairwise orders.
+
+    x[a, b] is 1 if a is ranked above b.  Each pair is ordered one way, and no
+    three candidates may form a cycle.  Further optimal orderings are found by
+    excluding each one found and solving again at the optimal score.
+    """
+    n = len(preferences)
+    pairs = [(a, b) for a in range(n) for b in range(n) if a != b]
+    var = {pair: i for i, pair in enumerate(pairs)}
+    objective = -np.array([preferences[a][b] for a, b in pairs], float)
+
+    rows = n * (n - 1) // 2 + n * (n - 1) * (n - 2) // 3
+    A = lil_matrix((rows, len(pairs)))
+    lower = np.zeros(rows)
+    upper = np.zeros(rows)
+    row = 0
+    for a in range(n):
+        for b in range(a + 1, n):
+            A[row, var[a, b]] = A[row, var[b, a]] = 1
+            lower[row] = upper[row] = 1
+            row += 1
+            for c in range(b + 1, n):
+                for x, y, z in ((a, b, c), (a, c, b)):
+                    A[row, var[x, y]] = A[row, var[y, z]] = A[row, var[z, x]] = 1
+                    lower[row], upper[row] = -np.inf, 2
+                    row += 1
+    constraints = [LinearConstraint(A.tocsr(), lower, upper)]
+
+    best_score = None
+    found = []
+    while True:
+        res = milp(
+            objective,
+            constraints=constraints,
+            integrality=np.ones(len(pairs)),
+            bounds=Bounds(0, 1),
+            options={"time_limit": MILP_SECONDS},
+        )
+        if not res.success:
+            # Only a proven infeasible problem means every optimal ordering
+            # was found; a re-solve that hit the time limit may have missed
+            # some.
+            if found and res.status != 2:
+                return best_score, sorted(found), True
+            break
+        chosen = np.round(res.x).astype(bool)
+        score = int(round(-res.fun))
+        if best_score is None:
+            best_score = score
+            constraints.append(LinearConstraint(objective, -np.inf, -best_score))
+        elif score < best_score:
+            break
+        if len(found) == limit:
+            return best_score, sorted(found), True
+        wins = [0] * n
+        for (a, _), above in zip(pairs, chosen):
+            wins[a] += above
+        found.append(sorted(range(n), key=lambda c: -wins[c]))
+        constraints.append(
+            LinearConstraint(chosen.astype(float), -np.inf, chosen.sum() - 1)
+        )
+    if best_score is None:
+        return None
+    return best_score, sorted(found), False
+
+
+def _milp_constraint_count(n: int) -> int:
+    return n * (n - 1) // 2 + n * (n - 1) * (n - 2) // 3
+
+
+def _ordering_score(preferences: np.ndarray, ordering: list[int]) -> int:
+    ordered = preferences[np.ix_(ordering, ordering)]
+    return int(np.triu(ordered, 1).sum())
+
+
+def _best_insertions(margins: np.ndarray, ordering: list[int]) -> list[int]:
+    """Move candidates to their best positions until no move improves the score.
+
+    Moving x from position i up to position j < i gains margins[x, y] for each
+    y it passes; moving it down loses margins[x, y] instead.  Each candidate's
+    best move is found from the cumulative sums of its row of margins.
+    """
+    ordering = list(ordering)
+    improved = True
+    while improved:
+        improved = False
+        for x in random.sample(ordering, len(ordering)):
+            i = ordering.index(x)
+            rest = ordering[:i] + ordering[i + 1 :]
+            # gains[j] is the change from inserting x before rest[j].
+            passed = margins[x, rest]
+            gains = np.concatenate([[0], np.cumsum(passed)])
+            gains = gains[i] - gains
+            j = int(np.argmax(gains))
+            if gains[j] > 0:
+                ordering = rest[:j] + [x] + rest[j:]
+                improved = True
+    return ordering
+
+
+def _heuristic_ordering(
+    preferences: np.ndarray, seconds: float, bound: int
+) -> tuple[int, list[int], str]:
+    """Search for a high-scoring ordering within a time budget.
+
+    Starts from the better of the Borda and Copeland orders, climbs to a local
+    optimum by moving single candidates, then repeatedly perturbs the best
+    ordering found and climbs again until time runs out or the score reaches
+    bound.
+    """
+    deadline = time.monotonic() + seconds
+    margins = pairwise.margin_matrix(preferences)
+    n = len(preferences)
+    seeds = {
+        "Borda": sorted(range(n), key=lambda c: -preferences[c].sum()),
+        "Copeland": sorted(range(n), key=lambda c: -np.sign(margins[c]).sum()),
+    }
+    seed_name, best = max(
+        seeds.items(), key=lambda item: _ordering_score(preferences, item[1])
+    )
+    best = _best_insertions(margins, best)
+    best_score = _ordering_score(preferences, best)
+    while best_score < bound and time.monotonic() < deadline:
+        ordering = list(best)
+        for _ in range(max(2, n // 10)):
+            x = ordering.pop(random.randrange(n))
+            ordering.insert(random.randrange(n), x)
+        ordering = _best_insertions(margins, ordering)
+        score = _ordering_score(preferences, ordering)
+        if score > best_score:
+            best, best_score = ordering, score
+    return best_score, best, seed_name
+
+
+def _score_upper_bound(preferences: np.ndarray) -> int:
+    """Return a score no ordering can exceed.
+
+    At best every pair is ordered as its majority prefers.  Each cycle of
+    majorities a > b > c > a must be broken somewhere, costing at least its
+    smallest margin, so that is subtracted for a set of cycles sharing no pair.
+    """
+    margins = pairwise.margin_matrix(preferences)
+    bound = int(np.maximum(preferences, preferences.T).sum() // 2)
+    beats = margins > 0
+    for a, b in zip(*np.nonzero(beats)):
+        if not beats[a, b]:
+            continue
+        closing = np.nonzero(beats[b] & beats[:, a])[0]
+        if len(closing):
+            c = closing[0]
+            bound -= int(min(margins[a, b], margins[b, c], margins[c, a]))
+            beats[a, b] = beats[b, c] = beats[c, a] = False
+    return bound
 
 
 class KemenyYoungElection(Election):
@@ -16,24 +288,20 @@ class KemenyYoungElection(Election):
         random.shuffle(candidates)
         return RankedBallot(self.election_id, candidates)
 
-    def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
+    def tally(self, ballots: Iterable[Ballot]) -> np.ndarray:
+        return pairwise.preference_matrix(ballots, self.candidates)
+
+    def tabulate_tally(self, preferences: np.ndarray) -> tuple[list[str], str]:
         if len(self.candidates) == 0:
             return [], "No candidates were found."
-        elif len(self.candidates) > 6:
-            return [], "Too many candidates for Kemeny-Young."
 
         lines = []
 
+        counts = preferences.tolist()
         pairwise_preference = {
-            a: {b: 0 for b in self.candidates if b != a} for a in self.candidates
+            a: {b: counts[i][j] for j, b in enumerate(self.candidates) if b != a}
+            for i, a in enumerate(self.candidates)
         }
-        for ballot in ballots:
-            for i, a in enumerate(ballot.ranking):
-                for b in ballot.ranking[i + 1 :]:
-                    pairwise_preference[a][b] += 1
-                for c in self.candidates:
-                    if c not in ballot.ranking:
-                        pairwise_preference[a][c] += 1
 
         lines.append("Pairwise Preferences:")
         for a in self.candidates:
@@ -48,18 +316,21 @@ class KemenyYoungElection(Election):
                     else:
                         lines.append(f"- {a} vs {b}: 0 - 0")
 
-        best_score = -1
-        best_permutation = []
-        for permutation in itertools.permutations(self.candidates):
-            score = 0
-            for i, a in enumerate(permutation):
-                for b in permutation[i + 1 :]:
-                    score += pairwise_preference[a][b]
-            if score > best_score:
-                best_score = score
-                best_permutation = [permutation]
-            elif score == best_score:
-                best_permutation.append(permutation)
+        if len(self.candidates) <= MAX_DP_CANDIDATES:
+            table = _SubsetTable(preferences)
+            best_score = table.score()
+            orderings, more = table.orderings(MAX_TIED_ORDERINGS)
+            first_choices = table.first_choices()
+        else:
+            solved = None
+            if _milp_constraint_count(len(self.candidates)) <= MAX_MILP_CONSTRAINTS:
+                solved = _milp_orderings(preferences, MAX_TIED_ORDERINGS)
+            if solved is None:
+                return self._tabulate_heuristic(preferences, lines)
+            best_score, orderings, more = solved
+            # Without enumerating every tie, only the listed ones are known.
+            first_choices = sorted(set(r[0] for r in orderings))
+        best_permutation = [[self.candidates[i] for i in r] for r in orderings]
 
         lines.append(f"**Best Kemeny Score**: {best_score}")
         if len(best_permutation) == 1:
@@ -69,6 +340,32 @@ class KemenyYoungElection(Election):
             lines.append("Tie between:")
             for r in best_permutation:
                 lines.append("- " + ", ".join(r))
+            if more:
+                lines.append("- and other orderings with the same score")
 
-        winners = list(set(r[0] for r in best_permutation))
+        winners = [self.candidates[i] for i in first_choices]
         return winners, "\n".join(lines)
+
+    def _tabulate_heuristic(
+        self, preferences: np.ndarray, lines: list[str]
+    ) -> tuple[list[str], str]:
+        bound = _score_upper_bound(preferences)
+        score, ordering, seed_name = _heuristic_ordering(
+            preferences, HEURISTIC_SECONDS, bound
+        )
+        lines.append(
+            f"Too many candidates to find the best ordering exactly; searched "
+            f"for up to {HEURISTIC_SECONDS:g} seconds starting from the "
+            f"{seed_name} order."
+        )
+        lines.append(f"**Kemeny Score Found**: {score}")
+        if score == bound:
+            lines.append("This is the best possible score.")
+        else:
+            lines.append(
+                f"The best possible score is at most {bound}, so this ordering "
+                f"is within {bound - score} ({(bound - score) / bound:.2%}) of optimal."
+            )
+        for i in ordering:
+            lines.append(f"- {self.candidates[i]}")
+        return [self.candidates[ordering[0]]], "\n".join(lines)
@@ -3,6 +3,8 @@ from ballots.simple import SimpleBallot
 from ballot import Ballot
 from typing import Iterable
 import random
+import numpy as np
+import positional
 
 
 class PluralityElection(Election):
@@ -15,12 +17,11 @@ class PluralityElection(Election):
         random.shuffle(candidates)
         return SimpleBallot(self.election_id, candidates, multiple_votes=False)
 
-    def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
-        counts = {c: 0 for c in self.candidates}
-        for ballot in ballots:
-            for candidate in ballot.votes:
-                if candidate in counts:
-                    counts[candidate] += 1
+    def tally(self, ballots: Iterable[Ballot]) -> np.ndarray:
+        return positional.choice_counts(ballots, self.candidates)
+
+    def tabulate_tally(self, totals: np.ndarray) -> tuple[list[str], str]:
+        counts = dict(zip(self.candidates, totals.tolist()))
         sorted_candidates = sorted(counts.items(), key=lambda x: x[1], reverse=True)
         if counts:
             max_score = max(counts.values())
@@ -3,6 +3,53 @@ from ballots.ranked import RankedBallot
 from ballot import Ballot
 from typing import Iterable
 import random
+import numpy as np
+import pairwise
+
+
+def _lock_pairs(n: int, pairs: list[tuple[int, int]]) -> list[bool]:
+    """Lock each (winner, loser) pair in turn unless it would make a cycle.
+
+    reaches[x] is a bitmask of the candidates reachable from x through locked
+    pairs, kept transitively closed as pairs are added, so checking for a cycle
+    is a single bit test.  Returns whether each pair was locked.
+    """
+    reaches = [0] * n
+    locked = []
+    for winner, loser in pairs:
+        if reaches[loser] >> winner & 1:
+            locked.append(False)
+            continue
+        locked.append(True)
+        if reaches[winner] >> loser & 1:
+            # Already implied by stronger pairs, so nothing new is reachable.
+            continue
+        gained = 1 << loser | reaches[loser]
+        for x in range(n):
+            if x == winner or reaches[x] >> winner & 1:
+                reaches[x] |= gained
+    return locked
+
+
+def _topological_layers(n: int, edges: list[tuple[int, int]]) -> list[list[int]]:
+    """Sort a DAG into layers, each after all of its nodes' predecessors."""
+    successors = [[] for _ in range(n)]
+    in_degree = [0] * n
+    for a, b in edges:
+        successors[a].append(b)
+        in_degree[b] += 1
+    layer = [c for c in range(n) if in_degree[c] == 0]
+    layers = []
+    while layer:
+        layers.append(layer)
+        following = []
+        for a in layer:
+            for b in successors[a]:
+                in_degree[b] -= 1
+                if in_degree[b] == 0:
+                    following.append(b)
+        layer = sorted(following)
+    return layers
 
 
 class RankedPairsElection(Election):
@@ -15,82 +62,64 @@ class RankedPairsElection(Election):
         random.shuffle(candidates)
         return RankedBallot(self.election_id, candidates)
 
-    def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
-        pairwise = {
-            (a, b): 0 for a in self.candidates for b in self.candidates if a != b
-        }
-        for ballot in ballots:
-            for i, a in enumerate(ballot.ranking):
-                for b in ballot.ranking[i + 1 :]:
-                    pairwise[(a, b)] += 1
-                unranked = set(self.candidates) - set(ballot.ranking)
-                for b in unranked:
-                    pairwise[(a, b)] += 1
+    def tally(self, ballots: Iterable[Ballot]) -> np.ndarray:
+        return pairwise.preference_matrix(ballots, self.candidates)
+
+    def tabulate_tally(self, preferences: np.ndarray) -> tuple[list[str], str]:
+        candidates = self.candidates
+        n = len(candidates)
+        counts = preferences.tolist()
 
         lines = []
         lines.append("**Pairwise Matchups:**")
 
-        margins = {}
-        for a, b in pairwise.keys():
-            a_wins = pairwise[(a, b)]
-            b_wins = pairwise[(b, a)]
-            if a_wins > b_wins:
-                if a < b:
-                    lines.append(f"- {a} defeats {b}: {a_wins}-{b_wins}")
-                margins[(a, b)] = a_wins - b_wins
-            elif b_wins > a_wins:
-                if a < b:
-                    lines.append(f"- {b} defeats {a}: {b_wins}-{a_wins}")
-                margins[(b, a)] = b_wins - a_wins
-            else:
-                if a < b:
-                    lines.append(f"- {a} and {b} tie: {a_wins}-{b_wins}")
+        # (margin, winner, loser) for each pair that isn't tied, by index.
+        majorities = []
+        for i, a in enumerate(candidates):
+            for j, b in enumerate(candidates):
+                if i == j:
+                    continue
+                a_wins = counts[i][j]
+                b_wins = counts[j][i]
+                if a_wins > b_wins:
+                    if a < b:
+                        lines.append(f"- {a} defeats {b}: {a_wins}-{b_wins}")
+                    if i < j:
+                        majorities.append((a_wins - b_wins, i, j))
+                elif b_wins > a_wins:
+                    if a < b:
+                        lines.append(f"- {b} defeats {a}: {b_wins}-{a_wins}")
+                    if i < j:
+                        majorities.append((b_wins - a_wins, j, i))
+                else:
+                    if a < b:
+                        lines.append(f"- {a} and {b} tie: {a_wins}-{b_wins}")
 
         lines.append("")
         lines.append("**Locked rankings:**")
 
-        locked_pairs = []
-
-        def reachable(x, y):
-            visited = set()
-            stack = [x]
-            while stack:
-                node = stack.pop()
-                if node == y:
-                    return True
-                visited.add(node)
-                stack.extend(
-                    [
-                        dest
-                        for src, dest in locked_pairs
-                        if src == node and dest not in visited
-                    ]
-                )
-
-        for (a, b), _ in sorted(margins.items(), key=lambda x: x[1], reverse=True):
-            if not reachable(b, a):
-                lines.append(f"- {a} > {b}")
-                locked_pairs.append((a, b))
+        # Strongest majorities first; equal margins in candidate-list order.
+        majorities.sort(key=lambda m: (-m[0], min(m[1], m[2]), max(m[1], m[2])))
+        locked = _lock_pairs(n, [(w, l) for _, w, l in majorities])
+        for (_, w, l), was_locked in zip(majorities, locked):
+            if was_locked:
+                lines.append(f"- {candidates[w]} > {candidates[l]}")
             else:
                 lines.append(
-                    f"- Ignoring {a} > {b} because it contradicts stronger preferences"
+                    f"- Ignoring {candidates[w]} > {candidates[l]} because it contradicts stronger preferences"
                 )
 
-        beat_counts = {c: 0 for c in self.candidates}
-        for _, b in locked_pairs:
-            beat_counts[b] += 1
-
         lines.append("")
         lines.append("**Final ordering:**")
 
-        last_score = None
-        rank = 0
-        winners = []
-        for i, (c, score) in enumerate(sorted(beat_counts.items(), key=lambda x: x[1])):
-            if score != last_score:
-                rank = i + 1
-            lines.append(f"{rank}. {c}")
-            if rank == 1:
-                winners.append(c)
+        layers = _topological_layers(
+            n, [(w, l) for (_, w, l), ok in zip(majorities, locked) if ok]
+        )
+        rank = 1
+        for layer in layers:
+            for c in layer:
+                lines.append(f"{rank}. {candidates[c]}")
+            rank += len(layer)
 
+        winners = [candidates[c] for c in layers[0]] if layers else []
         return winners, "\n".join(lines)
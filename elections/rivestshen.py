@@ -1,10 +1,111 @@
 from election import Election
 from ballots.ranked import RankedBallot
 import numpy as np
-from scipy.optimize import minimize, LinearConstraint
+from scipy.optimize import linprog, minimize, LinearConstraint
 import random
 from ballot import Ballot
 from typing import Iterable
+import pairwise
+
+# Tolerance for checking a solution.
+TOLERANCE = 1e-7
+
+
+def _is_equilibrium(M: np.ndarray, p: np.ndarray) -> bool:
+    """Check that p is a probability distribution no pure strategy beats."""
+    scale = max(1.0, np.abs(M).max())
+    return (
+        bool(np.all(p >= -TOLERANCE))
+        and abs(p.sum() - 1) < TOLERANCE
+        and bool(np.all(M.T @ p >= -TOLERANCE * scale))
+    )
+
+
+def _equilibrium_lp(M: np.ndarray) -> np.ndarray | None:
+    """Find the minimum-norm optimal strategy of the margin game by LP.
+
+    The game is symmetric, so its value is 0 and the optimal strategies are the
+    distributions p with M^T p >= 0.  Without normalizing, these p form a cone,
+    so a first linear program can scale and add them until every candidate any
+    optimal strategy plays has p >= 1; that is the support S.  Every column in
+    S then pays exactly 0, so the optimal strategies lie on
+    {p : M[S, S]^T p = 0, sum(p) = 1}, and the least-squares solution of that
+    system is the minimum-norm one.  Returns None if either stage fails.
+    """
+    m = len(M)
+    # Variables are p, then t with t <= p and t <= 1; maximize sum(t).
+    res = linprog(
+        np.concatenate([np.zeros(m), -np.ones(m)]),
+        A_ub=np.block([[-M.T, np.zeros((m, m))], [-np.eye(m), np.eye(m)]]),
+        b_ub=np.zeros(2 * m),
+        bounds=[(0, None)] * m + [(0, 1)] * m,
+        method="highs",
+    )
+    if not res.success or res.x[:m].sum() <= 0:
+        return None
+    support = np.nonzero(res.x[m:] > 0.5)[0]
+
+    system = np.vstack([M[np.ix_(support, support)].T, np.ones(len(support))])
+    target = np.zeros(len(support) + 1)
+    target[-1] = 1
+    p = np.zeros(m)
+    p[support] = np.linalg.lstsq(system, target, rcond=None)[0]
+    if _is_equilibrium(M, p):
+        p = np.clip(p, 0, None)
+        return p / p.sum()
+
+    # The LP's own solution is optimal, just not necessarily minimum-norm;
+    # polish it with the quadratic program.
+    return _equilibrium_qp(M, x0=res.x[:m] / res.x[:m].sum())
+
+
+def _equilibrium_qp(M: np.ndarray, x0: np.ndarray | None = None) -> np.ndarray | None:
+    """Find the minimum-norm optimal strategy as a quadratic program.
+
+    Shifting the margins by w makes every entry positive, and then the optimal
+    strategies are w times the p with (M + w)^T p >= 1 and sum(p) = 1 / w.
+    Starts from x0, a distribution, if given.  Returns None if no solution is
+    found.
+    """
+    m = len(M)
+    w = 1 - M.min()
+    M_prime = M + w
+    sum_p = 1.0 / w
+
+    A = M_prime.T
+    b = np.ones(m)
+
+    def objective(p):
+        return np.sum(p**2)
+
+    def grad_objective(p):
+        return 2 * p
+
+    A_eq_sum = np.ones((1, m))
+    b_eq_sum = np.array([sum_p])
+    eq_constraint = LinearConstraint(A_eq_sum, b_eq_sum, b_eq_sum)
+
+    ineq_constraint = LinearConstraint(A, b, np.full(m, np.inf))
+    bounds = [(0, None)] * m
+
+    qp_res = minimize(
+        objective,
+        x0=np.full(m, sum_p / m) if x0 is None else x0 * sum_p,
+        jac=grad_objective,
+        constraints=[eq_constraint, ineq_constraint],
+        bounds=bounds,
+        method="trust-constr",
+        options={"verbose": 0},
+    )
+
+    if not qp_res.success:
+        return None
+
+    p_star = qp_res.x * w
+    total = sum(p_star)
+    if total <= 0:
+        return None
+    return p_star / total
 
 
 class RivestShenGTElection(Election):
@@ -17,78 +118,28 @@ class RivestShenGTElection(Election):
         random.shuffle(candidates)
         return RankedBallot(self.election_id, candidates)
 
-    def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
+    def tally(self, ballots: Iterable[Ballot]) -> np.ndarray:
+        return pairwise.preference_matrix(ballots, self.candidates)
+
+    def tabulate_tally(self, preferences: np.ndarray) -> tuple[list[str], str]:
         if not self.candidates:
             return [], "No candidates were found."
 
-        m = len(self.candidates)
-        M = [[0] * m for _ in range(m)]
-
-        for i in range(m):
-            for j in range(m):
-                if i == j:
-                    M[i][j] = 0
-                else:
-                    i_pref_j = 0
-                    j_pref_i = 0
-                    for ballot in ballots:
-                        ranking = ballot.ranking
-                        try:
-                            i_pos = ranking.index(self.candidates[i])
-                        except ValueError:
-                            i_pos = len(ranking)
-                        try:
-                            j_pos = ranking.index(self.candidates[j])
-                        except ValueError:
-                            j_pos = len(ranking)
-
-                        if i_pos < j_pos:
-                            i_pref_j += 1
-                        elif j_pos < i_pos:
-                            j_pref_i += 1
-                    M[i][j] = i_pref_j - j_pref_i
-
-        w = 1 - min(min(row) for row in M)
-        M_prime = np.array(M, dtype=float) + w
-        sum_p = 1.0 / w
-
-        A = M_prime.T
-        b = np.ones(m)
-
-        def objective(p):
-            return np.sum(p**2)
-
-        def grad_objective(p):
-            return 2 * p
-
-        A_eq_sum = np.ones((1, m))
-        b_eq_sum = np.array([sum_p])
-        eq_constraint = LinearConstraint(A_eq_sum, b_eq_sum, b_eq_sum)
-
-        ineq_constraint = LinearConstraint(A, b, np.full(m, np.inf))
-        bounds = [(0, None)] * m
-
-        qp_res = minimize(
-            objective,
-            x0=np.full(m, sum_p / m),
-            jac=grad_objective,
-            constraints=[eq_constraint, ineq_constraint],
-            bounds=bounds,
-            method="trust-constr",
-            options={"verbose": 0},
-        )
-
-        if not qp_res.success:
-            return [], "No optimal solution found for the Rivest-Shen GT equilibrium."
-
-        p = qp_res.x
-        p_star = p * w
+        M = pairwise.margin_matrix(preferences).tolist()
 
-        total = sum(p_star)
-        if total > 0:
-            p_dist = [x / total for x in p_star]
+        margins = np.array(M, dtype=float)
+        p_dist = _equilibrium_lp(margins)
+        if p_dist is None:
+            p_dist = _equilibrium_qp(margins)
+        if p_dist is None:
+            return [], "No optimal solution found for the Rivest-Shen GT equilibrium."
 
-        winner = random.choices(self.candidates, weights=p_dist, k=1)[0]
+        # The draw is seeded by the election and its ballots, so a preview and
+        # the final result from the same ballots draw the same winner.
+        seed = (self.election_id or 0).to_bytes(8, "big") + np.asarray(
+            preferences, np.int64
+        ).tobytes()
+        winner = random.Random(seed).choices(self.candidates, weights=p_dist, k=1)[0]
 
         lines = []
         lines.append("**Margin Matrix M:**")
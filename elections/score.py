@@ -3,6 +3,8 @@ from ballots.score import ScoreBallot
 from ballot import Ballot
 from typing import Iterable
 import random
+import numpy as np
+import ratings
 
 
 class ScoreElection(Election):
@@ -15,16 +17,14 @@ class ScoreElection(Election):
         random.shuffle(candidates)
         return ScoreBallot(self.election_id, candidates)
 
-    def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
-        ballots = list(ballots)
-        if not ballots:
+    def tally(self, ballots: Iterable[Ballot]) -> np.ndarray:
+        return ratings.rating_totals(*ratings.rating_matrix(ballots, self.candidates))
+
+    def tabulate_tally(self, totals: np.ndarray) -> tuple[list[str], str]:
+        if not totals[0]:
             return [], "No ballots were submitted."
-        scores = {c: 0 for c in self.candidates}
-        for ballot in ballots:
-            for cand, rating in ballot.ratings.items():
-                if cand in scores:
-                    scores[cand] += rating
-        scores = {c: s / len(ballots) for c, s in scores.items()}
+        means = ratings.mean_scores(totals).tolist()
+        scores = dict(zip(self.candidates, means))
         sorted_candidates = sorted(scores.items(), key=lambda x: x[1], reverse=True)
         if scores:
             max_score = max(scores.values())
@@ -3,6 +3,8 @@ from ballots.score import ScoreBallot
 from ballot import Ballot
 from typing import Iterable
 import random
+import numpy as np
+import ratings
 
 
 class STARElection(Election):
@@ -15,16 +17,23 @@ class STARElection(Election):
         random.shuffle(candidates)
         return ScoreBallot(self.election_id, candidates)
 
-    def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
-        ballots = list(ballots)
-        if not ballots:
+    def tally(self, ballots: Iterable[Ballot]) -> np.ndarray:
+        # Rating totals, then the pairwise preferences for the runoff, flattened.
+        matrix, counts = ratings.rating_matrix(ballots, self.candidates)
+        return np.concatenate(
+            [
+                ratings.rating_totals(matrix, counts),
+                ratings.preference_matrix(matrix, counts).ravel(),
+            ]
+        )
+
+    def tabulate_tally(self, tally: np.ndarray) -> tuple[list[str], str]:
+        n = len(self.candidates)
+        totals, preferences = tally[: n + 1], tally[n + 1 :].reshape(n, n)
+        if not totals[0]:
             return [], "No ballots were submitted."
-        scores = {c: 0 for c in self.candidates}
-        for ballot in ballots:
-            for cand, rating in ballot.ratings.items():
-                if cand in scores:
-                    scores[cand] += rating
-        scores = {c: s / len(ballots) for c, s in scores.items()}
+        means = ratings.mean_scores(totals)
+        scores = dict(zip(self.candidates, means.tolist()))
         sorted_candidates = sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
         lines = ["**Average Scores:**"]
@@ -40,24 +49,17 @@ class STARElection(Election):
                 sorted_candidates[0][0]
             ], f"Only one candidate: **{sorted_candidates[0][0]}** wins by default."
 
-        top_two = sorted_candidates[:2]
-        finalist_a, _ = top_two[0]
-        finalist_b, _ = top_two[1]
+        a_index, b_index = ratings.finalists(means)
+        finalist_a = self.candidates[a_index]
+        finalist_b = self.candidates[b_index]
 
         lines.append("**Top Two Finalists:**")
         lines.append(f"- {finalist_a} with average score {scores[finalist_a]:.2f}")
         lines.append(f"- {finalist_b} with average score {scores[finalist_b]:.2f}")
         lines.append("")
 
-        a_preferred = 0
-        b_preferred = 0
-        for ballot in ballots:
-            a_score = ballot.ratings.get(finalist_a, 0)
-            b_score = ballot.ratings.get(finalist_b, 0)
-            if a_score > b_score:
-                a_preferred += 1
-            elif b_score > a_score:
-                b_preferred += 1
+        a_preferred = int(preferences[a_index, b_index])
+        b_preferred = int(preferences[b_index, a_index])
 
         lines.append("**Runoff:**")
         lines.append(f"- {finalist_a}: preferred by {a_preferred} ballots")
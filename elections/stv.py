@@ -1,11 +1,28 @@
 import random
-from fractions import Fraction
+import re
 from typing import Iterable
 from election import Election
 from ballots.ranked import RankedBallot
 from ballot import Ballot
+import ballot_piles
 
 NUMBER_OF_WINNERS = "Number of Winners"
+ARITHMETIC = "Arithmetic"
+
+DEFAULT_ARITHMETIC = "exact"
+_FIXED_POINT = re.compile(r"(\d+) decimals?")
+
+
+def _arithmetic(name: str) -> ballot_piles.Arithmetic | None:
+    """Return the arithmetic for an Arithmetic parameter value, or None."""
+    name = name.strip().lower()
+    if name == "exact":
+        return ballot_piles.ExactArithmetic()
+    elif name == "float":
+        return ballot_piles.FloatArithmetic()
+    elif match := _FIXED_POINT.fullmatch(name):
+        return ballot_piles.FixedPointArithmetic(int(match.group(1)))
+    return None
 
 
 class STVElection(Election):
@@ -16,19 +33,23 @@ class STVElection(Election):
     @classmethod
     def method_description(cls, method_params: dict[str, str]) -> str:
         if method_params[NUMBER_OF_WINNERS] == "1":
-            return "Instant Runoff"
+            description = "Instant Runoff"
         else:
-            return (
+            description = (
                 f"Single Transferable Vote for {method_params[NUMBER_OF_WINNERS]} seats"
             )
+        arithmetic = method_params.get(ARITHMETIC, DEFAULT_ARITHMETIC)
+        if arithmetic.strip().lower() != DEFAULT_ARITHMETIC:
+            description += f", counted with {arithmetic.strip().lower()} arithmetic"
+        return description
 
     @classmethod
     def method_param_names(cls) -> list[str]:
-        return [NUMBER_OF_WINNERS]
+        return [NUMBER_OF_WINNERS, ARITHMETIC]
 
     @classmethod
     def default_method_params(self):
-        return {NUMBER_OF_WINNERS: "1"}
+        return {NUMBER_OF_WINNERS: "1", ARITHMETIC: DEFAULT_ARITHMETIC}
 
     @classmethod
     def validate_method_params(
@@ -43,6 +64,8 @@ class STVElection(Election):
                 return "Number of winners cannot be more than the number of candidates."
         except ValueError:
             return "Number of winners must be an integer."
+        if _arithmetic(params.get(ARITHMETIC, DEFAULT_ARITHMETIC)) is None:
+            return 'Arithmetic must be "exact", "float" or a number of decimals, like "4 decimals".'
         return None
 
     def blank_ballot(self) -> RankedBallot:
@@ -52,44 +75,37 @@ class STVElection(Election):
 
     def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
         desired_winners = int(self.method_params[NUMBER_OF_WINNERS])
+        arithmetic = _arithmetic(self.method_params.get(ARITHMETIC, DEFAULT_ARITHMETIC))
+        index = {c: i for i, c in enumerate(self.candidates)}
         active_candidates = set(self.candidates)
         elected_candidates: list[str] = []
         lines: list[str] = []
 
-        aggregated_ballots: dict[tuple[str, ...], Fraction] = {}
-        for ballot in ballots:
-            ranking_tuple = tuple(ballot.ranking)
-            aggregated_ballots[ranking_tuple] = aggregated_ballots.get(
-                ranking_tuple, 0
-            ) + Fraction(1)
-
+        piles = ballot_piles.BallotPiles(ballots, self.candidates, arithmetic)
         round_num = 1
-        exhausted = Fraction(0)
 
         while True:
             lines.append(f"**Round {round_num}:**")
             lines.append(f"Active candidates: {', '.join(sorted(active_candidates))}")
 
-            counts = {c: 0 for c in active_candidates}
-            total_active = Fraction(0)
-            for ranking, weight in aggregated_ballots.items():
-                counts[ranking[0]] = counts.get(ranking[0], 0) + weight
-                total_active += weight
+            counts = {c: piles.totals[index[c]] for c in active_candidates}
+            total_active = sum(counts.values(), arithmetic.zero)
 
-            quota = total_active / Fraction(
-                desired_winners - len(elected_candidates) + 1
+            quota = arithmetic.divide(
+                total_active, desired_winners - len(elected_candidates) + 1
             )
 
             lines.append(
-                f"Active ballots: {float(total_active):.2g}, exhausted: {float(exhausted):.2g}"
+                f"Active ballots: {arithmetic.to_float(total_active):.2g}, exhausted: {arithmetic.to_float(piles.exhausted):.2g}"
             )
 
             sorted_candidates = sorted(counts.items(), key=lambda x: x[1], reverse=True)
             if total_active > 0:
                 lines.append("Current first-preference counts:")
                 for c, v in sorted_candidates:
+                    v = arithmetic.to_float(v)
                     lines.append(
-                        f" - {c}: {float(v):.2g} ({float(v / total_active):.2%})"
+                        f" - {c}: {v:.2g} ({v / arithmetic.to_float(total_active):.2%})"
                     )
 
             max_count = sorted_candidates[0][1]
@@ -102,13 +118,16 @@ class STVElection(Election):
                     lines.append(
                         f"Multiple winners with equal votes. Randomly selected **{winner}**."
                     )
+                quota_share = arithmetic.to_float(quota) / arithmetic.to_float(
+                    total_active
+                )
                 lines.append(
-                    f"Candidate **{winner}** exceeded {float(100 * quota / total_active):.2g}% ({float(quota):.2g} votes) and is elected."
+                    f"Candidate **{winner}** exceeded {100 * quota_share:.2g}% ({arithmetic.to_float(quota):.2g} votes) and is elected."
                 )
                 elected_candidates.append(winner)
 
                 elim = winner
-                quota_fraction = quota / max_count
+                has_surplus = quota > 0
             else:
                 losers = [c for c, v in sorted_candidates if v == min_count]
                 loser = random.choice(losers)
@@ -118,7 +137,7 @@ class STVElection(Election):
                     )
                 lines.append(f"Candidate **{loser}** is eliminated.")
                 elim = loser
-                quota_fraction = 0
+                has_surplus = False
 
             active_candidates.remove(elim)
 
@@ -132,24 +151,15 @@ class STVElection(Election):
             if len(elected_candidates) >= desired_winners:
                 break
 
-            if quota_fraction > 0:
+            if has_surplus:
                 lines.append(
-                    f"Redistributing surplus of {float(max_count - quota):.2g} votes from {elim}."
+                    f"Redistributing surplus of {arithmetic.to_float(max_count - quota):.2g} votes from {elim}."
                 )
-
-            new_aggregated: dict[tuple[str, ...], float] = {}
-            for ranking, weight in aggregated_ballots.items():
-                if ranking[0] == elim:
-                    weight *= 1 - quota_fraction
-                new_ranking = tuple(c for c in ranking if c != elim)
-                if new_ranking:
-                    new_aggregated[new_ranking] = (
-                        new_aggregated.get(new_ranking, 0) + weight
-                    )
-                else:
-                    exhausted += weight
-
-            aggregated_ballots = new_aggregated
+                # The elected candidate keeps quota / max_count of each
+                # ballot; the rest of each is passed on.
+                piles.remove(index[elim], max_count - quota, max_count)
+            else:
+                piles.remove(index[elim])
 
             round_num += 1
 
@@ -1,9 +1,69 @@
 from election import Election
 from ballots.ranked import RankedBallot
 import random
-from collections import defaultdict
 from ballot import Ballot
 from typing import Iterable
+import numpy as np
+import ballot_piles
+import pairwise
+import votes
+
+
+def _smith_set(preferences: np.ndarray, active: list[int]) -> list[int]:
+    """Return the Smith set of the active candidates.
+
+    Draws an edge from each candidate to every candidate that beats or ties
+    it, and finds the strongly connected components with Tarjan's algorithm.
+    Any two candidates have an edge between them, so the components form a
+    chain, and the Smith set is the last one: the only component with no
+    edges leaving it.  Tarjan's algorithm completes that component first.
+    """
+    sub = preferences[np.ix_(active, active)]
+    beaten_by = (sub.T >= sub).tolist()
+    n = len(active)
+    order = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack = []
+    counter = 0
+    for root in range(n):
+        if order[root] >= 0:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, 0)]
+        while work:
+            v, next_w = work[-1]
+            for w in range(next_w, n):
+                if w == v or not beaten_by[v][w]:
+                    continue
+                if order[w] < 0:
+                    work[-1] = (v, w + 1)
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, 0))
+                    break
+                if on_stack[w]:
+                    low[v] = min(low[v], order[w])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+                if low[v] == order[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component.append(active[w])
+                        if w == v:
+                            break
+                    return sorted(component)
+    return []
 
 
 class TidemanAlternativeElection(Election):
@@ -17,23 +77,22 @@ class TidemanAlternativeElection(Election):
         return RankedBallot(self.election_id, candidates)
 
     def tabulate(self, ballots: Iterable[Ballot]) -> tuple[list[str], str]:
+        profile = votes.ranked_profile(ballots, self.candidates)
+        # Dropping candidates doesn't change the order of the others, so the
+        # head-to-head counts between active candidates never change either.
+        preferences = pairwise.preference_matrix(
+            profile, self.candidates, unranked_last=False
+        )
+        piles = ballot_piles.BallotPiles(profile, self.candidates)
+        index = {c: i for i, c in enumerate(self.candidates)}
         lines = []
         active_candidates = set(self.candidates)
         round_num = 1
 
         while True:
-            counts = {c: 0 for c in active_candidates}
-            total_ballots = 0
-            total_exhausted = 0
-
-            # Count first-place votes for active candidates
-            for ballot in ballots:
-                active = [c for c in ballot.ranking if c in active_candidates]
-                if active:
-                    counts[active[0]] += 1
-                    total_ballots += 1
-                else:
-                    total_exhausted += 1
+            counts = {c: piles.totals[index[c]] for c in active_candidates}
+            total_ballots = sum(counts.values())
+            total_exhausted = piles.exhausted
 
             sorted_candidates = sorted(counts.items(), key=lambda x: x[1], reverse=True)
 
@@ -58,42 +117,19 @@ class TidemanAlternativeElection(Election):
                 lines.append(f"Winner: **{leader}** with a majority of active votes.")
                 return [leader], "\n".join(lines)
 
-            # Compute the Smith set
-            pairwise = {
-                a: {b: 0 for b in active_candidates if b != a}
-                for a in active_candidates
+            smith_set = {
+                self.candidates[i]
+                for i in _smith_set(
+                    preferences, sorted(index[c] for c in active_candidates)
+                )
             }
-            for ballot in ballots:
-                ranking = [c for c in ballot.ranking if c in active_candidates]
-                for i in range(len(ranking)):
-                    for j in range(i + 1, len(ranking)):
-                        pairwise[ranking[i]][ranking[j]] += 1
-            smith_set = active_candidates
-            losses = defaultdict(set)
-            for a in active_candidates:
-                for b in active_candidates:
-                    if a != b and pairwise[a][b] <= pairwise[b][a]:
-                        losses[a].add(b)
-
-            def find_closure(c, visited=None):
-                visited = visited or set()
-                if c in visited:
-                    return visited
-                visited.add(c)
-                for a in losses.get(c, []):
-                    find_closure(a, visited)
-                return visited
-
-            for c in active_candidates:
-                if c in smith_set:
-                    closure = find_closure(c)
-                    if len(closure) < len(smith_set):
-                        smith_set = closure
 
             if len(smith_set) < len(active_candidates):
                 lines.append("Eliminating all candidates not in the Smith set:")
                 lines.append(", ".join(sorted(active_candidates - smith_set)))
 
+                for c in active_candidates - smith_set:
+                    piles.remove(index[c])
                 active_candidates = smith_set
             else:
                 min_votes = min(counts.values())
@@ -109,6 +145,7 @@ class TidemanAlternativeElection(Election):
                     loser = random.choice(to_eliminate)
                     lines.append(f"Eliminated: {loser}, by random selection.")
 
+                piles.remove(index[loser])
                 active_candidates.remove(loser)
 
             round_num += 1
@@ -0,0 +1,68 @@
+"""Handles on the bot's public election messages.
+
+Editing or deleting a message only needs its channel and message IDs, so it's
+done through a discord.PartialMessage rather than by fetching the message
+first.  The embed last sent in each message is kept in a bounded cache, for
+the few times its current content is needed, and the message is only fetched
+when the cache doesn't have it.
+"""
+
+from collections import OrderedDict
+import discord
+
+EMBED_CACHE_SIZE = 1024
+
+# Global reference to Discord client (set by bot.py on startup)
+_client: discord.Client | None = None
+
+_embeds: OrderedDict[int, discord.Embed] = OrderedDict()
+
+
+def set_client(client: discord.Client):
+    """Called by bot.py to set the Discord client reference."""
+    global _client
+    _client = client
+
+
+def partial_message(channel_id: int, message_id: int) -> discord.PartialMessage:
+    """Return a handle on a message that can be edited without fetching it."""
+    channel = _client.get_partial_messageable(channel_id)
+    return channel.get_partial_message(message_id)
+
+
+def _remember(message: discord.Message) -> None:
+    if not message.embeds:
+        _embeds.pop(message.id, None)
+        return
+    _embeds[message.id] = message.embeds[0].copy()
+    _embeds.move_to_end(message.id)
+    while len(_embeds) > EMBED_CACHE_SIZE:
+        _embeds.popitem(last=False)
+
+
+async def send(channel: discord.abc.Messageable, **kwargs) -> discord.Message:
+    """Send a message, remembering its embed."""
+    message = await channel.send(**kwargs)
+    _remember(message)
+    return message
+
+
+async def edit(channel_id: int, message_id: int, **kwargs) -> None:
+    """Edit a message without fetching it first, remembering its new embed."""
+    _remember(await partial_message(channel_id, message_id).edit(**kwargs))
+
+
+async def delete(channel_id: int, message_id: int) -> None:
+    """Delete a message without fetching it first."""
+    _embeds.pop(message_id, None)
+    await partial_message(channel_id, message_id).delete()
+
+
+async def current_embed(channel_id: int, message_id: int) -> discord.Embed | None:
+    """Return a copy of the embed a message shows, fetching it only if needed."""
+    embed = _embeds.get(message_id)
+    if embed is None:
+        message = await partial_message(channel_id, message_id).fetch()
+        _remember(message)
+        embed = _embeds.get(message_id)
+    return embed.copy() if embed is not None else None
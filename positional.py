@@ -0,0 +1,79 @@
+"""Counts and positional scores for choice and ranked ballots.
+
+The distinct votes are taken in chunks, each flattened into one array of
+candidate indexes (with each entry's position and its vote's length, for
+rankings), so that counting is a single numpy.bincount per chunk, weighted by
+how many ballots cast each vote.
+"""
+
+from typing import Any, Callable, Iterable
+import numpy as np
+import votes
+
+# Distinct votes flattened at a time.
+CHUNK_SIZE = 4096
+
+# Maps the positions of ranked candidates (0 for first) and the lengths of
+# their rankings to the points each receives.
+Weighting = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+def _flatten(
+    chunk: list[bytes], counts: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Return each entry's candidate, position, vote length and ballot count."""
+    lengths = np.fromiter(map(len, chunk), np.intp, len(chunk))
+    flat = np.frombuffer(b"".join(chunk), np.uint8)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return (
+        flat,
+        np.arange(len(flat)) - starts,
+        np.repeat(lengths, lengths),
+        np.repeat(counts, lengths),
+    )
+
+
+def _count(profile: votes.BallotProfile, num_candidates: int) -> np.ndarray:
+    """Count the ballots including each candidate in their vote."""
+    totals = np.zeros(num_candidates, np.int64)
+    for chunk, counts in profile.chunks(CHUNK_SIZE):
+        flat, _, _, weights = _flatten(chunk, counts)
+        totals += np.bincount(flat, weights=weights, minlength=num_candidates).astype(
+            np.int64
+        )
+    return totals
+
+
+def choice_counts(ballots: Iterable[Any], candidates: list[str]) -> np.ndarray:
+    """Count the ballots choosing each candidate."""
+    return _count(votes.choice_profile(ballots, candidates), len(candidates))
+
+
+def first_preference_counts(
+    ballots: Iterable[Any], candidates: list[str]
+) -> np.ndarray:
+    """Count the ranked ballots that rank each candidate first."""
+    profile = votes.ranked_profile(ballots, candidates)
+    firsts: dict[bytes, int] = {}
+    for ranking, count in profile.counts.items():
+        firsts[ranking[:1]] = firsts.get(ranking[:1], 0) + count
+    return _count(votes.BallotProfile(votes.RankedVote, firsts), len(candidates))
+
+
+def positional_scores(
+    ballots: Iterable[Any], candidates: list[str], weighting: Weighting
+) -> np.ndarray:
+    """Total the points each candidate receives from ranked ballots.
+
+    Integer weightings give integer totals.
+    """
+    empty = np.zeros(0, np.intp)
+    integral = np.issubdtype(np.asarray(weighting(empty, empty)).dtype, np.integer)
+    totals = np.zeros(len(candidates), np.int64 if integral else np.float64)
+    profile = votes.ranked_profile(ballots, candidates)
+    for chunk, counts in profile.chunks(CHUNK_SIZE):
+        flat, positions, lengths, weights = _flatten(chunk, counts)
+        points = weighting(positions, lengths) * weights
+        scores = np.bincount(flat, weights=points, minlength=len(candidates))
+        totals += np.rint(scores).astype(np.int64) if integral else scores
+    return totals
@@ -0,0 +1,58 @@
+"""Score-ballot tabulation on a matrix of ratings.
+
+The distinct ratings cast are packed once into a uint8 matrix, one row per
+distinct vote and one column per candidate, alongside the number of ballots
+casting each row.  Everything else is computed from those with array
+operations.  Unrated candidates count as rated 0, as they always have in
+Score and STAR.
+"""
+
+from typing import Any, Iterable
+import numpy as np
+import votes
+
+# Distinct votes read, or compared pairwise, at a time.
+CHUNK_SIZE = 4096
+
+
+def rating_matrix(
+    ballots: Iterable[Any], candidates: list[str]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return each distinct vote's rating of every candidate, unrated as 0.
+
+    The second result is the number of ballots casting each vote.
+    """
+    n = len(candidates)
+    profile = votes.rated_profile(ballots, candidates)
+    packed = np.frombuffer(b"".join(profile.counts), np.uint8)
+    matrix = packed.reshape(len(profile), n).copy()
+    matrix[matrix == votes.UNRATED] = 0
+    counts = np.fromiter(profile.counts.values(), np.int64, len(profile))
+    return matrix, counts
+
+
+def rating_totals(matrix: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Return the number of ballots, followed by each candidate's total rating."""
+    return np.concatenate([[counts.sum()], counts @ matrix.astype(np.int64)])
+
+
+def mean_scores(totals: np.ndarray) -> np.ndarray:
+    """Return each candidate's average rating, from rating_totals()."""
+    return totals[1:] / totals[0]
+
+
+def finalists(scores: np.ndarray, k: int = 2) -> list[int]:
+    """Return the k highest-scoring candidates, earlier candidates first on ties."""
+    return np.argsort(-scores, kind="stable")[:k].tolist()
+
+
+def preference_matrix(matrix: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Count, for each pair (a, b), the ballots that rate a above b."""
+    n = matrix.shape[1]
+    preferences = np.zeros((n, n), np.int64)
+    for start in range(0, len(matrix), CHUNK_SIZE):
+        chunk = matrix[start : start + CHUNK_SIZE]
+        weights = counts[start : start + CHUNK_SIZE].astype(np.int32)
+        preferred = chunk[:, :, None] > chunk[:, None, :]
+        preferences += np.einsum("b,bij->ij", weights, preferred.view(np.uint8))
+    return preferences
@@ -276,7 +276,7 @@ class ElectionSetup:
                     # Edit back to the parent view
                     if self.parent_view:
                         await interaction.response.edit_message(
-                            **self.parent_view.get_content()
+                            **await self.parent_view.get_content()
                         )
                     else:
                         await interaction.response.edit_message(
@@ -0,0 +1,178 @@
+"""Tabulation in worker processes.
+
+Some methods solve optimization problems that can take seconds of CPU on big
+elections.  Run on the event loop, or even on a thread, that would hold up
+every other guild's interactions, so tabulations run in a process pool
+instead.  The event loop only reads the election's tally or ballot profile
+from the database and sends it, with the election and its method parameters,
+to a worker.
+
+Only as many tabulations as there are workers are submitted at a time, so a
+submitted job starts running at once and its time limit measures its own
+work rather than time spent behind other jobs.  Up to MAX_QUEUED_TABULATIONS
+more wait their turn, and beyond that tabulate() fails at once with
+TabulationBusy.  Each can be cancelled by election ID.
+"""
+
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING
+import numpy as np
+import async_db
+import votes
+
+if TYPE_CHECKING:
+    from election import Election
+
+WORKERS = 2
+MAX_QUEUED_TABULATIONS = 16
+TIMEOUT_SECONDS = 300
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+# One slot per worker, and the number of tabulations waiting for one.
+_slots: asyncio.Semaphore | None = None
+_waiting = 0
+
+# Events that cancel the running tabulation of each election, by election ID.
+_cancellations: dict[int, asyncio.Event] = {}
+
+
+class TabulationCancelled(Exception):
+    """Raised when a tabulation is cancelled before it finishes."""
+
+
+class TabulationTimeout(Exception):
+    """Raised when a tabulation doesn't finish within TIMEOUT_SECONDS."""
+
+
+class TabulationBusy(Exception):
+    """Raised when MAX_QUEUED_TABULATIONS tabulations are already waiting."""
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Forking a process with running threads isn't safe, so workers
+            # start fresh.
+            _executor = ProcessPoolExecutor(
+                max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Stop an executor's workers, abandoning whatever they are running."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    # A running job can only be stopped by stopping its worker, and
+    # ProcessPoolExecutor has no public way to reach its workers, so use its
+    # private process table if it still has one.  Without it, the workers
+    # finish their jobs before shutdown() stops them.
+    processes = getattr(executor, "_processes", None) or {}
+    for process in list(processes.values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _tabulate(
+    election: Election, loaded: np.ndarray | votes.BallotProfile
+) -> tuple[list[str], str]:
+    return election.tabulate_loaded(loaded)
+
+
+async def _run(
+    election: Election,
+    loaded: np.ndarray | votes.BallotProfile,
+    cancelled: asyncio.Event,
+) -> tuple[list[str], str]:
+    # A job can fail because a timeout elsewhere stopped its worker, so retry
+    # once on a new pool.
+    for attempt in range(2):
+        executor = _get_executor()
+        future = executor.submit(_tabulate, election, loaded)
+        result = asyncio.wrap_future(future)
+        cancel = asyncio.ensure_future(cancelled.wait())
+        done, _ = await asyncio.wait(
+            [result, cancel],
+            timeout=TIMEOUT_SECONDS,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        cancel.cancel()
+        if result in done:
+            try:
+                return result.result()
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                _discard_executor(executor)
+                continue
+
+        # A job that hasn't started can just be dropped.
+        started = not future.cancel()
+        result.cancel()
+        if started:
+            _discard_executor(executor)
+        if cancel in done:
+            raise TabulationCancelled()
+        raise TabulationTimeout()
+
+
+async def tabulate(election: Election) -> tuple[list[str], str]:
+    """Tabulate an election's submitted ballots in a worker process.
+
+    Raises TabulationCancelled if cancel() is called for the election first,
+    TabulationTimeout if it doesn't finish within TIMEOUT_SECONDS, or
+    TabulationBusy if too many tabulations are already waiting.
+    """
+    global _slots, _waiting
+    if _slots is None:
+        _slots = asyncio.Semaphore(WORKERS)
+    if _slots.locked() and _waiting >= MAX_QUEUED_TABULATIONS:
+        raise TabulationBusy()
+
+    cancelled = _cancellations.setdefault(election.election_id, asyncio.Event())
+    try:
+        _waiting += 1
+        try:
+            await _slots.acquire()
+        finally:
+            _waiting -= 1
+        try:
+            if cancelled.is_set():
+                raise TabulationCancelled()
+            loaded = await async_db.run_read(election.load_ballots)
+            return await _run(election, loaded, cancelled)
+        finally:
+            _slots.release()
+    finally:
+        if _cancellations.get(election.election_id) is cancelled:
+            del _cancellations[election.election_id]
+
+
+def cancel(election_id: int) -> bool:
+    """Cancel the election's tabulation, if one is running or waiting.
+
+    Returns whether there was one.
+    """
+    cancelled = _cancellations.get(election_id)
+    if cancelled is None:
+        return False
+    cancelled.set()
+    return True
+
+
+def shutdown() -> None:
+    """Stop the worker processes.  Call this at shutdown."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,77 @@
+import asyncio
+
+from ballot import BallotComponent
+from ballots.ranked import RankedBallot
+from ballots.score import ScoreBallot
+from ballots.simple import SimpleBallot
+
+SHUFFLED = ["Doug", "Alice", "Eve", "Charlie", "Bob"]
+
+
+def components(ballot, session_id=7):
+    view = ballot.render_interim(session_id, "Title")["view"]
+    return {item.custom_id: item for item in view.children}
+
+
+def route(component):
+    match = component.template.fullmatch(component.custom_id)
+
+    async def from_custom_id():
+        return await BallotComponent.from_custom_id(None, component.item, match)
+
+    return asyncio.run(from_custom_id())
+
+
+def test_custom_ids_route_to_session_and_action():
+    ballot = SimpleBallot(42, SHUFFLED)
+    items = components(ballot)
+    assert "ballot:42:7:vote:2" in items
+    assert "ballot:42:7:reset" in items
+    assert "ballot:42:7:submit" not in items
+
+    routed = route(items["ballot:42:7:vote:2"])
+    assert (routed.election_id, routed.session_id) == (42, 7)
+    assert (routed.action, routed.index) == ("vote", 2)
+    assert route(items["ballot:42:7:reset"]).index is None
+
+
+def test_simple_ballot_actions():
+    ballot = SimpleBallot(1, SHUFFLED)
+    ballot.apply("vote", 2, [])
+    ballot.apply("vote", 0, [])
+    assert ballot.votes == {"Doug"}
+    assert "ballot:1:7:submit" in components(ballot)
+    ballot.apply("vote", 0, [])
+    assert ballot.votes == set()
+
+    approval = SimpleBallot(1, SHUFFLED, multiple_votes=True)
+    approval.apply("vote", 2, [])
+    approval.apply("vote", 0, [])
+    assert approval.votes == {"Doug", "Eve"}
+    approval.apply("reset", None, [])
+    assert approval.votes == set()
+
+
+def test_ranked_ballot_actions():
+    candidates = [f"C{i}" for i in range(30)]
+    ballot = RankedBallot(1, candidates)
+    items = components(ballot)
+    assert set(items) == {"ballot:1:7:rank:0", "ballot:1:7:rank:1", "ballot:1:7:reset"}
+    assert items["ballot:1:7:rank:1"].item.options[0].value == "25"
+
+    ballot.apply("rank", 1, ["25"])
+    ballot.apply("rank", 0, ["3"])
+    ballot.apply("rank", 0, ["3"])
+    assert ballot.ranking == ["C25", "C3"]
+
+
+def test_score_ballot_pages_and_ratings():
+    ballot = ScoreBallot(1, SHUFFLED)
+    ballot.apply("next", None, [])
+    assert ballot.page == 1
+    items = components(ballot)
+    assert "ballot:1:7:rate:4" in items and "ballot:1:7:prev" in items
+    ballot.apply("rate", 4, ["5"])
+    assert ballot.ratings == {"Bob": 5}
+    ballot.apply("next", None, [])
+    assert ballot.page == 0
@@ -0,0 +1,98 @@
+import itertools
+import json
+
+import ballot_codec
+import votes
+from ballots.ranked import RankedBallot
+from ballots.score import ScoreBallot
+from ballots.simple import SimpleBallot
+
+CANDIDATES = ["Alice", "Bob", "Charlie", "Doug", "Eve"]
+SHUFFLED = ["Doug", "Alice", "Eve", "Charlie", "Bob"]
+
+
+def roundtrip(ballot, include_ui=True):
+    raw = ballot_codec.encode(
+        ballot.ballot_type, ballot.to_dict(), CANDIDATES, include_ui
+    )
+    assert isinstance(raw, bytes)
+    return raw, ballot_codec.decode(raw, CANDIDATES)
+
+
+def test_permutation_rank_roundtrip():
+    for perm in itertools.permutations(range(4)):
+        rank = ballot_codec.permutation_rank(list(perm))
+        assert ballot_codec.permutation_unrank(rank, 4) == list(perm)
+    assert ballot_codec.permutation_rank([0, 1, 2, 3]) == 0
+    assert ballot_codec.permutation_rank([3, 2, 1, 0]) == 23
+
+
+def test_ranked_roundtrip():
+    ballot = RankedBallot(1, SHUFFLED)
+    ballot.ranking = ["Eve", "Alice"]
+    ballot.page = 0
+    ballot.visited_pages = {0}
+    raw, data = roundtrip(ballot)
+    assert data["ranking"] == ["Eve", "Alice"]
+    assert data["candidates"] == SHUFFLED
+    assert data["page"] == 0 and data["visited_pages"] == [0]
+    assert len(raw) < len(json.dumps(ballot.to_dict())) / 5
+
+
+def test_score_roundtrip_keeps_unrated_candidates_absent():
+    ballot = ScoreBallot(1, SHUFFLED)
+    ballot.ratings = {"Bob": 0, "Charlie": 5, "Eve": 3}
+    _, data = roundtrip(ballot)
+    assert data["ratings"] == {"Bob": 0, "Charlie": 5, "Eve": 3}
+
+
+def test_simple_roundtrip():
+    ballot = SimpleBallot(1, SHUFFLED, multiple_votes=True)
+    ballot.votes = {"Alice", "Doug"}
+    _, data = roundtrip(ballot)
+    assert set(data["votes"]) == {"Alice", "Doug"}
+    assert data["multiple_votes"] is True
+
+
+def test_submitted_ballot_omits_ui_state():
+    ballot = ScoreBallot(1, SHUFFLED)
+    ballot.ratings = {"Alice": 4}
+    ballot.page = 1
+    ballot.visited_pages = {0, 1}
+    _, data = roundtrip(ballot, include_ui=False)
+    assert "page" not in data and "visited_pages" not in data
+
+    restored = ScoreBallot.from_dict(
+        {"ballot_data": data, "ballot_id": None, "session_id": 0}, 1
+    )
+    assert restored.page == 0
+    assert len(restored.visited_pages) == restored.total_pages()
+
+
+def test_unknown_candidate_is_not_encoded():
+    ballot = RankedBallot(1, SHUFFLED)
+    ballot.ranking = ["Mallory"]
+    assert (
+        ballot_codec.encode(ballot.ballot_type, ballot.to_dict(), CANDIDATES, True)
+        is None
+    )
+
+
+def test_decode_record_matches_ballot():
+    ranked = RankedBallot(1, SHUFFLED)
+    ranked.ranking = ["Eve", "Alice"]
+    score = ScoreBallot(1, SHUFFLED)
+    score.ratings = {"Bob": 0, "Eve": 3}
+    simple = SimpleBallot(1, SHUFFLED, multiple_votes=True)
+    simple.votes = {"Doug", "Alice"}
+
+    def record(ballot):
+        raw = ballot_codec.encode(
+            ballot.ballot_type, ballot.to_dict(), CANDIDATES, False
+        )
+        return ballot_codec.decode_record(raw, len(CANDIDATES))
+
+    assert record(ranked).ranking == bytes([4, 0])
+    unrated = votes.UNRATED
+    assert record(score).ratings == bytes([unrated, 0, unrated, unrated, 3])
+    assert record(simple).choices == bytes([0, 3])
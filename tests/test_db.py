@@ -5,9 +5,12 @@ Tests creating elections, casting votes, and retrieving results.
 Run from project root with: python3 -m tests.test_db
 """
 
+import asyncio
+import json
 import os
 import random
 
+import async_db
 import db
 from election import load_election_from_db
 from elections.plurality import PluralityElection
@@ -100,6 +103,11 @@ def test_vote_count(election_id):
     print(f"✓ Vote count: {vote_count} votes")
     assert vote_count == 4, f"Expected 4 votes, got {vote_count}"  # 999 + 3 new users
 
+    # Changing a submitted vote must not count it twice
+    db.submit_ballot(election_id, 1000, ballot)
+    assert db.get_vote_count(election_id) == 4, "Resubmission was double counted"
+    print("✓ Resubmitted ballot counted once")
+
 
 def test_election_results(election_id):
     """Test computing election results."""
@@ -123,6 +131,10 @@ def test_election_results(election_id):
     print(f"✓ Winners: {winners}")
     print(f"✓ Details:\n{details}")
 
+    # Streaming straight from the database gives the same result
+    assert election.tabulate_from_db() == (winners, details)
+    print("✓ Streamed tabulation matches")
+
 
 def test_election_closing(election_id):
     """Test closing an election."""
@@ -147,6 +159,155 @@ def test_natural_key_lookup():
     print("✓ Natural key lookup successful")
 
 
+def test_interim_ballot_buffer():
+    """Test that interim ballots are buffered and flushed in batches."""
+    print("\nTesting interim ballot buffer...")
+
+    election = PluralityElection(
+        title="Buffered Election",
+        description="",
+        candidates=["Alice", "Bob"],
+        method_params={},
+        channel_id=12345,
+    )
+    election_id = db.save_election(election)
+
+    ballot = SimpleBallot(election_id, ["Bob", "Alice"], multiple_votes=False)
+    for session_id, vote in [(1, "Alice"), (2, "Bob")]:
+        ballot.votes = {vote}
+        ballot.session_id = session_id
+        db.save_interim_ballot(ballot, election_id, user_id=42)
+
+    with db.connection() as conn:
+        rows = conn.execute(
+            "SELECT COUNT(*) FROM ballots WHERE election_id=?", (election_id,)
+        ).fetchone()[0]
+    assert rows == 0, "Interim ballot should not be written yet"
+
+    buffered = db.load_user_ballot(election_id, 42, is_submitted=False)
+    assert buffered["session_id"] == 2, "Latest edit should be visible"
+    assert buffered["ballot_data"]["votes"] == ["Bob"]
+    print("✓ Buffered ballot visible before flush")
+
+    assert db.flush_interim_ballots() == 1, "Repeated edits should be merged"
+    stored = db.load_all_ballots(election_id, is_submitted=False)
+    assert len(stored) == 1 and stored[0]["session_id"] == 2
+    print("✓ Flush wrote a single merged ballot")
+
+    ballot.session_id = 3
+    db.save_interim_ballot(ballot, election_id, user_id=42)
+    db.submit_ballot(election_id, 42, ballot)
+    assert db.load_user_ballot(election_id, 42, is_submitted=False) is None
+    assert db.flush_interim_ballots() == 0, "Submit should consume the buffer"
+    print("✓ Submit consumed the buffered ballot")
+
+    # With the candidates not cached, they are read on a reader thread, and
+    # the ballot is still encoded against them.
+    db._candidates_cache.clear()
+    asyncio.run(async_db.save_interim_ballot(ballot, election_id, user_id=42))
+    assert db.cached_candidates(election_id) == ["Alice", "Bob"]
+    buffered = db.load_user_ballot(election_id, 42, is_submitted=False)
+    assert buffered["ballot_data"]["votes"] == ["Bob"]
+    db.flush_interim_ballots()
+    print("✓ Cold candidates cache read off the event loop")
+
+
+def test_legacy_json_ballot():
+    """Test that ballots stored as JSON before the binary format still load."""
+    print("\nTesting legacy JSON ballots...")
+
+    election = PluralityElection(
+        title="Legacy Election",
+        description="",
+        candidates=["Alice", "Bob"],
+        method_params={},
+        channel_id=12345,
+    )
+    election_id = db.save_election(election)
+    legacy = {
+        "votes": ["Bob"],
+        "multiple_votes": False,
+        "page": 0,
+        "visited_pages": [0],
+        "candidates": ["Bob", "Alice"],
+        "session_id": 777,
+    }
+    with db.transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO ballots (election_id, user_id, ballot_type, ballot_data,
+                                 is_submitted)
+            VALUES (?, 7, 'ballots.simple.SimpleBallot', ?, 1)
+            """,
+            (election_id, json.dumps(legacy)),
+        )
+
+    loaded = db.load_user_ballot(election_id, 7, is_submitted=True)
+    assert loaded["session_id"] == 777
+    ballot = SimpleBallot.from_dict(loaded, election_id)
+    assert ballot.votes == {"Bob"}
+    print("✓ Legacy JSON ballot loaded")
+
+
+def test_running_tally():
+    """Test that submitting ballots keeps the election's tally up to date."""
+    print("\nTesting running tally...")
+
+    election = PluralityElection(
+        title="Tally Election",
+        description="",
+        candidates=["Alice", "Bob", "Charlie"],
+        method_params={},
+        channel_id=12345,
+    )
+    db.save_election(election)
+    for user_id, choice in [(1, "Alice"), (2, "Bob"), (3, "Bob")]:
+        ballot = SimpleBallot(election.election_id, election.candidates, False)
+        ballot.votes = {choice}
+        db.submit_ballot(election.election_id, user_id, ballot, election.tally)
+    assert db.load_tally(election.election_id).tolist() == [1, 2, 0]
+
+    # Changing a vote moves it rather than counting it twice.
+    revision = db.get_ballot_revision(election.election_id)
+    ballot.votes = {"Charlie"}
+    db.submit_ballot(election.election_id, 3, ballot, election.tally)
+    assert db.load_tally(election.election_id).tolist() == [1, 1, 1]
+    assert db.get_ballot_revision(election.election_id) == revision + 1
+    print("✓ Tally updated on submit and resubmit")
+
+    stream = db.iter_submitted_votes(election.election_id)
+    assert election.tabulate_from_db() == election.tabulate(stream)
+    print("✓ Results from the tally match a full count")
+
+    # A ballot submitted without the tally function discards the tally.
+    ballot.votes = {"Alice"}
+    db.submit_ballot(election.election_id, 4, ballot)
+    assert db.load_tally(election.election_id) is None
+    assert election.tabulate_from_db()[0] == ["Alice"]
+    print("✓ Tally discarded when a ballot is submitted without it")
+
+
+def test_connection_pool():
+    """Test that pooled connections are reused rather than reopened."""
+    print("\nTesting connection pool...")
+
+    with db.connection() as first:
+        pass
+    with db.connection() as second:
+        assert second is first, "Idle connection should be reused"
+        assert second.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    print("✓ Connection reused")
+
+    pool = db.ConnectionPool(db.DB_PATH, size=2)
+    a = pool.acquire()
+    b = pool.acquire()
+    assert a is not b, "Concurrent borrowers need distinct connections"
+    pool.release(a)
+    pool.release(b)
+    pool.close()
+    print("✓ Pool hands out distinct connections concurrently")
+
+
 def main():
     print("=" * 60)
     print("Database Test Suite")
@@ -169,6 +330,10 @@ def main():
         test_election_results(election_id)
         test_election_closing(election_id)
         test_natural_key_lookup()
+        test_interim_ballot_buffer()
+        test_legacy_json_ballot()
+        test_running_tally()
+        test_connection_pool()
 
         print("\n" + "=" * 60)
         print("✓ All tests passed!")
@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+
+import election
+import tabulation
+
+
+class FakeElection:
+    open = True
+
+    def __init__(self):
+        self.edits = 0
+
+    async def update_vote_count(self):
+        self.edits += 1
+
+
+def test_public_updates_are_coalesced(monkeypatch):
+    fake = FakeElection()
+
+    async def load(election_id):
+        return fake
+
+    monkeypatch.setattr(election, "load_election_from_db_async", load)
+    monkeypatch.setattr(election, "PUBLIC_UPDATE_SECONDS", 0.05)
+
+    async def burst():
+        for _ in range(10):
+            election.schedule_public_update(1)
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.2)
+
+    asyncio.run(burst())
+    # One edit when the burst starts, and one for the votes after it.
+    assert fake.edits == 2
+    assert not election._public_update_tasks
+
+
+def test_public_update_cancelled(monkeypatch):
+    fake = FakeElection()
+
+    async def load(election_id):
+        return fake
+
+    monkeypatch.setattr(election, "load_election_from_db_async", load)
+
+    async def cancelled():
+        election.schedule_public_update(1)
+        election.cancel_public_update(1)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(cancelled())
+    assert fake.edits == 0
+
+
+def test_vote_button_custom_id_routes_to_election():
+    button = election.VoteButton(42)
+    assert button.custom_id == "vote:42"
+    match = button.template.fullmatch(button.custom_id)
+
+    async def route():
+        return await election.VoteButton.from_custom_id(None, button.item, match)
+
+    assert asyncio.run(route()).election_id == 42
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+
+
+class FakeChannel:
+    id = 1
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(FakeMessage(content))
+        return self.sent[-1]
+
+
+def test_timed_out_election_is_reopened_not_deleted(monkeypatch):
+    from elections.plurality import PluralityElection
+
+    ended = PluralityElection(
+        "Slow", "", ["A", "B"], {}, election_id=7, channel_id=1, end_timestamp=100
+    )
+    saved, deleted = [], []
+
+    async def tabulate(election):
+        raise tabulation.TabulationTimeout()
+
+    async def save_election(election):
+        saved.append((election.open, election.end_timestamp))
+
+    async def delete_election(election_id):
+        deleted.append(election_id)
+
+    async def nothing(*args):
+        pass
+
+    monkeypatch.setattr(tabulation, "tabulate", tabulate)
+    monkeypatch.setattr(election.async_db, "mark_election_closed", nothing)
+    monkeypatch.setattr(election.async_db, "save_election", save_election)
+    monkeypatch.setattr(election.async_db, "delete_election", delete_election)
+    monkeypatch.setattr(ended, "update_vote_count", nothing)
+
+    channel = FakeChannel()
+    asyncio.run(election.end_election_and_update_message(ended, channel))
+    assert saved == [(True, None)]
+    assert not deleted
+    assert "did not finish" in channel.sent[0].content
+
+
+def test_failed_tabulation_reopens_and_raises(monkeypatch):
+    from elections.plurality import PluralityElection
+
+    ended = PluralityElection(
+        "Broken", "", ["A", "B"], {}, election_id=9, channel_id=1, end_timestamp=100
+    )
+    saved, deleted = [], []
+
+    async def tabulate(election):
+        raise RuntimeError("worker crashed")
+
+    async def save_election(election):
+        saved.append((election.open, election.end_timestamp))
+
+    async def delete_election(election_id):
+        deleted.append(election_id)
+
+    async def nothing(*args):
+        pass
+
+    monkeypatch.setattr(tabulation, "tabulate", tabulate)
+    monkeypatch.setattr(election.async_db, "mark_election_closed", nothing)
+    monkeypatch.setattr(election.async_db, "save_election", save_election)
+    monkeypatch.setattr(election.async_db, "delete_election", delete_election)
+    monkeypatch.setattr(ended, "update_vote_count", nothing)
+
+    channel = FakeChannel()
+    with pytest.raises(RuntimeError):
+        asyncio.run(election.end_election_and_update_message(ended, channel))
+    # Still scheduled to end, so the election checker retries it.
+    assert saved == [(True, 100)]
+    assert not deleted
+    assert "went wrong" in channel.sent[0].content
+
+
+def test_preview_caches_only_finished_tabulations(monkeypatch):
+    from elections.plurality import PluralityElection
+
+    previewed = PluralityElection("Preview", "", ["A", "B"], {}, election_id=8)
+    results = [tabulation.TabulationTimeout(), (["A"], "A won.")]
+
+    async def tabulate(election):
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def revision(election_id):
+        return 3
+
+    monkeypatch.setattr(tabulation, "tabulate", tabulate)
+    monkeypatch.setattr(election.async_db, "get_ballot_revision", revision)
+    monkeypatch.setattr(election.async_db, "get_vote_count", revision)
+
+    async def preview():
+        try:
+            await previewed.preview_results()
+        except tabulation.TabulationTimeout:
+            pass
+        assert 8 not in election._preview_cache
+        await previewed.preview_results()
+        # Asking again for the same revision doesn't tabulate.
+        await previewed.preview_results()
+
+    asyncio.run(preview())
+    assert election._preview_cache.pop(8) == (3, (["A"], "A won."))
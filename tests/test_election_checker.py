@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import async_db
+import election
+import election_checker
+
+
+def test_elections_end_in_order_of_end_time(monkeypatch):
+    ended = []
+
+    async def end_election(election_id):
+        ended.append((election_id, time.time()))
+        # As closing the election would.
+        election_checker.unschedule(election_id)
+
+    now = time.time()
+
+    async def load_end_times():
+        return [(1, now + 0.3), (2, now - 10)]
+
+    monkeypatch.setattr(election_checker, "_heap", [])
+    monkeypatch.setattr(election_checker, "_end_times", {})
+    monkeypatch.setattr(election_checker, "_task", None)
+    monkeypatch.setattr(election_checker, "_changed", None)
+    monkeypatch.setattr(election_checker, "_end_election", end_election)
+    monkeypatch.setattr(async_db, "load_election_end_times", load_end_times)
+
+    async def run():
+        await election_checker.start()
+        # Rescheduled, added and deleted after startup.
+        election_checker.schedule(1, now + 0.1)
+        election_checker.schedule(3, now + 0.2)
+        election_checker.schedule(4, now + 0.05)
+        election_checker.unschedule(4)
+        await asyncio.sleep(0.4)
+        election_checker._task.cancel()
+
+    asyncio.run(run())
+    assert [election_id for election_id, _ in ended] == [2, 1, 3]
+    assert ended[1][1] - now < 0.2
+    assert not election_checker._end_times
+
+
+class FakeElection:
+    open = True
+    channel_id = 5
+
+
+class FakeClient:
+    def __init__(self):
+        self.fetches = 0
+
+    def get_channel(self, channel_id):
+        return None
+
+    async def fetch_channel(self, channel_id):
+        self.fetches += 1
+        if self.fetches == 1:
+            raise RuntimeError("Discord is down")
+        return "channel"
+
+
+def test_failed_end_is_retried(monkeypatch):
+    ended = []
+
+    async def load(election_id):
+        return FakeElection()
+
+    async def end(election, channel, include_announcement=False):
+        ended.append(channel)
+        election_checker.unschedule(1)
+
+    async def no_end_times():
+        return []
+
+    monkeypatch.setattr(election_checker, "_heap", [])
+    monkeypatch.setattr(election_checker, "_end_times", {})
+    monkeypatch.setattr(election_checker, "_task", None)
+    monkeypatch.setattr(election_checker, "_changed", None)
+    monkeypatch.setattr(election_checker, "RETRY_SECONDS", 0.1)
+    monkeypatch.setattr(election_checker, "client", FakeClient())
+    monkeypatch.setattr(election, "load_election_from_db_async", load)
+    monkeypatch.setattr(election, "end_election_and_update_message", end)
+    monkeypatch.setattr(async_db, "load_election_end_times", no_end_times)
+
+    async def run():
+        await election_checker.start()
+        election_checker.schedule(1, time.time())
+        await asyncio.sleep(0.05)
+        # The first attempt failed, and the election is still scheduled.
+        assert not ended and 1 in election_checker._end_times
+        await asyncio.sleep(0.15)
+        election_checker._task.cancel()
+
+    asyncio.run(run())
+    assert ended == ["channel"]
+    assert not election_checker._end_times
+
+
+def test_failed_tabulation_is_retried(monkeypatch):
+    attempts = []
+
+    async def load(election_id):
+        return FakeElection()
+
+    async def end(election, channel, include_announcement=False):
+        attempts.append(time.time())
+        if len(attempts) == 1:
+            # Reopening the election saves it, which schedules it again.
+            election_checker.schedule(1, 0)
+            raise RuntimeError("worker crashed")
+        election_checker.unschedule(1)
+
+    async def no_end_times():
+        return []
+
+    client = FakeClient()
+    client.fetches = 1
+    monkeypatch.setattr(election_checker, "_heap", [])
+    monkeypatch.setattr(election_checker, "_end_times", {})
+    monkeypatch.setattr(election_checker, "_task", None)
+    monkeypatch.setattr(election_checker, "_changed", None)
+    monkeypatch.setattr(election_checker, "RETRY_SECONDS", 0.1)
+    monkeypatch.setattr(election_checker, "client", client)
+    monkeypatch.setattr(election, "load_election_from_db_async", load)
+    monkeypatch.setattr(election, "end_election_and_update_message", end)
+    monkeypatch.setattr(async_db, "load_election_end_times", no_end_times)
+
+    async def run():
+        await election_checker.start()
+        election_checker.schedule(1, 0)
+        await asyncio.sleep(0.2)
+        election_checker._task.cancel()
+
+    asyncio.run(run())
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.1
+    assert not election_checker._end_times
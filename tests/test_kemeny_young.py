@@ -0,0 +1,93 @@
+import pairwise
+from elections import kemeny_young
+from elections.kemeny_young import KemenyYoungElection
+from testutil import PrefillBallot
+
+CANDIDATES = [f"C{i}" for i in range(9)]
+
+
+def cycle_ballots():
+    # C0 > C1 > ... > C8 by a wide margin, except for a C0 > C1 > C2 > C0 cycle.
+    return (
+        5 * [PrefillBallot(ranking=CANDIDATES)]
+        + 4 * [PrefillBallot(ranking=["C1", "C2", "C0"] + CANDIDATES[3:])]
+        + 4 * [PrefillBallot(ranking=["C2", "C0", "C1"] + CANDIDATES[3:])]
+    )
+
+
+def test_kemeny_young_many_candidates():
+    election = KemenyYoungElection("", "", candidates=CANDIDATES, method_params={})
+    winners, details = election.tabulate(cycle_ballots())
+    assert winners == ["C0"]
+    assert "- C8" in details.splitlines()[-1]
+
+
+def test_kemeny_young_reports_ties():
+    election = KemenyYoungElection(
+        "", "", candidates=["Alice", "Bob", "Charlie"], method_params={}
+    )
+    winners, details = election.tabulate(
+        [
+            PrefillBallot(ranking=["Alice", "Bob", "Charlie"]),
+            PrefillBallot(ranking=["Bob", "Charlie", "Alice"]),
+            PrefillBallot(ranking=["Charlie", "Alice", "Bob"]),
+        ]
+    )
+    assert sorted(winners) == ["Alice", "Bob", "Charlie"]
+    assert "- Alice, Bob, Charlie" in details
+    assert "- Charlie, Alice, Bob" in details
+
+
+def test_kemeny_young_tie_list_is_capped(monkeypatch):
+    monkeypatch.setattr(kemeny_young, "MAX_TIED_ORDERINGS", 2)
+    election = KemenyYoungElection("", "", candidates=CANDIDATES, method_params={})
+    winners, details = election.tabulate([])
+    assert winners == CANDIDATES
+    assert details.endswith("- and other orderings with the same score")
+
+
+def test_kemeny_young_integer_program(monkeypatch):
+    election = KemenyYoungElection("", "", candidates=CANDIDATES, method_params={})
+    expected = election.tabulate(cycle_ballots())
+    monkeypatch.setattr(kemeny_young, "MAX_DP_CANDIDATES", 0)
+    assert election.tabulate(cycle_ballots()) == expected
+
+
+def test_kemeny_young_heuristic(monkeypatch):
+    election = KemenyYoungElection("", "", candidates=CANDIDATES, method_params={})
+    _, exact_details = election.tabulate(cycle_ballots())
+    monkeypatch.setattr(kemeny_young, "MAX_DP_CANDIDATES", 0)
+    monkeypatch.setattr(kemeny_young, "MAX_MILP_CONSTRAINTS", 0)
+    monkeypatch.setattr(kemeny_young, "HEURISTIC_SECONDS", 0.1)
+    winners, details = election.tabulate(cycle_ballots())
+    assert winners == ["C0"]
+    assert "Too many candidates" in details
+    score = exact_details.split("**Best Kemeny Score**: ")[1].split("\n")[0]
+    assert f"**Kemeny Score Found**: {score}" in details
+
+
+def test_score_upper_bound_breaks_cycles():
+    preferences = pairwise.preference_matrix(cycle_ballots(), CANDIDATES)
+    # Ordering every pair the majority way is impossible with the C0 > C1 >
+    # C2 > C0 cycle; charging for breaking it makes the bound exact here.
+    table = kemeny_young._SubsetTable(preferences)
+    assert kemeny_young._score_upper_bound(preferences) == table.score()
+
+
+def test_milp_time_limit_reports_more_orderings(monkeypatch):
+    preferences = pairwise.preference_matrix(cycle_ballots(), CANDIDATES)
+    solve = kemeny_young.milp
+    calls = []
+
+    def milp(*args, **kwargs):
+        calls.append(1)
+        res = solve(*args, **kwargs)
+        if len(calls) > 1:
+            # The re-solve for another tied ordering runs out of time.
+            res.success, res.status = False, 1
+        return res
+
+    monkeypatch.setattr(kemeny_young, "milp", milp)
+    best_score, orderings, more = kemeny_young._milp_orderings(preferences, 10)
+    assert len(orderings) == 1
+    assert more
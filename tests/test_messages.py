@@ -0,0 +1,53 @@
+import asyncio
+import discord
+import messages
+
+
+class FakeMessage:
+    def __init__(self, message_id, embeds):
+        self.id = message_id
+        self.embeds = embeds
+
+
+class FakePartialMessage:
+    def __init__(self, calls, message_id):
+        self.calls = calls
+        self.id = message_id
+
+    async def edit(self, **kwargs):
+        self.calls.append(("edit", self.id))
+        embed = kwargs.get("embed")
+        return FakeMessage(self.id, [embed] if embed else [])
+
+    async def fetch(self):
+        self.calls.append(("fetch", self.id))
+        return FakeMessage(self.id, [discord.Embed(title="Fetched")])
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def get_partial_messageable(self, channel_id):
+        client = self
+
+        class Channel:
+            def get_partial_message(self, message_id):
+                return FakePartialMessage(client.calls, message_id)
+
+        return Channel()
+
+
+def test_embeds_are_only_fetched_when_not_cached(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(messages, "_client", client)
+
+    async def run():
+        await messages.edit(1, 10, embed=discord.Embed(title="Sent"))
+        sent = await messages.current_embed(1, 10)
+        fetched = await messages.current_embed(1, 11)
+        return sent, fetched
+
+    sent, fetched = asyncio.run(run())
+    assert sent.title == "Sent" and fetched.title == "Fetched"
+    assert client.calls == [("edit", 10), ("fetch", 11)]
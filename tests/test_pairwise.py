@@ -0,0 +1,38 @@
+import pairwise
+from testutil import PrefillBallot
+
+CANDIDATES = ["Alice", "Bob", "Charlie", "Doug"]
+
+
+def test_rank_positions():
+    positions = pairwise.rank_positions([bytes([2, 0]), b"", bytes([3, 2, 1, 0])], 4)
+    assert positions.tolist() == [[1, 4, 0, 4], [4, 4, 4, 4], [3, 2, 1, 0]]
+
+
+def test_unranked_candidates_tie_for_last():
+    ballots = [
+        PrefillBallot(ranking=["Charlie", "Alice"]),
+        PrefillBallot(ranking=["Alice", "Bob", "Charlie", "Doug"]),
+    ]
+    matrix = pairwise.preference_matrix(ballots, CANDIDATES)
+    assert matrix.tolist() == [
+        [0, 2, 1, 2],
+        [0, 0, 1, 1],
+        [1, 1, 0, 2],
+        [0, 0, 0, 0],
+    ]
+    assert pairwise.margin_matrix(matrix)[0].tolist() == [0, 2, 0, 2]
+
+
+def test_only_ranked_pairs_counted():
+    ballots = [PrefillBallot(ranking=["Charlie", "Alice"])]
+    matrix = pairwise.preference_matrix(ballots, CANDIDATES, unranked_last=False)
+    assert matrix.sum() == 1 and matrix[2][0] == 1
+
+
+def test_matches_across_chunks(monkeypatch):
+    monkeypatch.setattr(pairwise, "CHUNK_SIZE", 2)
+    ballots = 5 * [PrefillBallot(ranking=["Doug", "Bob"])]
+    matrix = pairwise.preference_matrix(iter(ballots), CANDIDATES)
+    assert matrix[3].tolist() == [5, 5, 5, 0]
+    assert matrix[1].tolist() == [5, 0, 5, 0]
@@ -0,0 +1,71 @@
+import positional
+from elections.borda import BordaElection
+from testutil import PrefillBallot
+
+CANDIDATES = ["Alice", "Bob", "Charlie", "Doug"]
+
+
+def test_choice_counts(monkeypatch):
+    monkeypatch.setattr(positional, "CHUNK_SIZE", 2)
+    ballots = [
+        PrefillBallot(votes={"Alice"}),
+        PrefillBallot(votes={"Alice", "Doug"}),
+        PrefillBallot(votes=set()),
+    ]
+    counts = positional.choice_counts(iter(ballots), CANDIDATES)
+    assert counts.tolist() == [2, 0, 0, 1]
+
+
+def test_first_preference_counts():
+    ballots = [
+        PrefillBallot(ranking=["Charlie", "Alice"]),
+        PrefillBallot(ranking=[]),
+        PrefillBallot(ranking=["Charlie"]),
+    ]
+    counts = positional.first_preference_counts(ballots, CANDIDATES)
+    assert counts.tolist() == [0, 0, 2, 0]
+
+
+def test_positional_scores(monkeypatch):
+    monkeypatch.setattr(positional, "CHUNK_SIZE", 1)
+    ballots = [
+        PrefillBallot(ranking=["Charlie", "Alice"]),
+        PrefillBallot(ranking=["Doug", "Bob", "Charlie"]),
+    ]
+    scores = positional.positional_scores(
+        ballots, CANDIDATES, lambda positions, lengths: lengths - positions
+    )
+    assert scores.dtype.kind == "i"
+    assert scores.tolist() == [1, 2, 3, 3]
+
+
+def borda(weighting, ballots):
+    election = BordaElection(
+        "", "", candidates=CANDIDATES, method_params={"Weighting": weighting}
+    )
+    return election.tabulate(ballots)
+
+
+def test_borda_weightings():
+    ballots = [
+        PrefillBallot(ranking=["Alice", "Bob"]),
+        PrefillBallot(ranking=["Bob", "Alice", "Charlie", "Doug"]),
+        PrefillBallot(ranking=["Charlie"]),
+    ]
+    winners, details = borda("standard", ballots)
+    assert winners == ["Alice", "Bob"]
+    assert "- Charlie: 4" in details
+    winners, details = borda("modified", ballots)
+    assert winners == ["Alice", "Bob"]
+    assert "- Charlie: 3" in details
+    winners, details = borda("Dowdall", ballots)
+    assert winners == ["Alice", "Bob"]
+    assert "- Charlie: 1.33" in details
+
+
+def test_borda_weighting_validation():
+    assert BordaElection.validate_method_params({"Weighting": "Dowdall"}, []) is None
+    assert BordaElection.validate_method_params({"Weighting": "nauru"}, [])
+    assert BordaElection.method_description({"Weighting": "dowdall"}) == (
+        "Borda Count (Dowdall weighting)"
+    )
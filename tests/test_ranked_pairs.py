@@ -0,0 +1,49 @@
+from elections import ranked_pairs
+from elections.ranked_pairs import RankedPairsElection
+from testutil import PrefillBallot
+
+
+def test_lock_pairs_skips_cycles():
+    pairs = [(0, 1), (1, 2), (2, 0), (0, 2), (3, 0), (2, 3)]
+    assert ranked_pairs._lock_pairs(4, pairs) == [
+        True,
+        True,
+        False,
+        True,
+        True,
+        False,
+    ]
+
+
+def test_topological_layers():
+    layers = ranked_pairs._topological_layers(4, [(0, 1), (1, 2), (3, 2)])
+    assert layers == [[0, 3], [1], [2]]
+
+
+def test_ranked_pairs_condorcet_cycle():
+    election = RankedPairsElection(
+        "", "", candidates=["Alice", "Bob", "Charlie"], method_params={}
+    )
+    winners, details = election.tabulate(
+        4 * [PrefillBallot(ranking=["Alice", "Bob", "Charlie"])]
+        + 3 * [PrefillBallot(ranking=["Bob", "Charlie", "Alice"])]
+        + 2 * [PrefillBallot(ranking=["Charlie", "Alice", "Bob"])]
+    )
+    # Bob > Charlie (7-2) and Alice > Bob (6-3) lock; Charlie > Alice (5-4) doesn't.
+    assert winners == ["Alice"]
+    assert "- Ignoring Charlie > Alice" in details
+    assert details.endswith("1. Alice\n2. Bob\n3. Charlie")
+
+
+def test_ranked_pairs_unbeaten_candidates_tie():
+    election = RankedPairsElection(
+        "", "", candidates=["Alice", "Bob", "Charlie"], method_params={}
+    )
+    winners, details = election.tabulate(
+        [
+            PrefillBallot(ranking=["Alice", "Bob", "Charlie"]),
+            PrefillBallot(ranking=["Bob", "Alice", "Charlie"]),
+        ]
+    )
+    assert winners == ["Alice", "Bob"]
+    assert details.endswith("1. Alice\n1. Bob\n3. Charlie")
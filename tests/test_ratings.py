@@ -0,0 +1,48 @@
+import ratings
+import votes
+from elections.star import STARElection
+from testutil import PrefillBallot
+
+CANDIDATES = ["Alice", "Bob", "Charlie"]
+
+
+def ballots():
+    return [
+        PrefillBallot(ratings={"Alice": 5, "Bob": 4}),
+        PrefillBallot(ratings={"Alice": 0, "Bob": 3, "Charlie": 5}),
+        PrefillBallot(ratings={"Bob": 2, "Charlie": 1}),
+    ]
+
+
+def test_rating_matrix_counts_unrated_as_zero():
+    matrix, counts = ratings.rating_matrix(ballots(), CANDIDATES)
+    assert matrix.tolist() == [[5, 4, 0], [0, 3, 5], [0, 2, 1]]
+    assert counts.tolist() == [1, 1, 1]
+    records = 2 * [votes.RatedVote(bytes([votes.UNRATED, 1, 2]))]
+    matrix, counts = ratings.rating_matrix(records, CANDIDATES)
+    assert matrix.tolist() == [[0, 1, 2]] and counts.tolist() == [2]
+
+
+def test_scores_and_finalists():
+    matrix, counts = ratings.rating_matrix(ballots(), CANDIDATES)
+    totals = ratings.rating_totals(matrix, counts)
+    assert totals.tolist() == [3, 5, 9, 6]
+    means = ratings.mean_scores(totals)
+    assert means.tolist() == [5 / 3, 3, 2]
+    assert ratings.finalists(means) == [1, 2]
+
+
+def test_preference_matrix():
+    matrix, counts = ratings.rating_matrix(ballots(), CANDIDATES)
+    assert ratings.preference_matrix(matrix, counts).tolist() == [
+        [0, 1, 1],
+        [2, 0, 2],
+        [2, 1, 0],
+    ]
+
+
+def test_star_streams_ballots():
+    election = STARElection("", "", candidates=CANDIDATES, method_params={})
+    winners, details = election.tabulate(iter(ballots()))
+    assert winners == ["Bob"]
+    assert "- Bob: preferred by 2 ballots" in details
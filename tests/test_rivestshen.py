@@ -0,0 +1,45 @@
+import numpy as np
+from elections import rivestshen
+from elections.rivestshen import RivestShenGTElection
+from testutil import PrefillBallot
+
+
+def test_condorcet_winner_always_wins():
+    election = RivestShenGTElection(
+        "", "", candidates=["Alice", "Bob", "Charlie"], method_params={}
+    )
+    winners, details = election.tabulate(
+        2 * [PrefillBallot(ranking=["Bob", "Alice", "Charlie"])]
+        + [PrefillBallot(ranking=["Charlie", "Bob", "Alice"])]
+    )
+    assert winners == ["Bob"]
+    assert "Bob: 100.00%" in details
+
+
+def test_equilibrium_of_cycle():
+    M = np.array([[0, 3, -1], [-3, 0, 1], [1, -1, 0]], dtype=float)
+    assert np.allclose(rivestshen._equilibrium_lp(M), [0.2, 0.2, 0.6])
+
+
+def test_equilibrium_is_minimum_norm():
+    # Alice and Charlie tie and both beat Bob; any mix of them is optimal.
+    M = np.array([[0, 4, 0], [-4, 0, 0], [0, 0, 0]], dtype=float)
+    assert np.allclose(rivestshen._equilibrium_lp(M), [0.5, 0, 0.5])
+    M = np.array([[0, 2, 0], [-2, 0, -2], [0, 2, 0]], dtype=float)
+    assert np.allclose(rivestshen._equilibrium_qp(M), [0.5, 0, 0.5], atol=1e-4)
+
+
+def test_draw_is_repeatable_for_the_same_ballots():
+    election = RivestShenGTElection(
+        "", "", candidates=["A", "B", "C"], method_params={}, election_id=3
+    )
+    # A > B > C > A, so every candidate has a chance.
+    ballots = (
+        [PrefillBallot(ranking=["A", "B", "C"])]
+        + [PrefillBallot(ranking=["B", "C", "A"])]
+        + [PrefillBallot(ranking=["C", "A", "B"])]
+    )
+    preferences = election.tally(ballots)
+    winners = {election.tabulate_tally(preferences)[0][0] for _ in range(20)}
+    assert len(winners) == 1
+    assert winners == set(election.tabulate(ballots)[0])
@@ -0,0 +1,61 @@
+from fractions import Fraction
+from elections.stv import STVElection, _arithmetic
+from testutil import PrefillBallot
+
+
+def surplus_ballots():
+    # Alice's surplus of 3 votes (9 ballots, quota 6) goes 2:1 to Bob and Charlie.
+    return (
+        6 * [PrefillBallot(ranking=["Alice", "Bob"])]
+        + 3 * [PrefillBallot(ranking=["Alice", "Charlie"])]
+        + 5 * [PrefillBallot(ranking=["Bob"])]
+        + 4 * [PrefillBallot(ranking=["Charlie"])]
+    )
+
+
+def stv(seats, arithmetic):
+    return STVElection(
+        "",
+        "",
+        candidates=["Alice", "Bob", "Charlie"],
+        method_params={"Number of Winners": str(seats), "Arithmetic": arithmetic},
+    )
+
+
+def test_surplus_transfer():
+    for arithmetic in ["exact", "float", "4 decimals"]:
+        winners, details = stv(2, arithmetic).tabulate(surplus_ballots())
+        assert winners == ["Alice", "Bob"]
+        assert "Redistributing surplus of 3 votes from Alice." in details
+        assert " - Bob: 7 (" in details
+
+
+def test_fixed_point_rounds_down():
+    fixed = _arithmetic("2 decimals")
+    assert fixed.scale(fixed.from_int(1), 1, 3) == 33
+    assert _arithmetic("Exact").scale(Fraction(1), 1, 3) == Fraction(1, 3)
+
+
+def test_exhausted_ballots():
+    winners, details = stv(1, "exact").tabulate(
+        [
+            PrefillBallot(ranking=["Alice"]),
+            PrefillBallot(ranking=["Bob", "Alice"]),
+            PrefillBallot(ranking=["Charlie"]),
+            PrefillBallot(ranking=[]),
+        ]
+    )
+    assert "Active ballots: 3, exhausted: 1" in details
+    assert len(winners) == 1
+
+
+def test_validate_arithmetic():
+    candidates = ["Alice", "Bob"]
+    params = {"Number of Winners": "1", "Arithmetic": "9 decimals"}
+    assert STVElection.validate_method_params(params, candidates) is None
+    params["Arithmetic"] = "approximately"
+    assert STVElection.validate_method_params(params, candidates)
+    assert (
+        STVElection.validate_method_params({"Number of Winners": "1"}, candidates)
+        is None
+    )
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+import tabulation
+
+
+class FakeElection:
+    election_id = 1
+
+
+def test_busy_when_queue_is_full(monkeypatch):
+    async def busy():
+        monkeypatch.setattr(tabulation, "_slots", asyncio.Semaphore(0))
+        monkeypatch.setattr(tabulation, "_waiting", tabulation.MAX_QUEUED_TABULATIONS)
+        with pytest.raises(tabulation.TabulationBusy):
+            await tabulation.tabulate(FakeElection())
+
+    asyncio.run(busy())
+    assert not tabulation._cancellations
+
+
+def test_waiting_count_released_when_caller_gives_up(monkeypatch):
+    async def waiting():
+        monkeypatch.setattr(tabulation, "_slots", asyncio.Semaphore(0))
+        task = asyncio.create_task(tabulation.tabulate(FakeElection()))
+        await asyncio.sleep(0)
+        assert tabulation._waiting == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert tabulation._waiting == 0
+
+    asyncio.run(waiting())
@@ -1,4 +1,5 @@
-from elections.tideman_alt import TidemanAlternativeElection
+import numpy as np
+from elections.tideman_alt import TidemanAlternativeElection, _smith_set
 from testutil import PrefillBallot
 
 
@@ -58,3 +59,26 @@ def test_tideman_alternative_condorcet_cycle_after_elim():
         + 2 * [PrefillBallot(ranking=["Charlie", "Alice", "Bob", "Doug"])]
     )
     assert winners == ["Alice"]
+
+
+def test_smith_set_counts_ties_as_unbeaten():
+    # 0 > 1 > 2 > 0 is a cycle, 3 ties 0 and loses to 1 and 2; 4 loses to all.
+    preferences = np.array(
+        [
+            [0, 2, 1, 1, 2],
+            [1, 0, 2, 2, 2],
+            [2, 1, 0, 2, 2],
+            [1, 1, 1, 0, 2],
+            [1, 1, 1, 1, 0],
+        ]
+    )
+    assert _smith_set(preferences, [0, 1, 2, 3, 4]) == [0, 1, 2, 3]
+    assert _smith_set(preferences, [1, 2, 4]) == [1]
+
+
+def test_smith_set_long_chain():
+    # Would exceed the recursion limit with a recursive search.
+    n = 1100
+    preferences = np.triu(np.ones((n, n), dtype=int), 1)
+    preferences[n - 1][0] = 1
+    assert _smith_set(preferences, list(range(n))) == list(range(n))
@@ -0,0 +1,55 @@
+import pairwise
+import positional
+import votes
+from elections.borda import BordaElection
+from testutil import PrefillBallot
+
+CANDIDATES = ["Alice", "Bob", "Charlie"]
+
+
+def ballots():
+    return (
+        3 * [PrefillBallot(ranking=["Alice", "Bob"])]
+        + [PrefillBallot(ranking=["Charlie"])]
+        + 2 * [PrefillBallot(ranking=["Bob", "Charlie", "Alice"])]
+    )
+
+
+def test_profile_counts_identical_votes():
+    profile = votes.ranked_profile(iter(ballots()), CANDIDATES)
+    assert profile.counts == {bytes([0, 1]): 3, bytes([2]): 1, bytes([1, 2, 0]): 2}
+    assert len(profile) == 3 and profile.total() == 6
+    assert votes.ranked_profile(profile, CANDIDATES) is profile
+    rankings = [vote.ranking for vote in votes.ranked_votes(profile, CANDIDATES)]
+    assert rankings == 3 * [bytes([0, 1])] + [bytes([2])] + 2 * [bytes([1, 2, 0])]
+
+
+def test_profile_chunks():
+    profile = votes.ranked_profile(ballots(), CANDIDATES)
+    chunks = list(profile.chunks(2))
+    assert [distinct for distinct, _ in chunks] == [
+        [bytes([0, 1]), bytes([2])],
+        [bytes([1, 2, 0])],
+    ]
+    assert [counts.tolist() for _, counts in chunks] == [[3, 1], [2]]
+
+
+def test_kernels_weight_by_count():
+    profile = votes.ranked_profile(ballots(), CANDIDATES)
+    assert (
+        pairwise.preference_matrix(profile, CANDIDATES).tolist()
+        == pairwise.preference_matrix(ballots(), CANDIDATES).tolist()
+        == [[0, 3, 3], [2, 0, 5], [3, 1, 0]]
+    )
+    firsts = positional.first_preference_counts(profile, CANDIDATES)
+    assert firsts.tolist() == [3, 2, 1]
+    election = BordaElection("", "", candidates=CANDIDATES, method_params={})
+    assert election.tabulate(profile) == election.tabulate(ballots())
+
+
+def test_record_profile():
+    records = [votes.ChoiceVote(bytes([1])), votes.ChoiceVote(bytes([1]))]
+    profile = votes.record_profile(iter(records))
+    assert profile.kind is votes.ChoiceVote and profile.counts == {bytes([1]): 2}
+    empty = votes.record_profile([])
+    assert len(empty) == 0 and list(empty.records()) == []
@@ -0,0 +1,196 @@
+"""Compact vote records for tabulation.
+
+Tabulation only needs what each voter chose, not a ballot's page state or
+candidate order.  These records hold just that, with candidates referenced by
+their index in the election's candidate list.  The database produces them
+directly from stored ballot data, and every tabulator accepts them.
+
+Tabulators also accept anything with the vote attribute of a ballot type
+(`ranking`, `ratings` or `votes`, keyed by candidate name), such as the Ballot
+objects themselves.  The functions at the bottom of this module convert either
+kind to records.
+
+Most elections have far fewer distinct votes than voters, so tabulators count
+identical votes together in a BallotProfile, and work on that.  A profile can
+be passed to any tabulator in place of its ballots.
+"""
+
+from collections import Counter
+from operator import attrgetter
+from typing import Any, Iterable, Iterator
+import itertools
+import numpy as np
+
+# Rating stored for a candidate the voter did not rate.
+UNRATED = 0xFF
+
+
+class RankedVote:
+    """A ranking of candidates, most preferred first."""
+
+    __slots__ = ("ranking",)
+
+    def __init__(self, ranking: bytes):
+        self.ranking = ranking
+
+
+class RatedVote:
+    """A rating for each candidate, or UNRATED."""
+
+    __slots__ = ("ratings",)
+
+    def __init__(self, ratings: bytes):
+        self.ratings = ratings
+
+
+class ChoiceVote:
+    """The set of candidates a voter chose."""
+
+    __slots__ = ("choices",)
+
+    def __init__(self, choices: bytes):
+        self.choices = choices
+
+
+Record = RankedVote | RatedVote | ChoiceVote
+
+
+class BallotProfile:
+    """The distinct votes of one kind, each with the number of ballots casting it.
+
+    Votes are stored as the bytes of their records (a ranking, ratings or
+    choices), in the order they were first seen.  The kind of an empty profile
+    may be unknown, and is then None.
+    """
+
+    __slots__ = ("kind", "counts")
+
+    def __init__(self, kind: type[Record] | None, counts: dict[bytes, int]):
+        self.kind = kind
+        self.counts = counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def total(self) -> int:
+        """Return the number of ballots."""
+        return sum(self.counts.values())
+
+    def records(self) -> Iterator[Record]:
+        """Yield a record for every ballot, repeating identical ones."""
+        for vote, count in self.counts.items():
+            record = self.kind(vote)
+            for _ in range(count):
+                yield record
+
+    def chunks(self, size: int) -> Iterator[tuple[list[bytes], np.ndarray]]:
+        """Yield up to size distinct votes at a time, with their counts."""
+        items = iter(self.counts.items())
+        while chunk := list(itertools.islice(items, size)):
+            distinct, counts = zip(*chunk)
+            yield list(distinct), np.array(counts, np.int64)
+
+
+def _index(candidates: list[str]) -> dict[str, int]:
+    return {c: i for i, c in enumerate(candidates)}
+
+
+def _ranked(ranking: Iterable[str], index: dict[str, int]) -> RankedVote:
+    return RankedVote(bytes(index[c] for c in ranking if c in index))
+
+
+def _rated(ratings: dict[str, int], index: dict[str, int]) -> RatedVote:
+    packed = bytearray([UNRATED]) * len(index)
+    for c, rating in ratings.items():
+        if c in index:
+            packed[index[c]] = rating
+    return RatedVote(bytes(packed))
+
+
+def _choice(choices: Iterable[str], index: dict[str, int]) -> ChoiceVote:
+    return ChoiceVote(bytes(sorted(index[c] for c in choices if c in index)))
+
+
+def record_from_data(data: dict[str, Any], candidates: list[str]) -> Record:
+    """Build a record from name-keyed ballot data, as stored in JSON."""
+    index = _index(candidates)
+    if "ranking" in data:
+        return _ranked(data["ranking"], index)
+    elif "ratings" in data:
+        return _rated(data["ratings"], index)
+    else:
+        return _choice(data["votes"], index)
+
+
+def ranked_votes(ballots: Iterable[Any], candidates: list[str]) -> Iterator[RankedVote]:
+    """Return ranked ballots as RankedVote records."""
+    if isinstance(ballots, BallotProfile):
+        yield from ballots.records()
+        return
+    index = _index(candidates)
+    for ballot in ballots:
+        if isinstance(ballot, RankedVote):
+            yield ballot
+        else:
+            yield _ranked(ballot.ranking, index)
+
+
+def rated_votes(ballots: Iterable[Any], candidates: list[str]) -> Iterator[RatedVote]:
+    """Return score ballots as RatedVote records."""
+    if isinstance(ballots, BallotProfile):
+        yield from ballots.records()
+        return
+    index = _index(candidates)
+    for ballot in ballots:
+        if isinstance(ballot, RatedVote):
+            yield ballot
+        else:
+            yield _rated(ballot.ratings, index)
+
+
+def choice_votes(ballots: Iterable[Any], candidates: list[str]) -> Iterator[ChoiceVote]:
+    """Return simple (single or multiple choice) ballots as ChoiceVote records."""
+    if isinstance(ballots, BallotProfile):
+        yield from ballots.records()
+        return
+    index = _index(candidates)
+    for ballot in ballots:
+        if isinstance(ballot, ChoiceVote):
+            yield ballot
+        else:
+            yield _choice(ballot.votes, index)
+
+
+def ranked_profile(ballots: Iterable[Any], candidates: list[str]) -> BallotProfile:
+    """Count identical rankings among ranked ballots, in one pass."""
+    if isinstance(ballots, BallotProfile):
+        return ballots
+    rankings = (vote.ranking for vote in ranked_votes(ballots, candidates))
+    return BallotProfile(RankedVote, dict(Counter(rankings)))
+
+
+def rated_profile(ballots: Iterable[Any], candidates: list[str]) -> BallotProfile:
+    """Count identical ratings among score ballots, in one pass."""
+    if isinstance(ballots, BallotProfile):
+        return ballots
+    ratings = (vote.ratings for vote in rated_votes(ballots, candidates))
+    return BallotProfile(RatedVote, dict(Counter(ratings)))
+
+
+def choice_profile(ballots: Iterable[Any], candidates: list[str]) -> BallotProfile:
+    """Count identical choices among simple ballots, in one pass."""
+    if isinstance(ballots, BallotProfile):
+        return ballots
+    choices = (vote.choices for vote in choice_votes(ballots, candidates))
+    return BallotProfile(ChoiceVote, dict(Counter(choices)))
+
+
+def record_profile(records: Iterable[Record]) -> BallotProfile:
+    """Count identical records, which must all be of one kind, in one pass."""
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return BallotProfile(None, {})
+    vote = attrgetter(first.__slots__[0])
+    counts = Counter(map(vote, itertools.chain([first], records)))
+    return BallotProfile(type(first), dict(counts))